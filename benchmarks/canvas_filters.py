@@ -0,0 +1,126 @@
+"""
+Times the image work behind rank cards: each Canvas filter, dominant
+colour extraction and a full rank card render, reporting milliseconds
+per operation.
+
+    python benchmarks/canvas_filters.py --repeat 50
+
+Avatars and banners are generated locally and served from the canvas
+asset cache, so no network access is needed and downloads aren't timed.
+"""
+from PIL import Image, ImageDraw
+from os import path
+
+import statistics
+import argparse
+import random
+import time
+import sys
+import io
+
+sys.path.insert(0, path.abspath(path.join(path.dirname(__file__), "..", "src")))
+
+from libs import canvas
+from libs.canvas import Canvas, Blur, BlurBehind, GrayscaleBehind, InvertBehind
+from core.rank_cards import generate_rank_card
+
+AVATAR_URL = "benchmark://avatar.png"
+BANNER_URL = "benchmark://banner.png"
+
+def noise(width: int, height: int, rng: random.Random) -> Image.Image:
+    return Image.frombytes("RGB", (width, height), rng.randbytes(width * height * 3))
+
+def encode(image: Image.Image) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+def seed_assets(rng: random.Random):
+    # Pre-filled so renders never reach out to the network
+    for url, size in ((AVATAR_URL, (256, 256)), (BANNER_URL, (1200, 400))):
+        content = encode(noise(*size, rng))
+        canvas.assets._images[url] = content
+        canvas.assets.size += len(content)
+
+def card_canvas(background: Image.Image) -> Canvas:
+    return Canvas(image=background.copy(), width=None, height=None)
+
+def panel_mask(size: tuple) -> Image.Image:
+    mask = Image.new("RGBA", size, (0, 0, 0, 0))
+    ImageDraw.Draw(mask).rounded_rectangle([(0, 0), size], 8, fill=(0, 0, 0, 128))
+    return mask
+
+def cases(rng: random.Random):
+    size = (470, 85)
+    pos = (420, 195)
+    mask = panel_mask(size)
+    banner = noise(1200, 400, rng)
+    background = noise(900, 290, rng).convert("RGBA")
+    panel = noise(*size, rng)
+    colors = card_canvas(background)
+
+    def behind(filter_type):
+        def run():
+            target = card_canvas(background)
+            filter_type().before_render(target.image, target.draw, pos, size, mask)
+        return run
+
+    def blur():
+        Blur().apply(panel, None)
+
+    def dominant_color():
+        colors.get_dominant_color(banner)
+
+    def rank_card():
+        # Every render misses the colour cache like a new banner would
+        canvas.assets._colors.clear()
+        generate_rank_card(
+            name="Benchmark",
+            level=12,
+            xp=130,
+            total_xp=144,
+            rank=3,
+            leveled_up=True,
+            avatar=AVATAR_URL,
+            banner=BANNER_URL,
+        )
+
+    return [
+        ("Blur.apply", blur),
+        ("BlurBehind", behind(BlurBehind)),
+        ("GrayscaleBehind", behind(GrayscaleBehind)),
+        ("InvertBehind", behind(InvertBehind)),
+        ("get_dominant_color", dominant_color),
+        ("generate_rank_card", rank_card),
+    ]
+
+def measure(func, repeat: int) -> dict:
+    func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "median": statistics.median(timings),
+        "p95": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+    }
+
+def main(args):
+    rng = random.Random(args.seed)
+    seed_assets(rng)
+
+    print(f"{'operation':<22} {'p50':>9} {'p95':>9}")
+    for label, func in cases(rng):
+        if args.only and label not in args.only:
+            continue
+        result = measure(func, args.repeat)
+        print(f"{label:<22} {result['median']:>7.2f}ms {result['p95']:>7.2f}ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--only", nargs="*", help="Only run these operations")
+    main(parser.parse_args())
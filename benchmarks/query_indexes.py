@@ -0,0 +1,269 @@
+"""
+Seeds a throwaway SurrealDB database with production-like volumes and
+reports how long the hot queries take before and after the secondary
+indexes from the AddHotQueryIndexes migration are defined.
+
+    python benchmarks/query_indexes.py --url ws://localhost:8000/rpc
+
+Everything is written to its own namespace/database (``benchmark`` /
+``indexes`` by default), which is wiped at the start of every run.
+"""
+from datetime import datetime, timedelta, timezone
+from surrealdb import Surreal
+from os import path
+
+import statistics
+import argparse
+import asyncio
+import random
+import glob
+import time
+import os
+
+ROOT = path.abspath(path.join(path.dirname(__file__), ".."))
+SCHEMAS = path.join(ROOT, "database", "schemas")
+MIGRATION = path.join(ROOT, "database", "migrations", "20261018_120000_AddHotQueryIndexes.surql")
+BACKFILL = path.join(ROOT, "database", "migrations", "20261018_130000_BackfillAuditLogCounts.surql")
+QUERIES = path.join(ROOT, "src", "database", "queries")
+
+TABLES = [
+    "audit_log", "user_status", "feeddata", "channel_config",
+    "image", "guild_user", "user_identifier", "audit_log_count",
+]
+
+STATUS_TYPES = ["warn", "tempban", "mute", "reminder", "autorole"]
+EVENT_NAMES = ["member_ban", "member_kick", "settings_update", "message_delete", "warn"]
+
+def load_query(name: str) -> str:
+    for file in glob.glob(path.join(QUERIES, "**", f"{name}.surql"), recursive=True):
+        with open(file, "r") as f:
+            return f.read()
+    raise KeyError(name)
+
+def iso(value: datetime) -> str:
+    return value.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+async def insert(db: Surreal, table: str, rows, batch_size: int):
+    for i in range(0, len(rows), batch_size):
+        await db.query(f"INSERT INTO {table} $rows;", {"rows": rows[i:i + batch_size]})
+
+async def seed(db: Surreal, args) -> dict:
+    rng = random.Random(args.seed)
+    now = datetime.now(timezone.utc)
+    guilds = [f"guild{i}" for i in range(args.guilds)]
+    # A few very large guilds dominate audit logs and members in production
+    hot_guild = guilds[0]
+    weights = [50] + [1] * (len(guilds) - 1)
+
+    def pick_guild():
+        return rng.choices(guilds, weights)[0]
+
+    print(f"Seeding {args.audit_logs} audit logs...")
+    rows = []
+    for i in range(args.audit_logs):
+        rows.append({
+            "guild_id": pick_guild(),
+            "originator_id": f"user{rng.randrange(args.members)}",
+            "event_name": rng.choice(EVENT_NAMES),
+            "created_at": iso(now - timedelta(seconds=rng.randrange(60 * 60 * 24 * 365))),
+        })
+        if len(rows) >= args.batch_size:
+            await insert(db, "audit_log", rows, args.batch_size)
+            rows = []
+    await insert(db, "audit_log", rows, args.batch_size)
+
+    print(f"Seeding {args.statuses} statuses...")
+    rows = []
+    for i in range(args.statuses):
+        # Most statuses are long expired warnings that were never cleaned up
+        ends = now + timedelta(seconds=rng.randrange(-60 * 60 * 24 * 180, 60 * 60 * 24 * 30))
+        rows.append({
+            "guild_id": pick_guild(),
+            "user_id": f"user{rng.randrange(args.members)}",
+            "type": rng.choice(STATUS_TYPES),
+            "ends": iso(ends),
+            "reason": "benchmark",
+        })
+        if len(rows) >= args.batch_size:
+            await insert(db, "user_status", rows, args.batch_size)
+            rows = []
+    await insert(db, "user_status", rows, args.batch_size)
+
+    print(f"Seeding {args.members} guild members...")
+    await insert(db, "guild_user", [
+        {
+            "guild_id": pick_guild(),
+            "user_id": f"user{i}",
+            "perms": "",
+            "xp": rng.randrange(100000),
+            "roles": rng.sample(range(1, 200), rng.randrange(0, 5)),
+        } for i in range(args.members)
+    ], args.batch_size)
+
+    print(f"Seeding {args.feeds} feeds and channel configs...")
+    await insert(db, "feeddata", [
+        {
+            "url": f"https://example.com/feed/{i}.xml",
+            "name": f"Feed {i}",
+            "description": "",
+            "last_updated": iso(now - timedelta(minutes=rng.randrange(60 * 24))),
+            "next_update": iso(now + timedelta(minutes=rng.randrange(-30, 60 * 24))),
+            "data": {},
+        } for i in range(args.feeds)
+    ], args.batch_size)
+    await insert(db, "channel_config", [
+        {
+            "guild_id": pick_guild(),
+            "channel_id": f"channel{i}",
+            "type": "RSS",
+            "url": f"https://example.com/feed/{rng.randrange(args.feeds)}.xml",
+            "preset": f"preset{rng.randrange(50)}",
+            "last_updated": iso(now - timedelta(minutes=rng.randrange(60 * 24))),
+        } for i in range(args.feeds * 2)
+    ], args.batch_size)
+
+    print(f"Seeding {args.images} images...")
+    await insert(db, "image", [
+        {
+            "source_url": f"https://cdn.example.com/{i}.png",
+            "hash": f"{i:064x}",
+            "mime": "image/png",
+            "size": rng.randrange(1024, 1024 * 1024),
+            "expires": iso(now + timedelta(seconds=rng.randrange(-60 * 60, 60 * 60 * 24))),
+        } for i in range(args.images)
+    ], args.batch_size)
+
+    print(f"Seeding {args.members} identifiers...")
+    await insert(db, "user_identifier", [
+        {
+            "id": f"user{i}",
+            "connections": {},
+            "hashed_ip": f"ip{rng.randrange(args.members // 2)}",
+            "browser_id": f"browser{rng.randrange(args.members // 2)}",
+        } for i in range(args.members)
+    ], args.batch_size)
+
+    return {
+        "hot_guild": hot_guild,
+        "now": now,
+    }
+
+def cases(context: dict, args):
+    hot_guild = context["hot_guild"]
+    now = context["now"]
+    return [
+        ("listAuditLogs (first page)", "listAuditLogs", {
+            "guild": hot_guild, "range_start": None, "range_end": None,
+            "authors": None, "event_names": None, "limit": 51,
+            "before_time": None, "before_id": None,
+        }),
+        ("listAuditLogs (deep page)", "listAuditLogs", {
+            "guild": hot_guild, "range_start": None, "range_end": None,
+            "authors": None, "event_names": None, "limit": 51,
+            "before_time": iso(now - timedelta(days=180)), "before_id": "",
+        }),
+        ("countAuditLogs", "countAuditLogs", {
+            "guild": hot_guild, "event_names": None,
+        }),
+        ("getExpiredStatuses", "getExpiredStatuses", {
+            "types": ["tempban", "mute", "autorole"],
+        }),
+        ("getUpcomingStatuses", "getUpcomingStatuses", {
+            "types": ["tempban", "mute", "autorole", "reminder"], "window": "600s",
+        }),
+        ("getScheduledFeeds", "getScheduledFeeds", {}),
+        ("getUpdatableFeeds", "getUpdatableFeeds", {
+            "updated": iso(now - timedelta(hours=1)),
+            "urls": [f"https://example.com/feed/{i}.xml" for i in range(10)],
+            "presets": ["preset1", "preset2"],
+        }),
+        ("getImage (by source)", "getImage", {
+            "id": None, "source_url": f"https://cdn.example.com/{args.images // 2}.png",
+        }),
+        ("getGuildUser", "getGuildUser", {
+            "guild": hot_guild, "id": f"user{args.members // 3}",
+        }),
+        ("listUsersWithRole", "listUsersWithRole", {
+            "guild": hot_guild, "roles": [42],
+        }),
+        ("getMatchingIdentifiers", "getMatchingIdentifiers", {
+            "ids": [f"user{i}" for i in range(20)], "connections": {},
+            "hashed_ip": "ip1", "browser_id": "browser1",
+        }),
+    ]
+
+async def measure(db: Surreal, query: str, params: dict, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await db.query(query, params)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "median": statistics.median(timings),
+        "p95": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+    }
+
+async def run_cases(db: Surreal, context: dict, args) -> dict:
+    results = {}
+    for label, name, params in cases(context, args):
+        results[label] = await measure(db, load_query(name), params, args.repeat)
+        print(f"  {label}: {results[label]['median']:.1f}ms")
+    return results
+
+async def main(args):
+    db = Surreal(args.url)
+    await db.connect()
+    await db.signin({"user": args.user, "pass": args.password})
+    await db.use(args.namespace, args.database)
+
+    for table in TABLES:
+        await db.query(f"REMOVE TABLE {table};")
+    for file in sorted(glob.glob(path.join(SCHEMAS, "*.surql"))):
+        with open(file, "r") as f:
+            await db.query(f.read())
+
+    started = time.perf_counter()
+    context = await seed(db, args)
+    with open(BACKFILL, "r") as f:
+        await db.query(f.read())
+    print(f"Seeded in {time.perf_counter() - started:.0f}s\n")
+
+    print("Without indexes:")
+    before = await run_cases(db, context, args)
+
+    print("\nDefining indexes...")
+    started = time.perf_counter()
+    with open(MIGRATION, "r") as f:
+        await db.query(f.read())
+    print(f"Indexes built in {time.perf_counter() - started:.0f}s\n")
+
+    print("With indexes:")
+    after = await run_cases(db, context, args)
+
+    print()
+    print(f"{'query':<30} {'before p50':>11} {'before p95':>11} {'after p50':>10} {'after p95':>10} {'speedup':>8}")
+    for label in before:
+        b, a = before[label], after[label]
+        speedup = b["median"] / a["median"] if a["median"] > 0 else float("inf")
+        print(f"{label:<30} {b['median']:>9.1f}ms {b['p95']:>9.1f}ms {a['median']:>8.1f}ms {a['p95']:>8.1f}ms {speedup:>7.1f}x")
+
+    await db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=os.getenv("BENCHMARK_DATABASE_URL", "ws://localhost:8000/rpc"))
+    parser.add_argument("--user", default=os.getenv("DATABASE_USER", "root"))
+    parser.add_argument("--password", default=os.getenv("DATABASE_PASSWORD", "root"))
+    parser.add_argument("--namespace", default="benchmark")
+    parser.add_argument("--database", default="indexes")
+    parser.add_argument("--guilds", type=int, default=2000)
+    parser.add_argument("--audit-logs", type=int, default=2_000_000)
+    parser.add_argument("--statuses", type=int, default=1_000_000)
+    parser.add_argument("--members", type=int, default=500_000)
+    parser.add_argument("--feeds", type=int, default=20_000)
+    parser.add_argument("--images", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,125 @@
+"""
+Compares the malicious URL filter's old substring scan over every listed
+URL with the URL reputation index, with and without its Bloom filter, at
+URLhaus-like list sizes, reporting microseconds per message.
+
+    python benchmarks/url_lookup.py --sizes 1000 10000 50000
+
+Listed URLs and messages are generated locally. Most messages are clean
+chat, some contain unlisted links and a few contain a listed one, roughly
+what the filter sees in practice. Listed URLs are also written as
+markdown links, in brackets and joined by commas, and the ``missed``
+column counts messages with a listed URL the method didn't flag.
+"""
+from typing import Tuple
+from os import path
+
+import statistics
+import argparse
+import random
+import string
+import time
+import sys
+
+sys.path.insert(0, path.abspath(path.join(path.dirname(__file__), "..", "src")))
+
+from libs.urlindex import URLIndex
+
+WORDS = [
+    "the", "game", "tonight", "anyone", "want", "to", "play", "lol", "gg",
+    "check", "this", "out", "server", "event", "starts", "at", "nice", "clip",
+]
+CLEAN_LINKS = [
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://github.com/shayypy/guilded.py",
+    "https://media.tenor.com/abc123/tenor.gif",
+    "https://www.guilded.gg/i/2Vg4mN3k",
+]
+THREATS = ["malware_download", "phishing"]
+
+def random_label(rng: random.Random, length: int) -> str:
+    return "".join(rng.choices(string.ascii_lowercase + string.digits, k=length))
+
+def listed_url(rng: random.Random) -> str:
+    kind = rng.random()
+    if kind < 0.45:
+        ip = ".".join(str(rng.randint(1, 254)) for _ in range(4))
+        return f"http://{ip}:{rng.choice([80, 8080, 4433, 39113])}/bins/{random_label(rng, 6)}.{rng.choice(['sh', 'arm7', 'mips', 'x86'])}"
+    if kind < 0.9:
+        return f"https://{random_label(rng, 10)}.{rng.choice(['com', 'net', 'xyz', 'ru'])}/{random_label(rng, 8)}/{random_label(rng, 12)}.exe"
+    return f"http://{random_label(rng, 12)}.{rng.choice(['top', 'xyz', 'info'])}/"
+
+def message(rng: random.Random, listed: list) -> Tuple[str, bool]:
+    """Returns a message and whether it contains a listed URL."""
+    words = rng.choices(WORDS, k=rng.randint(3, 30))
+    flagged = False
+    kind = rng.random()
+    if kind < 0.15:
+        words.insert(rng.randrange(len(words) + 1), rng.choice(CLEAN_LINKS))
+    elif kind < 0.17:
+        url = rng.choice(listed)
+        url = rng.choice([
+            "{0}",
+            "[{0}]({0})",
+            "({0})",
+            "{0},{1}",
+            "{1},{0}",
+        ]).format(url, rng.choice(CLEAN_LINKS))
+        words.insert(rng.randrange(len(words) + 1), url)
+        flagged = True
+    return " ".join(words), flagged
+
+def substring_scan(urls: dict):
+    # The filter as it was, a substring search for every listed URL
+    def run(content: str):
+        for url in urls.keys():
+            if url in content:
+                return url, urls[url]
+        return None
+    return run
+
+def measure(func, messages: list, expected: list) -> dict:
+    timings = []
+    hits = 0
+    missed = 0
+    for content, flagged in zip(messages, expected):
+        start = time.perf_counter()
+        found = func(content) is not None
+        timings.append((time.perf_counter() - start) * 1_000_000)
+        hits += found
+        missed += flagged and not found
+    timings.sort()
+    return {
+        "median": statistics.median(timings),
+        "p95": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        "hits": hits,
+        "missed": missed,
+    }
+
+def main(args):
+    rng = random.Random(args.seed)
+    print(f"{'size':>7} {'method':<18} {'build':>9} {'p50':>10} {'p95':>10} {'hits':>5} {'missed':>6}")
+    for size in args.sizes:
+        listed = [listed_url(rng) for _ in range(size)]
+        urls = {url: rng.choice(THREATS) for url in listed}
+        messages, expected = zip(*[message(rng, listed) for _ in range(args.messages)])
+
+        methods = [("substring scan", lambda: substring_scan(urls))]
+        methods.append(("index", lambda: URLIndex(urls.items(), bloom=False).lookup))
+        methods.append(("index + bloom", lambda: URLIndex(urls.items(), bloom=True).lookup))
+        for label, build in methods:
+            start = time.perf_counter()
+            func = build()
+            built = (time.perf_counter() - start) * 1000
+            # The scan takes long enough at large sizes that a sample will do
+            count = args.scan_messages if label == "substring scan" else len(messages)
+            result = measure(func, messages[:count], expected[:count])
+            print(f"{size:>7} {label:<18} {built:>7.1f}ms {result['median']:>8.1f}us {result['p95']:>8.1f}us {result['hits']:>5} {result['missed']:>6}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--scan-messages", type=int, default=500, help="Messages run through the substring scan")
+    parser.add_argument("--seed", type=int, default=1)
+    main(parser.parse_args())
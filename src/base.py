@@ -7,6 +7,12 @@ from core.embeds import EMBED_DENIED, EMBED_STANDARD, EMBED_SUCCESS
 from werkzeug.middleware.dispatcher import DispatcherMiddleware
 from quart_rate_limiter.store import RateLimiterStoreABC
 from database.permissions import UserPermissions
+from core.reconciliation import StartupReconciler
+from core.xp import xp_aggregator
+from core.image_fetcher import image_fetcher
+from core.blocklists import blocklists
+from core.toxicity import toxicity_service
+from core import rank_cards
 from core.bot import Bot, HelpCommand, prefix
 from prometheus_client import make_asgi_app
 from quart_rate_limiter import RateLimiter
@@ -47,6 +53,7 @@ bot = Bot(
     features=client_features,
     help_command=HelpCommand(), # TODO: Create a custom help command that has i18n support
 )
+reconciler = StartupReconciler(bot)
 
 ## BOT EVENTS ##
 
@@ -56,52 +63,9 @@ async def on_ready():
     if config.DATABASE_DB == "dev":
         # Because an in-memory surrealdb instance is used in development
         # clear the cache on bot startup to prevent issues.
-        valkey.flushall()
+        await valkey.flushall()
 
-    for server in await bot.fetch_servers():
-        print(f"Checking guild {server.name} ({server.id}) for database row")
-        if server.member_count == 0:
-            await server.fill_members()
-
-        try:
-            guild = await db.servers.fetch_or_create_server(server)
-        except Exception as e:
-            print(f"Failed to fetch or create server {server.id} from database: {e}")
-        else:
-            me = await server.getch_member(bot.user_id)
-            if me.nick != None and me.nick != guild.settings.get("nickname"):
-                try:
-                    await guild.update_settings(
-                        nickname=me.nick
-                    )
-                except Exception as e:
-                    print(f"Failed to update nickname for server {server.id} in database: {e}")
-
-            for member in server.members:
-                if member.bot: continue
-                try:
-                    user = await guild.fetch_or_create_member(member)
-                except Exception as e:
-                    print(f"Failed to fetch or create member {member.id} in server {server.id} in database: {e}")
-                else:
-                    print(f"Synced member {member.id} in server {server.id} in database")
-                
-                try:
-                    global_user = await db.users.fetch_or_create_user(member)
-                except Exception as e:
-                    print(f"Failed to fetch or create user {member.id} in database: {e}")
-                else:
-                    print(f"Synced user {member.id} in database")
-
-            for ban in await server.bans():
-                if ban.user.bot: continue
-                if user:
-                    try:
-                        await user.set_banned(True)
-                    except Exception as e:
-                        print(f"Failed to sync ban state for user {ban.user.id} in server {server.id} in database: {e}")
-                    else:
-                        print(f"Synced ban state for user {ban.user.id} in server {server.id} in database")
+    await reconciler.run()
     print("Bot online and ready to go!")
 
 @bot.event
@@ -204,7 +168,7 @@ class ValkeyStore(RateLimiterStoreABC):
 
     async def get(self, key: str, default: datetime) -> datetime:
         from database.valkey import valkey
-        result = valkey.get(f"rate_limit:{key}")
+        result = await valkey.get(f"rate_limit:{key}")
         if result is None:
             return default
         else:
@@ -212,7 +176,7 @@ class ValkeyStore(RateLimiterStoreABC):
 
     async def set(self, key: str, tat: datetime) -> None:
         from database.valkey import valkey
-        valkey.set(f"rate_limit:{key}", tat.timestamp())
+        await valkey.set(f"rate_limit:{key}", tat.timestamp())
 
     async def before_serving(self) -> None:
         pass
@@ -235,6 +199,7 @@ class PrometheusMiddleware:
 
 async def run_bot_and_api():
     await setup_db()
+    db.cache.invalidation_listener.start()
     
     for mod in startup:
         bot.load_extension(mod)
@@ -253,6 +218,11 @@ async def run_bot_and_api():
             cog.register_routes(app)
         if hasattr(cog, "after_load"):
             await cog.after_load()
+
+    # Every cog has registered its status handlers by now
+    db.statuses.scheduler.start()
+    xp_aggregator.start(bot)
+    db.proxy.reaper.start()
     
     app_config = Config()
     app_config.bind = ["0.0.0.0:7777"]
@@ -272,4 +242,15 @@ if __name__ == "__main__":
     try:
         loop.run_until_complete(run_bot_and_api())
     except KeyboardInterrupt:
-        loop.run_until_complete(bot.close())
\ No newline at end of file
+        # Pending XP has to be awarded while the bot can still reach Guilded
+        loop.run_until_complete(xp_aggregator.close())
+        loop.run_until_complete(bot.close())
+        rank_cards.renderer.close()
+        loop.run_until_complete(image_fetcher.close())
+        loop.run_until_complete(blocklists.close())
+        toxicity_service.close()
+        loop.run_until_complete(db.proxy.reaper.close())
+        loop.run_until_complete(db.servers.audit_log_writer.close())
+        loop.run_until_complete(db.cache.invalidation_listener.close())
+        loop.run_until_complete(db.pool.close())
+        loop.run_until_complete(valkey.aclose())
\ No newline at end of file
@@ -21,6 +21,11 @@ DATABASE_PASSWORD: str = os.getenv('DATABASE_PASSWORD', 'Password123')
 DATABASE_NAMESPACE: str = os.getenv('DATABASE_NAMESPACE', 'server_guard')
 DATABASE_DB: str = os.getenv('DATABASE_DB', 'prod')
 
+DATABASE_POOL_SIZE: int = int(os.getenv('DATABASE_POOL_SIZE', '10'))
+DATABASE_POOL_MAX_INFLIGHT: int = int(os.getenv('DATABASE_POOL_MAX_INFLIGHT', '1'))
+DATABASE_POOL_HEALTH_INTERVAL: int = int(os.getenv('DATABASE_POOL_HEALTH_INTERVAL', '30'))
+DATABASE_POOL_ACQUIRE_TIMEOUT: int = int(os.getenv('DATABASE_POOL_ACQUIRE_TIMEOUT', '10'))
+
 SESSION_SECRET: str = os.getenv('SESSION_SECRET')
 ORIGIN_SITE: str = os.getenv('ORIGIN_SITE', "https://serverguard.xyz")
 API_SITE: str = os.getenv('API_SITE', "https://api.serverguard.xyz")
@@ -45,5 +50,44 @@ PROMETHEUS_AUTH: str = os.getenv("PROMETHEUS_AUTH")
 
 VALKEY_IP: str = os.getenv("VALKEY_IP", "localhost")
 VALKEY_PORT: str = os.getenv("VALKEY_PORT", "6379")
+VALKEY_MAX_CONNECTIONS: int = int(os.getenv("VALKEY_MAX_CONNECTIONS", "50"))
+
+SERVER_CACHE_SIZE: int = int(os.getenv("SERVER_CACHE_SIZE", "2000"))
+SERVER_CACHE_TTL: int = int(os.getenv("SERVER_CACHE_TTL", "300"))
+
+STARTUP_SYNC_CONCURRENCY: int = int(os.getenv("STARTUP_SYNC_CONCURRENCY", "5"))
+STARTUP_SYNC_BATCH_SIZE: int = int(os.getenv("STARTUP_SYNC_BATCH_SIZE", "500"))
+
+AUDIT_LOG_BATCH_SIZE: int = int(os.getenv("AUDIT_LOG_BATCH_SIZE", "100"))
+AUDIT_LOG_FLUSH_INTERVAL: int = int(os.getenv("AUDIT_LOG_FLUSH_INTERVAL", "250"))
+AUDIT_LOG_MAX_PENDING: int = int(os.getenv("AUDIT_LOG_MAX_PENDING", "5000"))
+
+XP_FLUSH_INTERVAL: int = int(os.getenv("XP_FLUSH_INTERVAL", "15"))
+XP_FLUSH_CONCURRENCY: int = int(os.getenv("XP_FLUSH_CONCURRENCY", "10"))
+XP_TOTALS_TTL: int = int(os.getenv("XP_TOTALS_TTL", "3600"))
+
+RANK_CARD_WORKERS: int = int(os.getenv("RANK_CARD_WORKERS", "2"))
+RANK_CARD_QUEUE_SIZE: int = int(os.getenv("RANK_CARD_QUEUE_SIZE", "32"))
+RANK_CARD_CACHE_SIZE: int = int(os.getenv("RANK_CARD_CACHE_SIZE", "128"))
+RANK_CARD_CACHE_TTL: int = int(os.getenv("RANK_CARD_CACHE_TTL", "600"))
+# Bytes of downloaded avatars and banners each render worker keeps
+RANK_CARD_ASSET_CACHE_SIZE: int = int(os.getenv("RANK_CARD_ASSET_CACHE_SIZE", str(64 * 1024 * 1024)))
+
+IMAGE_STORE_PATH: str = os.getenv("IMAGE_STORE_PATH", "data/images")
+PROFANITY_INDEX_PATH: str = os.getenv("PROFANITY_INDEX_PATH", "data/profanity.idx")
+# Seconds after which the index is checked against the upstream lists on startup
+PROFANITY_INDEX_MAX_AGE: int = int(os.getenv("PROFANITY_INDEX_MAX_AGE", str(60 * 60 * 24 * 7)))
+URL_INDEX_BLOOM: bool = os.getenv("URL_INDEX_BLOOM", "false").lower() == "true"
+BLOCKLIST_PATH: str = os.getenv("BLOCKLIST_PATH", "data/blocklists")
+BLOCKLIST_REFRESH_INTERVAL: int = int(os.getenv("BLOCKLIST_REFRESH_INTERVAL", "1800"))
+TOXICITY_BATCH_SIZE: int = int(os.getenv("TOXICITY_BATCH_SIZE", "32"))
+TOXICITY_MAX_WAIT: int = int(os.getenv("TOXICITY_MAX_WAIT", "8"))
+IMAGE_FETCH_CONCURRENCY: int = int(os.getenv("IMAGE_FETCH_CONCURRENCY", "20"))
+IMAGE_FETCH_PER_HOST: int = int(os.getenv("IMAGE_FETCH_PER_HOST", "4"))
+IMAGE_FETCH_CONNECT_TIMEOUT: float = float(os.getenv("IMAGE_FETCH_CONNECT_TIMEOUT", "5"))
+IMAGE_FETCH_READ_TIMEOUT: float = float(os.getenv("IMAGE_FETCH_READ_TIMEOUT", "10"))
+IMAGE_FETCH_MAX_SIZE: int = int(os.getenv("IMAGE_FETCH_MAX_SIZE", str(10 * 1024 * 1024)))
+IMAGE_REAP_BATCH_SIZE: int = int(os.getenv("IMAGE_REAP_BATCH_SIZE", "500"))
+IMAGE_REAP_SYNC_INTERVAL: int = int(os.getenv("IMAGE_REAP_SYNC_INTERVAL", "3600"))
 
 LOAD_NSFW: bool = os.getenv("LOAD_NSFW", "true").lower() == "true"
\ No newline at end of file
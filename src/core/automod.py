@@ -0,0 +1,169 @@
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+from prometheus_client import Counter, Histogram
+from enum import IntEnum
+
+import traceback
+import time
+
+STAGE_SECONDS = Histogram(
+    'automod_stage_seconds',
+    'Time spent running an automod filter stage on a message',
+    ['stage'],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+)
+STAGE_HITS = Counter(
+    'automod_stage_hits',
+    'Messages an automod filter stage flagged',
+    ['stage', 'action']
+)
+MESSAGE_SECONDS = Histogram(
+    'automod_message_seconds',
+    'Time spent running every automod filter stage on a message'
+)
+
+class Cost(IntEnum):
+    """Rough price of a stage, stages run cheapest first."""
+    # Counters and lookups that don't depend on the message length
+    TRIVIAL = 0
+    # Scans over the message text
+    TEXT = 1
+    # Statistical analysis of the text, e.g. language detection
+    ANALYSIS = 2
+    # Neural network inference
+    MODEL = 3
+    # Requests to other services
+    NETWORK = 4
+
+class Violation:
+    """
+    What a stage found wrong with a message.
+
+    A violation that doesn't ``delete`` the message is only logged and the
+    remaining stages still run.
+    """
+    def __init__(
+        self,
+        reason: str,
+        filter: str,
+        content: str,
+        extra: Dict[str, Any]=None,
+        delete: bool=True,
+        purge_recent: bool=False
+    ):
+        self.reason = reason
+        self.filter = filter
+        self.content = content
+        self.extra = extra or {}
+        self.delete = delete
+        # Also delete the author's other messages from the last minute and a half
+        self.purge_recent = purge_recent
+
+StageCheck = Callable[[Any], Awaitable[Optional[Violation]]]
+
+class Stage:
+    """
+    A single automod filter.
+
+    ``setting`` is the server setting that enables the stage, it's skipped
+    while the setting is falsy. ``restriction`` is the setting whose
+    ``_restrictions`` decide which members, roles and channels the stage
+    applies to, or ``None`` if it applies to everyone. ``requires`` names
+    resources, such as models, that have to be loaded first.
+    """
+    def __init__(
+        self,
+        name: str,
+        cost: Cost,
+        check: StageCheck,
+        setting: str=None,
+        restriction: Optional[str]="",
+        requires: Iterable[str]=()
+    ):
+        self.name = name
+        self.cost = cost
+        self.check = check
+        self.setting = name if setting is None else setting
+        self.restriction = self.setting if restriction == "" else restriction
+        self.requires = frozenset(requires)
+
+    def applies(self, context, ready: Set[str]) -> bool:
+        if not self.requires.issubset(ready):
+            return False
+        if self.setting and not context.server.settings.get(self.setting):
+            return False
+        if self.restriction and not context.can_run(self.restriction):
+            return False
+        return True
+
+def stage(
+    name: str,
+    cost: Cost,
+    setting: str=None,
+    restriction: Optional[str]="",
+    requires: Iterable[str]=()
+):
+    """Marks a method as an automod stage, see :class:`Stage`."""
+    def decorator(func: StageCheck) -> StageCheck:
+        func.__automod_stage__ = (name, cost, setting, restriction, tuple(requires))
+        return func
+    return decorator
+
+class Pipeline:
+    """
+    Runs automod stages against a message, cheapest first, stopping at
+    the first one that deletes it.
+
+    The time each stage takes and how often it flags a message are
+    exported per stage, so it's clear which filters a message's time is
+    spent in.
+    """
+    def __init__(self, stages: List[Stage]):
+        # sorted() is stable, stages of the same cost keep their declared order
+        self.stages = sorted(stages, key=lambda stage: stage.cost)
+        self.ready: Set[str] = set()
+
+    @classmethod
+    def from_object(cls, obj) -> "Pipeline":
+        """Builds a pipeline from the methods of ``obj`` marked with :func:`stage`."""
+        stages = []
+        for attr in dir(type(obj)):
+            func = getattr(type(obj), attr, None)
+            spec = getattr(func, "__automod_stage__", None)
+            if spec is None:
+                continue
+            name, cost, setting, restriction, requires = spec
+            stages.append((
+                func.__code__.co_firstlineno,
+                Stage(name, cost, getattr(obj, attr), setting, restriction, requires)
+            ))
+        stages.sort(key=lambda item: item[0])
+        return cls([stage for _, stage in stages])
+
+    async def run(self, context) -> List[Violation]:
+        """
+        Returns every violation found, the last of which deleted the
+        message if any did.
+        """
+        violations = []
+        started = time.perf_counter()
+        try:
+            for stage in self.stages:
+                if not stage.applies(context, self.ready):
+                    continue
+                stage_started = time.perf_counter()
+                try:
+                    violation = await stage.check(context)
+                except Exception:
+                    traceback.print_exc()
+                    continue
+                finally:
+                    STAGE_SECONDS.labels(stage.name).observe(time.perf_counter() - stage_started)
+                if violation is None:
+                    continue
+                STAGE_HITS.labels(stage.name, "delete" if violation.delete else "log").inc()
+                violations.append(violation)
+                if violation.delete:
+                    break
+        finally:
+            MESSAGE_SECONDS.observe(time.perf_counter() - started)
+        return violations
@@ -0,0 +1,194 @@
+from typing import Any, Callable, Dict, Iterator, Optional, Set, Tuple
+from libs.urlindex import URLIndex
+from bs4 import BeautifulSoup
+from zipfile import ZipFile
+from os import path
+
+import aiohttp
+import asyncio
+import json
+import uuid
+import time
+import csv
+import io
+import os
+import config
+
+CHUNK_SIZE = 64 * 1024
+RETRY_DELAY = 60
+
+URLHAUS_URL = "https://urlhaus.abuse.ch/downloads/csv/"
+GUILDED_SITEMAP_URL = "https://www.guilded.gg/sitemap_landing.xml"
+GUILDED_SITE = "https://www.guilded.gg/"
+
+def _urlhaus_entries(file: str) -> Iterator[Tuple[str, str]]:
+    with ZipFile(file) as archive:
+        with archive.open("csv.txt") as item:
+            for row in csv.reader(io.TextIOWrapper(item, "utf-8")):
+                # id, dateadded, url, url_status, last_online, threat, ...
+                if len(row) < 6 or row[0].startswith("#"):
+                    continue
+                yield row[2], row[5]
+
+def load_urlhaus(file: str) -> URLIndex:
+    """Builds a URL index from a URLhaus CSV export, a row at a time."""
+    return URLIndex(_urlhaus_entries(file), bloom=config.URL_INDEX_BLOOM)
+
+def load_guilded_paths(file: str) -> Set[str]:
+    """The first path segments used by Guilded's own pages, e.g. ``about``."""
+    with open(file, "rb") as f:
+        soup = BeautifulSoup(f, "xml")
+    paths = set()
+    for tag in soup.find_all("url"):
+        loc = tag.loc
+        if loc and loc.string and loc.string.startswith(GUILDED_SITE):
+            segment = loc.string[len(GUILDED_SITE):].split("/", 1)[0].lower()
+            if segment:
+                paths.add(segment)
+    return paths
+
+class Blocklist:
+    def __init__(self, name: str, url: str, load: Callable[[str], Any], apply: Callable[[Any], None]):
+        self.name = name
+        self.url = url
+        self.load = load
+        self.apply = apply
+
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.updated_at: Optional[float] = None
+
+class BlocklistRefresher:
+    """
+    Keeps the lists automod checks against up to date.
+
+    Every list is downloaded with a conditional request, so an unchanged
+    list costs a 304. New copies are streamed to a temporary file, loaded
+    in a worker thread and only handed to the list's ``apply`` callback
+    once fully built. The file is then kept under ``directory`` along with
+    its validators, so a restarted process loads the last copy straight
+    from disk instead of waiting on the first download.
+    """
+
+    def __init__(
+        self,
+        directory: str=config.BLOCKLIST_PATH,
+        interval: int=config.BLOCKLIST_REFRESH_INTERVAL
+    ):
+        self.directory = directory
+        self.interval = interval
+        self.lists: Dict[str, Blocklist] = {}
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, name: str, url: str, load: Callable[[str], Any], apply: Callable[[Any], None]):
+        self.lists[name] = Blocklist(name, url, load, apply)
+
+    def _snapshot(self, blocklist: Blocklist) -> str:
+        return path.join(self.directory, blocklist.name)
+
+    def _metadata(self, blocklist: Blocklist) -> str:
+        return path.join(self.directory, f"{blocklist.name}.json")
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            from base import BOT_VERSION
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=4),
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=60),
+                headers={"User-Agent": config.USER_AGENT % (BOT_VERSION, "Automod")},
+            )
+        return self._session
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def restore(self, blocklist: Blocklist) -> bool:
+        """Loads the copy kept on disk, if there is one."""
+        snapshot = self._snapshot(blocklist)
+        if not path.exists(snapshot):
+            return False
+        try:
+            data = await asyncio.to_thread(blocklist.load, snapshot)
+        except Exception as e:
+            print(f"Failed to load saved {blocklist.name}: {type(e).__name__} - {e}")
+            return False
+        blocklist.apply(data)
+        try:
+            with open(self._metadata(blocklist), "r") as f:
+                metadata = json.load(f)
+        except (FileNotFoundError, ValueError):
+            metadata = {}
+        blocklist.etag = metadata.get("etag")
+        blocklist.last_modified = metadata.get("last_modified")
+        blocklist.updated_at = metadata.get("updated_at")
+        print(f"Loaded saved {blocklist.name}")
+        return True
+
+    async def refresh(self, blocklist: Blocklist) -> bool:
+        """Downloads the list if it changed. Returns whether it did."""
+        headers = {}
+        if blocklist.etag:
+            headers["If-None-Match"] = blocklist.etag
+        if blocklist.last_modified:
+            headers["If-Modified-Since"] = blocklist.last_modified
+
+        os.makedirs(self.directory, exist_ok=True)
+        temp = path.join(self.directory, f"{blocklist.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            async with self._get_session().get(blocklist.url, headers=headers) as response:
+                if response.status == 304:
+                    return False
+                response.raise_for_status()
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+                with open(temp, "wb") as f:
+                    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                        await asyncio.to_thread(f.write, chunk)
+
+            data = await asyncio.to_thread(blocklist.load, temp)
+            blocklist.apply(data)
+
+            await asyncio.to_thread(os.replace, temp, self._snapshot(blocklist))
+            blocklist.etag = etag
+            blocklist.last_modified = last_modified
+            blocklist.updated_at = time.time()
+            with open(self._metadata(blocklist), "w") as f:
+                json.dump({
+                    "etag": etag,
+                    "last_modified": last_modified,
+                    "updated_at": blocklist.updated_at,
+                }, f)
+            return True
+        finally:
+            if path.exists(temp):
+                os.remove(temp)
+
+    async def _run(self):
+        for blocklist in self.lists.values():
+            await self.restore(blocklist)
+
+        while True:
+            delay = self.interval
+            for blocklist in self.lists.values():
+                try:
+                    if await self.refresh(blocklist):
+                        print(f"Refreshed {blocklist.name}")
+                except Exception as e:
+                    print(f"Failed to refresh {blocklist.name}: {type(e).__name__} - {e}")
+                    # Retry sooner if there's nothing to fall back on
+                    if blocklist.updated_at is None:
+                        delay = min(delay, RETRY_DELAY)
+            await asyncio.sleep(delay)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+blocklists = BlocklistRefresher()
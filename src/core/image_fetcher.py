@@ -0,0 +1,79 @@
+from database.singleflight import SingleFlight
+from database.proxy import BlobTooLarge, Image
+from typing import Optional
+
+import database as db
+import aiohttp
+import config
+
+CHUNK_SIZE = 64 * 1024
+
+class ImageFetchError(Exception):
+    pass
+
+class ImageFetcher:
+    """
+    Downloads remote images into the proxy's blob store.
+
+    Every download shares one connection pool which caps the number of
+    connections in total and per host, and applies the connect and read
+    timeouts. Bodies are streamed straight to disk and abandoned once
+    they pass ``max_size``. Concurrent requests for the same URL share a
+    single download.
+    """
+
+    def __init__(
+        self,
+        concurrency: int=config.IMAGE_FETCH_CONCURRENCY,
+        per_host: int=config.IMAGE_FETCH_PER_HOST,
+        connect_timeout: float=config.IMAGE_FETCH_CONNECT_TIMEOUT,
+        read_timeout: float=config.IMAGE_FETCH_READ_TIMEOUT,
+        max_size: int=config.IMAGE_FETCH_MAX_SIZE
+    ):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = aiohttp.ClientTimeout(total=None, sock_connect=connect_timeout, sock_read=read_timeout)
+        self.max_size = max_size
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._fetches = SingleFlight("image_fetch")
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            from base import BOT_VERSION
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host),
+                timeout=self.timeout,
+                headers={"User-Agent": config.USER_AGENT % (BOT_VERSION, "Image Proxy")},
+            )
+        return self._session
+
+    async def fetch(self, url: str, expires: str="1d") -> Image:
+        return await self._fetches.do(url, self._fetch, url, expires)
+
+    async def _fetch(self, url: str, expires: str) -> Image:
+        try:
+            async with self._get_session().get(url) as response:
+                if response.status != 200:
+                    raise ImageFetchError(f"{url} responded with status {response.status}")
+                if not response.content_type.startswith("image/"):
+                    raise ImageFetchError(f"{url} is not an image ({response.content_type})")
+                if response.content_length is not None and response.content_length > self.max_size:
+                    raise ImageFetchError(f"{url} is larger than {self.max_size} bytes")
+                return await db.proxy.store_image_stream(
+                    url,
+                    response.content.iter_chunked(CHUNK_SIZE),
+                    expires,
+                    self.max_size
+                )
+        except BlobTooLarge:
+            raise ImageFetchError(f"{url} is larger than {self.max_size} bytes")
+        except (aiohttp.ClientError, TimeoutError) as e:
+            raise ImageFetchError(f"Failed to download {url}: {type(e).__name__} - {e}")
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+image_fetcher = ImageFetcher()
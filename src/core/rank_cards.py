@@ -0,0 +1,401 @@
+from concurrent.futures import ProcessPoolExecutor
+from humanfriendly import format_number
+from database.cache import LocalCache
+from typing import Optional
+from libs import canvas
+from libs.canvas import *
+
+import multiprocessing
+import functools
+import asyncio
+import config
+import math
+
+class RenderQueueFull(Exception):
+    pass
+
+def _init_worker(asset_cache_size: int):
+    canvas.assets = canvas.AssetCache(asset_cache_size)
+
+class RankCardRenderer:
+    """
+    Renders rank cards in a pool of worker processes.
+
+    At most ``max_queue`` cards are rendered or waiting at once, further
+    requests raise :class:`RenderQueueFull` instead of piling up. Each
+    worker keeps its own cache of downloaded avatars, banners and their
+    dominant colours, and finished cards are remembered here so the same
+    card is never rendered twice while it's cached.
+    """
+
+    def __init__(
+        self,
+        workers: int=config.RANK_CARD_WORKERS,
+        max_queue: int=config.RANK_CARD_QUEUE_SIZE,
+        cache_size: int=config.RANK_CARD_CACHE_SIZE,
+        cache_ttl: int=config.RANK_CARD_CACHE_TTL
+    ):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.cards = LocalCache("rank_card", cache_size, cache_ttl)
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Forking this process would copy TensorFlow's and the toxicity
+            # model's threads mid-flight, which can deadlock the workers
+            self._executor = ProcessPoolExecutor(
+                self.workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+                initializer=_init_worker,
+                initargs=(config.RANK_CARD_ASSET_CACHE_SIZE,)
+            )
+        return self._executor
+
+    async def render(
+        self,
+        member_id: str,
+        name: str,
+        level: int,
+        xp: int,
+        total_xp: int,
+        rank: int,
+        leveled_up: bool,
+        avatar: str,
+        banner: str
+    ) -> bytes:
+        key = (member_id, name, xp, rank, leveled_up, avatar, banner)
+        card = self.cards.get(key)
+        if card is not None:
+            return card
+
+        if self._pending >= self.max_queue:
+            raise RenderQueueFull
+        self._pending += 1
+        try:
+            card = await asyncio.get_running_loop().run_in_executor(
+                self._get_executor(),
+                functools.partial(
+                    generate_rank_card,
+                    name=name,
+                    level=level,
+                    xp=xp,
+                    total_xp=total_xp,
+                    rank=rank,
+                    leveled_up=leveled_up,
+                    avatar=avatar,
+                    banner=banner,
+                )
+            )
+        finally:
+            self._pending -= 1
+        self.cards.set(key, card)
+        return card
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+renderer = RankCardRenderer()
+
+def generate_rank_card(
+    name: str,
+    level: str,
+    xp: str,
+    total_xp: str,
+    rank: str,
+    leveled_up: bool,
+    avatar: str,
+    banner: str
+):
+    if len(name) > 17:
+        # Truncate the name so nothing weird happens
+        name = name[:17] + "..."
+
+    prev_total = get_xp(int(level) - 1)
+    xp_amount = xp - prev_total
+
+    avatar_size = (150, 150)
+    avatar_offset = (10, 10)
+    
+    text_padding = 5
+
+    canvas = Canvas(900, 290, background=(0, 0, 0, 0))
+    dominant_color = canvas.get_dominant_color(banner)
+    panel_alpha = int(255 * .5)
+    
+    rl_bounds = canvas.text_bounds(
+        (0, 0),
+        "Rank",
+        26
+    )
+    rl_bounds = (rl_bounds[0], rl_bounds[1], rl_bounds[2] + 3, rl_bounds[3])
+    rank_bounds = canvas.text_bounds(
+        (0, 0),
+        f"#{format_number(rank)}",
+        32,
+        bold=True
+    )
+    rank_bounds = (rank_bounds[0], rank_bounds[1], rank_bounds[2] + 3, rank_bounds[3])
+    ll_bounds = canvas.text_bounds(
+        (0, 0),
+        "Level",
+        26
+    )
+    ll_bounds = (ll_bounds[0], ll_bounds[1], ll_bounds[2] + 3, ll_bounds[3])
+    level_bounds = canvas.text_bounds(
+        (0, 0),
+        format_number(level),
+        32,
+        bold=True
+    )
+    level_bounds = (level_bounds[0], level_bounds[1], level_bounds[2] + 3, level_bounds[3])
+    bound_size = (
+        canvas.bound_width(rl_bounds) +
+        canvas.bound_width(rank_bounds) +
+        canvas.bound_width(ll_bounds) +
+        canvas.bound_width(level_bounds),
+        max(
+            canvas.bound_height(rl_bounds),
+            canvas.bound_height(rank_bounds),
+            canvas.bound_height(ll_bounds),
+            canvas.bound_height(level_bounds)
+        )
+    )
+    bound_size = (
+        bound_size[0] + text_padding * 2,
+        bound_size[1] + text_padding * 2
+    )
+    bound_offset = (
+        canvas.width - 10,
+        10
+    )
+    bound_start = (
+        (bound_offset[0] - bound_size[0]) + text_padding,
+        bound_offset[1] + text_padding
+    )
+    bound_bottom = bound_start[1] + bound_size[1] - text_padding * 2
+    
+    name_bounds = canvas.text_bounds(
+        (0, 0),
+        name,
+        32,
+        bold=True
+    )
+    name_bounds = (
+        name_bounds[0] - text_padding,
+        name_bounds[1] - text_padding,
+        name_bounds[2] + text_padding,
+        name_bounds[3] + text_padding
+    )
+    name_offset = (
+        canvas.width - 10 - canvas.bound_width(name_bounds),
+        10 + 10 + bound_size[1]
+    )
+    name_center = (
+        name_offset[0] + (name_bounds[2] - name_bounds[0]) // 2,
+        name_offset[1] + (name_bounds[3] - name_bounds[1]) // 2
+    )
+    
+    xp_offset = (
+        canvas.width - 10,
+        canvas.height - 10
+    )
+    xp_size = (470, 85)
+    
+    xp_bounds = canvas.text_bounds(
+        (0, 0),
+        format_number(int(xp)),
+        24,
+        bold=True
+    )
+    xp_total_bounds = canvas.text_bounds(
+        (0, 0),
+        f"/{int(total_xp)}",
+        18,
+        anchor="lb",
+        bold=True
+    )
+    
+    canvas.rounded_rectangle(
+        (0, 0),
+        (900, 290),
+        (0, 0),
+        6,
+        image=banner
+    )
+    
+    canvas.ellipse(
+        (avatar_offset[0], avatar_offset[1]),
+        (avatar_offset[0] + avatar_size[0], avatar_offset[1] + avatar_size[1]),
+        image=avatar,
+        outline=(65, 65, 65),
+        width=3
+    )
+    
+    canvas.rounded_rectangle(
+        (
+            xp_offset[0] - xp_size[0],
+            xp_offset[1] - xp_size[1],
+        ),
+        xp_size,
+        radius=8,
+        alpha=panel_alpha,
+        fill="#000000",
+        filters=[
+            BlurBehind()
+        ]
+    )
+    canvas.rounded_rectangle(
+        (
+            xp_offset[0] - xp_size[0] + 5,
+            xp_offset[1] - 40 - 5,
+        ),
+        (
+            xp_size[0] - 10,
+            40
+        ),
+        radius=6,
+        fill=(dominant_color[0] // 2, dominant_color[1] // 2, dominant_color[2] // 2),
+        outline=(65, 65, 65),
+        width=3
+    )
+    canvas.rounded_rectangle(
+        (
+            xp_offset[0] - xp_size[0] + 5 + 3,
+            xp_offset[1] - 40 - 5 + 3,
+        ),
+        (
+            xp_size[0] - 10 - 5,
+            40 - 5
+        ),
+        radius=5,
+        fill=dominant_color,
+        crop=(
+            0,
+            0,
+            int(xp_size[0] * (xp_amount / (total_xp - prev_total))),
+            xp_size[1]
+        )
+    )
+    canvas.text(
+        (
+            xp_offset[0] - xp_size[0] + 5,
+            xp_offset[1] - xp_size[1] + 5
+        ),
+        format_number(int(xp)),
+        24,
+        bold=True,
+        fill="#ffffff"
+    )
+    canvas.text(
+        (
+            xp_offset[0] - xp_size[0] + 10 + canvas.bound_width(xp_bounds),
+            xp_offset[1] - xp_size[1] + 5 +
+                canvas.bound_height(xp_bounds) -
+                canvas.bound_height(xp_total_bounds)
+        ),
+        f"/{format_number(int(total_xp))}",
+        18,
+        bold=True,
+        fill=(215, 215, 215)
+    )
+    
+    canvas.rounded_rectangle(
+        name_offset,
+        (abs(name_bounds[0] - name_bounds[2]), abs(name_bounds[1] - name_bounds[3])),
+        radius=8,
+        alpha=panel_alpha,
+        fill="#000000",
+        filters=[
+            BlurBehind()
+        ]
+    )
+    canvas.text(
+        name_center,
+        name,
+        32,
+        bold=True,
+        anchor="mm",
+        fill="#ffffff"
+    )
+    
+    canvas.rounded_rectangle(
+        (
+            bound_start[0] - text_padding,
+            bound_start[1] - text_padding,
+        ),
+        bound_size,
+        radius=8,
+        alpha=panel_alpha,
+        fill="#000000",
+        filters=[
+            BlurBehind()
+        ]
+    )
+    canvas.text(
+        (bound_start[0], bound_bottom),
+        "Rank",
+        26,
+        anchor="lb",
+        fill="#ffffff"
+    )
+    canvas.text(
+        (bound_start[0] + canvas.bound_width(rl_bounds), bound_bottom),
+        f"#{format_number(rank)}",
+        32,
+        anchor="lb",
+        bold=True,
+        fill="#ffd700"
+    )
+    canvas.text(
+        (
+            bound_start[0] +
+            canvas.bound_width(rl_bounds) +
+            canvas.bound_width(rank_bounds),
+            bound_bottom
+        ),
+        "Level",
+        26,
+        anchor="lb",
+        fill="#ffffff"
+    )
+    canvas.text(
+        (
+            bound_start[0] +
+            canvas.bound_width(rl_bounds) +
+            canvas.bound_width(rank_bounds) +
+            canvas.bound_width(ll_bounds),
+            bound_bottom
+        ),
+        format_number(level),
+        32,
+        anchor="lb",
+        bold=True,
+        fill="#ffd700"
+    )
+    
+    if leveled_up:
+        canvas.text(
+            (
+                xp_offset[0] - 5,
+                xp_offset[1] - xp_size[1] + 5
+            ),
+            "LEVEL UP!",
+            18,
+            bold=True,
+            italic=True,
+            fill="#ffd700",
+            anchor="ra"
+        )
+    
+    return canvas.save_bytes()
+
+def get_level(xp: int):
+    return (xp < 0 and -math.ceil(math.sqrt(abs(xp))) or math.floor(math.sqrt(abs(xp)))) + 1
+
+def get_xp(level: int):
+    return level < 0 and -math.pow(level - 1, 2) or math.pow(level - 1, 2)
\ No newline at end of file
@@ -0,0 +1,147 @@
+from database import valkey
+from guilded.ext import commands
+from core.xp import xp_aggregator
+from typing import Iterable, List
+
+import database as db
+import asyncio
+import guilded
+import config
+
+# Ids of servers already reconciled by the current sync, kept around long
+# enough for a restarted process to pick up where the last one stopped.
+PROGRESS_KEY = "startup_sync:completed"
+PROGRESS_TTL = 60 * 60 * 6
+
+def _batched(items: List, size: int) -> Iterable[List]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+class StartupReconciler:
+    """
+    Brings the database in line with every server the bot is in.
+
+    Each server's members are diffed against its ``guild_user`` rows with a
+    single query and only the missing rows are written, using multi-row
+    inserts. Servers are processed concurrently, and completed servers are
+    recorded in valkey so a restart mid-sync resumes instead of starting over.
+    """
+
+    def __init__(
+        self,
+        bot: commands.Bot,
+        concurrency: int=config.STARTUP_SYNC_CONCURRENCY,
+        batch_size: int=config.STARTUP_SYNC_BATCH_SIZE
+    ):
+        self.bot = bot
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.running = False
+
+        self.total = 0
+        self.completed = 0
+        self.failed = 0
+
+    async def run(self):
+        if self.running:
+            return
+        self.running = True
+        try:
+            await self._run()
+        finally:
+            self.running = False
+
+    async def _run(self):
+        servers = await self.bot.fetch_servers()
+        done = {server_id.decode("utf-8") for server_id in await valkey.smembers(PROGRESS_KEY)}
+        pending = [server for server in servers if server.id not in done]
+
+        self.total = len(servers)
+        self.completed = self.total - len(pending)
+        self.failed = 0
+        if self.completed > 0:
+            print(f"Resuming startup sync, {self.completed}/{self.total} servers already reconciled")
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def worker(server: guilded.Server):
+            async with semaphore:
+                try:
+                    await self.reconcile_server(server)
+                except Exception as e:
+                    self.failed += 1
+                    print(f"Failed to reconcile server {server.id} with database: {e}")
+                    return
+            self.completed += 1
+            await valkey.sadd(PROGRESS_KEY, server.id)
+            await valkey.expire(PROGRESS_KEY, PROGRESS_TTL)
+            print(f"Reconciled server {server.name} ({server.id}) [{self.completed}/{self.total}]")
+
+        await asyncio.gather(*[worker(server) for server in pending])
+
+        if self.failed == 0:
+            await valkey.delete(PROGRESS_KEY)
+            print(f"Startup sync finished, reconciled {self.total} servers")
+        else:
+            print(f"Startup sync finished, {self.failed}/{self.total} servers failed and will be retried on next startup")
+
+    async def reconcile_server(self, server: guilded.Server):
+        if server.member_count == 0:
+            await server.fill_members()
+
+        guild = await db.servers.fetch_or_create_server(server)
+
+        me = await server.getch_member(self.bot.user_id)
+        if me.nick != None and me.nick != guild.settings.get("nickname"):
+            try:
+                await guild.update_settings(
+                    nickname=me.nick
+                )
+            except Exception as e:
+                print(f"Failed to update nickname for server {server.id} in database: {e}")
+
+        states = await guild.list_member_states()
+        missing = [
+            member for member in server.members
+            if not member.bot and member.id not in states
+        ]
+
+        for batch in _batched(missing, self.batch_size):
+            await db.users.create_users([
+                {
+                    "id": member.id,
+                    "name": member.name,
+                    "avatar": member.display_avatar.url,
+                } for member in batch
+            ])
+
+        # XP isn't part of the member list, so it has to be read per new member
+        xp_semaphore = asyncio.Semaphore(10)
+        async def member_row(member: guilded.Member) -> dict:
+            async with xp_semaphore:
+                try:
+                    xp = await xp_aggregator.get_xp(member)
+                except:
+                    xp = 0
+            perms = guild.permissions_for(member._role_ids, member.id == server.owner_id)
+            return {
+                "user_id": member.id,
+                "perms": str(perms),
+                "xp": xp,
+                "is_banned": False,
+                "can_access_dash": perms.can_access_dash,
+            }
+
+        for batch in _batched(missing, self.batch_size):
+            rows = await asyncio.gather(*[member_row(member) for member in batch])
+            await guild.create_members(rows)
+
+        # Rebuilt from the stored totals in case valkey lost it
+        await db.servers.leaderboard.seed(guild.id)
+
+        banned = [
+            ban.user.id for ban in await server.bans()
+            if not ban.user.bot and states.get(ban.user.id) is False
+        ]
+        for batch in _batched(banned, self.batch_size):
+            await guild.set_members_banned(batch, True)
@@ -0,0 +1,150 @@
+from prometheus_client import Gauge, Histogram
+from typing import Dict, List, Optional, Tuple
+
+import traceback
+import threading
+import asyncio
+import queue
+import time
+import config
+
+TOXICITY_BATCH_SIZE = Histogram(
+    'toxicity_batch_size',
+    'Number of texts scored per toxicity model call',
+    buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+TOXICITY_QUEUE_DEPTH = Gauge(
+    'toxicity_queue_depth',
+    'Texts waiting to be scored by the toxicity model'
+)
+TOXICITY_INFERENCE_SECONDS = Histogram(
+    'toxicity_inference_seconds',
+    'Time spent in one toxicity model call'
+)
+TOXICITY_REQUEST_SECONDS = Histogram(
+    'toxicity_request_seconds',
+    'Time from a text being queued to its scores being returned'
+)
+
+# Tells the worker to stop
+_STOP = object()
+
+Request = Tuple[str, asyncio.AbstractEventLoop, asyncio.Future]
+
+class ToxicityService:
+    """
+    Scores text with the toxicity model on a dedicated thread.
+
+    The model and tokenizer are loaded once and stay resident in the
+    worker. Requests made close together are scored together: the worker
+    takes the first waiting text, then keeps collecting for up to
+    ``max_wait`` milliseconds or until it has ``batch_size`` of them, and
+    runs them through the model as a single batch.
+    """
+
+    def __init__(
+        self,
+        batch_size: int=config.TOXICITY_BATCH_SIZE,
+        max_wait: int=config.TOXICITY_MAX_WAIT
+    ):
+        self.batch_size = batch_size
+        self.max_wait = max_wait / 1000
+
+        self._queue: "queue.Queue[Request]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._ready: Optional[asyncio.Future] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._ready is not None and self._ready.done() and self._ready.exception() is None
+
+    async def start(self):
+        """Starts the worker and waits for the model to load."""
+        if self._thread is None:
+            loop = asyncio.get_running_loop()
+            self._ready = loop.create_future()
+            self._thread = threading.Thread(target=self._run, args=(loop,), name="toxicity", daemon=True)
+            self._thread.start()
+        await asyncio.shield(self._ready)
+
+    async def predict(self, text: str) -> Dict[str, float]:
+        """Returns the model's score for each of its classes."""
+        if not self.ready:
+            raise RuntimeError("The toxicity model hasn't been loaded")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        started = time.perf_counter()
+        self._queue.put((text, loop, future))
+        TOXICITY_QUEUE_DEPTH.inc()
+        try:
+            return await future
+        finally:
+            TOXICITY_REQUEST_SECONDS.observe(time.perf_counter() - started)
+
+    def _run(self, loop: asyncio.AbstractEventLoop):
+        import filters.evaluation as evaluation
+        try:
+            model = evaluation._load_model()
+            if model is None:
+                raise RuntimeError("Failed to load the toxicity model")
+            tokenizer = evaluation.load_tokenizer()
+        except Exception as e:
+            loop.call_soon_threadsafe(_resolve, self._ready, None, e)
+            return
+        loop.call_soon_threadsafe(_resolve, self._ready, None, None)
+
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            TOXICITY_QUEUE_DEPTH.dec(len(batch))
+            TOXICITY_BATCH_SIZE.observe(len(batch))
+            started = time.perf_counter()
+            try:
+                results = evaluation.predict_batch([text for text, _, _ in batch], model, tokenizer)
+            except Exception as e:
+                traceback.print_exc()
+                for _, request_loop, future in batch:
+                    request_loop.call_soon_threadsafe(_resolve, future, None, e)
+                continue
+            finally:
+                TOXICITY_INFERENCE_SECONDS.observe(time.perf_counter() - started)
+            for (_, request_loop, future), result in zip(batch, results):
+                request_loop.call_soon_threadsafe(_resolve, future, result, None)
+
+    def _collect(self) -> Optional[List[Request]]:
+        request = self._queue.get()
+        if request is _STOP:
+            return None
+        batch = [request]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is _STOP:
+                # Score what was already taken, then stop on the next call
+                self._queue.put(_STOP)
+                break
+            batch.append(request)
+        return batch
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread = None
+
+def _resolve(future: asyncio.Future, result, exception: Optional[BaseException]):
+    # The caller may have stopped waiting, e.g. on a timeout
+    if future.done():
+        return
+    if exception is not None:
+        future.set_exception(exception)
+    else:
+        future.set_result(result)
+
+toxicity_service = ToxicityService()
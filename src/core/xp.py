@@ -0,0 +1,264 @@
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from redis.exceptions import ResponseError
+from database import valkey
+
+import database as db
+import traceback
+import asyncio
+import uuid
+import guilded
+import config
+
+# Deltas still to be awarded, as one hash of "guild:member" -> xp
+PENDING_KEY = "xp:pending"
+# Deltas claimed by the flush currently running. Left behind if the
+# process dies mid-flush, in which case the next flush finishes them.
+FLUSHING_KEY = "xp:flushing"
+# Held by the process running a flush, so deltas are only awarded once
+FLUSH_LOCK_KEY = "xp:flush_lock"
+# Seconds after which a lock left by a dead process is given up on
+FLUSH_LOCK_TIMEOUT = 300
+
+# Deletes the lock only if this process still holds it
+RELEASE_LOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+Listener = Callable[[guilded.Member, int, int, Optional[guilded.ChatMessage]], Awaitable[None]]
+
+def _totals_key(guild_id: str) -> str:
+    return f"xp:total:{guild_id}"
+
+def _field(guild_id: str, member_id: str) -> str:
+    return f"{guild_id}:{member_id}"
+
+class XPAggregator:
+    """
+    Accumulates XP awards and hands them to Guilded in batches.
+
+    Awards are added to a valkey hash with HINCRBY and flushed every
+    ``interval`` seconds as a single award per member, after which every
+    updated total is written to ``guild_user.xp`` with one query per
+    server. The last total Guilded reported for each member is kept so
+    reads don't need an API call, and listeners are told about every
+    flushed change so level-ups can be announced.
+    """
+
+    def __init__(
+        self,
+        bot: guilded.Client=None,
+        interval: int=config.XP_FLUSH_INTERVAL,
+        concurrency: int=config.XP_FLUSH_CONCURRENCY
+    ):
+        self.bot = bot
+        self.interval = interval
+        self.concurrency = concurrency
+        self.listeners: List[Listener] = []
+
+        # The message that most recently earned each member XP, used to
+        # reply with level-up announcements
+        self._messages: Dict[str, guilded.ChatMessage] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+
+    def register(self, listener: Listener):
+        self.listeners.append(listener)
+
+    def start(self, bot: guilded.Client):
+        self.bot = bot
+        if self._task is None:
+            self._stopping = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def add(self, member: guilded.Member, amount: int, message: guilded.ChatMessage=None):
+        field = _field(member.server.id, member.id)
+        await valkey.hincrby(PENDING_KEY, field, amount)
+        if message is not None:
+            self._messages[field] = message
+
+    async def get_xp(self, member: guilded.Member) -> int:
+        """Returns the member's XP including awards that haven't been flushed yet."""
+        field = _field(member.server.id, member.id)
+        total, pending, flushing = await asyncio.gather(
+            valkey.hget(_totals_key(member.server.id), member.id),
+            valkey.hget(PENDING_KEY, field),
+            valkey.hget(FLUSHING_KEY, field),
+        )
+        if total is None:
+            total = await member.award_xp(0)
+            await self.observe(member.server.id, member.id, total)
+        return int(total) + int(pending or 0) + int(flushing or 0)
+
+    async def known_total(self, guild_id: str, member_id: str) -> Optional[int]:
+        """The last total Guilded reported for this member, if any."""
+        total = await valkey.hget(_totals_key(guild_id), member_id)
+        return int(total) if total is not None else None
+
+    async def observe(self, guild_id: str, member_id: str, total: int):
+        """Records a total reported by Guilded, e.g. from an XP event."""
+        await valkey.hset(_totals_key(guild_id), member_id, total)
+        await valkey.expire(_totals_key(guild_id), config.XP_TOTALS_TTL)
+
+    async def set_xp(self, server: guilded.Server, members: List[guilded.Member], xp: int) -> List[guilded.Member]:
+        """
+        Sets the XP of several members, discarding their pending awards.
+        Returns the members that were updated.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        fields = [_field(server.id, member.id) for member in members]
+        await valkey.hdel(PENDING_KEY, *fields)
+        await valkey.hdel(FLUSHING_KEY, *fields)
+
+        async def update(member: guilded.Member) -> bool:
+            async with semaphore:
+                try:
+                    await member.set_xp(xp)
+                except Exception as e:
+                    print(f"Failed to set XP of {member.id} in server {server.id}: {type(e).__name__} - {e}")
+                    return False
+            await self.observe(server.id, member.id, xp)
+            return True
+
+        results = await asyncio.gather(*[update(member) for member in members])
+        updated = [member for member, ok in zip(members, results) if ok]
+        try:
+            guild = await db.servers.fetch_or_create_server(server)
+            await guild.set_members_xp([{"user_id": member.id, "xp": xp} for member in updated])
+        except Exception as e:
+            print(f"Failed to store XP for server {server.id} in database: {type(e).__name__} - {e}")
+        return updated
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                return
+            try:
+                await self.flush()
+            except Exception:
+                traceback.print_exc()
+
+    async def _claim(self) -> Dict[str, Dict[str, int]]:
+        if not await valkey.exists(FLUSHING_KEY):
+            try:
+                await valkey.renamenx(PENDING_KEY, FLUSHING_KEY)
+            except ResponseError:
+                # Nothing has been awarded since the last flush
+                return {}
+        by_guild: Dict[str, Dict[str, int]] = {}
+        for field, delta in (await valkey.hgetall(FLUSHING_KEY)).items():
+            guild_id, member_id = field.decode("utf-8").split(":", 1)
+            by_guild.setdefault(guild_id, {})[member_id] = int(delta)
+        return by_guild
+
+    async def flush(self):
+        token = uuid.uuid4().hex
+        if not await valkey.set(FLUSH_LOCK_KEY, token, nx=True, ex=FLUSH_LOCK_TIMEOUT):
+            # Another process is flushing
+            return
+        try:
+            by_guild = await self._claim()
+            if len(by_guild) == 0:
+                return
+            semaphore = asyncio.Semaphore(self.concurrency)
+            # Every field is removed from FLUSHING_KEY as it's awarded,
+            # dropped or requeued, which deletes the hash once it's empty
+            await asyncio.gather(*[
+                self._flush_guild(guild_id, deltas, semaphore)
+                for guild_id, deltas in by_guild.items()
+            ])
+        finally:
+            await valkey.eval(RELEASE_LOCK_SCRIPT, 1, FLUSH_LOCK_KEY, token)
+
+    async def _requeue(self, guild_id: str, deltas: Dict[str, int]):
+        """Moves deltas that failed to be awarded back to be retried on the next flush."""
+        async with valkey.pipeline(transaction=True) as pipe:
+            for member_id, delta in deltas.items():
+                field = _field(guild_id, member_id)
+                pipe.hincrby(PENDING_KEY, field, delta)
+                pipe.hdel(FLUSHING_KEY, field)
+            await pipe.execute()
+
+    async def _discard(self, guild_id: str, member_ids: List[str]):
+        await valkey.hdel(FLUSHING_KEY, *[_field(guild_id, member_id) for member_id in member_ids])
+
+    async def _flush_guild(self, guild_id: str, deltas: Dict[str, int], semaphore: asyncio.Semaphore):
+        try:
+            server = await self.bot.getch_server(guild_id)
+        except Exception as e:
+            for member_id in deltas:
+                self._messages.pop(_field(guild_id, member_id), None)
+            if isinstance(e, guilded.NotFound):
+                print(f"Dropping XP awards for server {guild_id}: {type(e).__name__} - {e}")
+                await self._discard(guild_id, list(deltas))
+            else:
+                print(f"Failed to fetch server {guild_id} to award XP, retrying next flush: {type(e).__name__} - {e}")
+                await self._requeue(guild_id, deltas)
+            return
+
+        async def award(member_id: str, delta: int) -> Optional[Tuple[guilded.Member, int, int, Optional[guilded.ChatMessage]]]:
+            field = _field(guild_id, member_id)
+            message = self._messages.pop(field, None)
+            if delta == 0:
+                await self._discard(guild_id, [member_id])
+                return None
+            async with semaphore:
+                try:
+                    member = await server.getch_member(member_id)
+                    total = await member.award_xp(delta)
+                except guilded.NotFound as e:
+                    # The member left the server
+                    print(f"Dropping {delta} XP for {member_id} in server {guild_id}: {type(e).__name__} - {e}")
+                    await self._discard(guild_id, [member_id])
+                    return None
+                except Exception as e:
+                    print(f"Failed to award {delta} XP to {member_id} in server {guild_id}, retrying next flush: {type(e).__name__} - {e}")
+                    await self._requeue(guild_id, {member_id: delta})
+                    return None
+            # Both in one transaction so reads never count the delta twice
+            async with valkey.pipeline(transaction=True) as pipe:
+                pipe.hset(_totals_key(guild_id), member_id, total)
+                pipe.expire(_totals_key(guild_id), config.XP_TOTALS_TTL)
+                pipe.hdel(FLUSHING_KEY, field)
+                await pipe.execute()
+            return member, total - delta, total, message
+
+        results = [
+            result for result in await asyncio.gather(*[
+                award(member_id, delta) for member_id, delta in deltas.items()
+            ]) if result is not None
+        ]
+        if len(results) == 0:
+            return
+
+        try:
+            guild = await db.servers.fetch_or_create_server(server)
+            await guild.set_members_xp([
+                {"user_id": member.id, "xp": total} for member, _, total, _ in results
+            ])
+        except Exception as e:
+            print(f"Failed to store XP for server {guild_id} in database: {type(e).__name__} - {e}")
+
+        for member, prev_xp, xp, message in results:
+            for listener in self.listeners:
+                try:
+                    await listener(member, prev_xp, xp, message)
+                except Exception:
+                    traceback.print_exc()
+
+    async def close(self):
+        # Never cancelled, a flush interrupted after an award but before
+        # its delta is removed would award it again on the next start
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+xp_aggregator = XPAggregator()
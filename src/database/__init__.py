@@ -6,6 +6,7 @@ from .database_model import DatabaseModel
 
 from .exceptions import *
 from .valkey import valkey
+from .cache import LocalCache
 
 encoder = json.JSONEncoder()
 decoder = json.JSONDecoder()
@@ -6,7 +6,7 @@ from datetime import datetime
 from .item import AnalyticsItem
 
 async def get_analytics_item(key: str, date: datetime) -> AnalyticsItem:
-    cached = valkey.get(f"db:analytics:{key}:{date.isoformat()}")
+    cached = await valkey.get(f"db:analytics:{key}:{date.isoformat()}")
     if cached:
         return AnalyticsItem(decoder.decode(cached.decode("utf-8")))
     async with DBConnection() as db:
@@ -19,7 +19,7 @@ async def get_analytics_item(key: str, date: datetime) -> AnalyticsItem:
             raise DatabaseError(str(e))
         else:
             if resultExists(response):
-                valkey.set(f"db:analytics:{key}:{date.isoformat()}", encoder.encode(response["result"][0]), 30)
+                await valkey.set(f"db:analytics:{key}:{date.isoformat()}", encoder.encode(response["result"][0]), 30)
                 return AnalyticsItem(response["result"][0])
             else:
                 raise NotFound
\ No newline at end of file
@@ -5,7 +5,7 @@ from surrealdb.ws import SurrealException
 from .token import *
 
 async def get_token(id: str):
-    cached = valkey.get(f"db:user_token:{id}")
+    cached = await valkey.get(f"db:user_token:{id}")
     if cached:
         raw = decoder.decode(cached.decode("utf-8"))
         if raw["type"] == "login":
@@ -24,7 +24,7 @@ async def get_token(id: str):
         else:
             if resultExists(response):
                 raw = response[0]["result"][0]
-                valkey.set(f"db:user_token:{id}", encoder.encode(raw), 60)
+                await valkey.set(f"db:user_token:{id}", encoder.encode(raw), 60)
                 if raw["type"] == "login":
                     return LoginToken(raw)
                 elif raw["type"] == "verify":
@@ -52,7 +52,7 @@ async def create_login_token(
             raise DatabaseError(str(e))
         else:
             token = LoginToken(response[0]["result"][0])
-            valkey.set(f"db:user_token:{token.id}", encoder.encode(token.__raw), 60)
+            await valkey.set(f"db:user_token:{token.id}", encoder.encode(token.__raw), 60)
             return token
 
 async def create_verify_token(
@@ -69,7 +69,7 @@ async def create_verify_token(
             raise DatabaseError(str(e))
         else:
             token = VerifyToken(response[0]["result"][0])
-            valkey.set(f"db:user_token:{token.id}", encoder.encode(token.__raw), 60)
+            await valkey.set(f"db:user_token:{token.id}", encoder.encode(token.__raw), 60)
             return token
 
 async def blacklist_refresh_token(id: str, expires: int):
@@ -18,7 +18,7 @@ class UserToken(DatabaseModel):
             except SurrealException as e:
                 raise DatabaseError(str(e))
             else:
-                valkey.delete(f"db:user_token:{self.id}")
+                await valkey.delete(f"db:user_token:{self.id}")
 
 class LoginToken(UserToken):
     def __init__(self, data: dict):
@@ -42,7 +42,7 @@ class LoginToken(UserToken):
                 raise DatabaseError(str(e))
             else:
                 self.__raw["user_id"] = user_id
-                valkey.set(f"db:user_token:{self.id}", encoder.encode(self.__raw), 60)
+                await valkey.set(f"db:user_token:{self.id}", encoder.encode(self.__raw), 60)
 
 class VerifyToken(UserToken):
     def __init__(self, data: dict):
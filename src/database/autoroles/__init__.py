@@ -24,12 +24,14 @@ async def schedule_autorole(server_id: str, user_id: str, autorole: str):
             raise DatabaseError(str(e))
         else:
             if resultExists(response):
-                return statuses.Autorole(response[0]["result"])
+                status = statuses.Autorole(response[0]["result"][0])
+                statuses.scheduler.schedule(status)
+                return status
             else:
                 raise DatabaseError("An unknown issue occurred")
 
 async def list_autoroles(server_id: str):
-    cached = valkey.get(f"db:autoroles:{server_id}")
+    cached = await valkey.get(f"db:autoroles:{server_id}")
     if cached:
         return [Autorole(config) for config in decoder.decode(cached)]
     async with DBConnection() as db:
@@ -42,13 +44,13 @@ async def list_autoroles(server_id: str):
             raise DatabaseError(str(e))
         else:
             if resultExists(response):
-                valkey.set(f"db:autoroles:{server_id}", encoder.encode(response[0]["result"]), 700)
+                await valkey.set(f"db:autoroles:{server_id}", encoder.encode(response[0]["result"]), 700)
                 return [Autorole(config) for config in response[0]["result"]]
             else:
                 raise DatabaseError("An unknown issue occurred")
 
 async def get_autorole(id: str):
-    cached = valkey.get(f"db:autorole:{id}")
+    cached = await valkey.get(f"db:autorole:{id}")
     if cached:
         return Autorole(decoder.decode(cached))
     async with DBConnection() as db:
@@ -91,7 +93,7 @@ async def create_autorole(
         else:
             if resultExists(response):
                 result = Autorole(response[0]["result"])
-                valkey.set(f"db:autorole:{result.id}", encoder.encode(result), 700)
+                await valkey.set(f"db:autorole:{result.id}", encoder.encode(result), 700)
                 return result
             else:
                 raise DatabaseError("An unknown issue occurred")
\ No newline at end of file
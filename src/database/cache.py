@@ -0,0 +1,159 @@
+from prometheus_client import Counter, Gauge
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+from .valkey import valkey
+
+import traceback
+import asyncio
+import json
+import time
+import uuid
+
+INVALIDATION_CHANNEL = "db:invalidate"
+
+# Identifies this process so it can ignore its own invalidation broadcasts
+NODE_ID = uuid.uuid4().hex
+
+CACHE_HITS = Counter(
+    'l1_cache_hits',
+    'In-process cache hits',
+    ['cache']
+)
+CACHE_MISSES = Counter(
+    'l1_cache_misses',
+    'In-process cache misses',
+    ['cache']
+)
+CACHE_EVICTIONS = Counter(
+    'l1_cache_evictions',
+    'In-process cache evictions',
+    ['cache', 'reason']
+)
+CACHE_SIZE = Gauge(
+    'l1_cache_size',
+    'Number of entries held by an in-process cache',
+    ['cache']
+)
+
+caches: Dict[str, "LocalCache"] = {}
+
+class LocalCache:
+    """
+    A bounded, in-process LRU cache whose entries expire after ``ttl`` seconds.
+
+    Caches are registered by name so invalidations published by other
+    processes through valkey can be applied to the matching cache.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        caches[name] = self
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            CACHE_MISSES.labels(self.name).inc()
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            self._discard(key, "expired")
+            CACHE_MISSES.labels(self.name).inc()
+            return None
+        self._entries.move_to_end(key)
+        CACHE_HITS.labels(self.name).inc()
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._discard(next(iter(self._entries)), "size")
+        CACHE_SIZE.labels(self.name).set(len(self._entries))
+
+    def discard(self, key: Hashable):
+        """Removes a key from this process' cache only."""
+        self._discard(key, "invalidated")
+
+    def clear(self):
+        self._entries.clear()
+        CACHE_SIZE.labels(self.name).set(0)
+
+    def _discard(self, key: Hashable, reason: str):
+        if self._entries.pop(key, None) is not None:
+            CACHE_EVICTIONS.labels(self.name, reason).inc()
+            CACHE_SIZE.labels(self.name).set(len(self._entries))
+
+    async def invalidate(self, key: Hashable):
+        """Removes a key locally and tells every other process to do the same."""
+        self.discard(key)
+        try:
+            await valkey.publish(INVALIDATION_CHANNEL, json.dumps({
+                "cache": self.name,
+                "key": key,
+                "origin": NODE_ID,
+            }))
+        except Exception:
+            traceback.print_exc()
+
+async def listen_for_invalidations():
+    """
+    Applies invalidations broadcast by other processes for as long as the
+    process runs, resubscribing with backoff if the connection drops.
+    """
+    delay = 1
+    while True:
+        pubsub = valkey.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            delay = 1
+            async for message in pubsub.listen():
+                try:
+                    payload = json.loads(message["data"])
+                except (TypeError, ValueError):
+                    continue
+                if payload.get("origin") == NODE_ID:
+                    continue
+                cache = caches.get(payload.get("cache"))
+                if cache is not None:
+                    cache.discard(payload.get("key"))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            traceback.print_exc()
+            # Anything published while disconnected was missed
+            for cache in caches.values():
+                cache.clear()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+        finally:
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
+
+class InvalidationListener:
+    """Runs :func:`listen_for_invalidations` in the background until closed."""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(listen_for_invalidations())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+invalidation_listener = InvalidationListener()
@@ -4,7 +4,7 @@ from surrealdb.ws import SurrealException
 from typing import Any
 
 async def get(key: str):
-    cached = valkey.get(f"db:data:{key}")
+    cached = await valkey.get(f"db:data:{key}")
     if cached:
         return decoder.decode(cached)["value"]
     async with DBConnection() as db:
@@ -16,7 +16,7 @@ async def get(key: str):
             raise DatabaseError(str(e))
         else:
             if resultExists(result):
-                valkey.set(f"db:data:{key}", encoder.encode({"value": result["results"][0]["value"]}), 86400)
+                await valkey.set(f"db:data:{key}", encoder.encode({"value": result["results"][0]["value"]}), 86400)
                 return result["results"][0]["value"]
             else:
                 raise NotFound()
@@ -31,7 +31,7 @@ async def set(key: str, value: Any):
         except SurrealException as e:
             raise DatabaseError(str(e))
         else:
-            valkey.set(f"db:data:{key}", encoder.encode({"value": value}), 86400)
+            await valkey.set(f"db:data:{key}", encoder.encode({"value": value}), 86400)
             return value
 
 async def increment(key: str, value: int):
@@ -45,7 +45,7 @@ async def increment(key: str, value: int):
             raise DatabaseError(str(e))
         else:
             if resultExists(response):
-                valkey.set(f"db:data:{key}", encoder.encode({"value": response["results"][0]["value"]}), 86400)
+                await valkey.set(f"db:data:{key}", encoder.encode({"value": response["results"][0]["value"]}), 86400)
                 return response["results"][0]["value"]
             else:
                 raise DatabaseError("Failed to increment bot data.")
@@ -61,7 +61,7 @@ async def decrement(key: str, value: int):
             raise DatabaseError(str(e))
         else:
             if resultExists(response):
-                valkey.set(f"db:data:{key}", encoder.encode({"value": response["results"][0]["value"]}), 86400)
+                await valkey.set(f"db:data:{key}", encoder.encode({"value": response["results"][0]["value"]}), 86400)
                 return response["results"][0]["value"]
             else:
                 raise DatabaseError("Failed to decrement bot data.")
\ No newline at end of file
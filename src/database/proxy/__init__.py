@@ -1,36 +1,72 @@
 from database import DBConnection, loadQuery, resultExists, valkey, encoder, decoder
 from database.exceptions import DatabaseError, NotFound
 from surrealdb.ws import SurrealException
+from typing import AsyncIterable
 
+from .blobs import BlobStore, BlobTooLarge, sniff_mime
 from .image import Image
+from .reaper import ImageReaper
 
-import io
-import base64
+import config
+import time
+
+blobs = BlobStore(config.IMAGE_STORE_PATH)
+reaper = ImageReaper(blobs)
 
 async def store_image(
     source: str,
     data: bytes,
     expires: str="1d"
 ) -> Image:
-    buffer = io.BytesIO(data)
-    buffer.seek(0)
-    async with DBConnection() as db:
+    if source:
         try:
-            existing_image = await get_image(self, source=source)
+            return await get_image(source=source)
         except NotFound:
-            try:
-                response = await db.query(loadQuery("storeImage"), {
-                    "source_url": source,
-                    "data": base64.b64encode(buffer.read()).decode("utf-8"),
-                    "expires": expires
-                })
-            except SurrealException as e:
-                raise DatabaseError(str(e))
-            else:
-                if resultExists(response):
-                    return Image(response[0]["result"][0])
+            pass
+
+    # Written before the row exists so a served row always has its blob
+    hash, size = await blobs.put(data)
+    return await create_image(source, hash, sniff_mime(data), size, expires)
+
+async def store_image_stream(
+    source: str,
+    chunks: AsyncIterable[bytes],
+    expires: str="1d",
+    max_size: int=None
+) -> Image:
+    """
+    Like :func:`store_image`, but writes the blob as ``chunks`` arrive
+    instead of holding the whole image in memory.
+    """
+    hash, size, head = await blobs.put_stream(chunks, max_size)
+    return await create_image(source, hash, sniff_mime(head), size, expires)
+
+async def create_image(source: str, hash: str, mime: str, size: int, expires: str) -> Image:
+    async with DBConnection() as db:
+        try:
+            response = await db.query(loadQuery("storeImage"), {
+                "source_url": source,
+                "hash": hash,
+                "mime": mime,
+                "size": size,
+                "expires": expires
+            })
+        except SurrealException as e:
+            raise DatabaseError(str(e))
         else:
-            return existing_image
+            if resultExists(response):
+                raw = response[0]["result"][0]
+                await cache_image(raw)
+                await reaper.schedule(raw["id"], raw["expires_at"])
+                return Image(raw)
+            else:
+                raise DatabaseError(response[0]["result"])
+
+async def cache_image(raw: dict):
+    # Images never change once stored, so the metadata can be cached until it expires
+    ttl = int(raw["expires_at"] - time.time())
+    if ttl > 0:
+        await valkey.set(f"db:image:{raw['id']}", encoder.encode(raw), ttl)
 
 async def get_image(
     id: str=None,
@@ -40,6 +76,10 @@ async def get_image(
         raise ValueError("Cannot specify both id and source")
     elif id == None and source == None:
         raise ValueError("Must specify either id or source")
+    if id != None:
+        cached = await valkey.get(f"db:image:{id}")
+        if cached:
+            return Image(decoder.decode(cached.decode("utf-8")))
     async with DBConnection() as db:
         try:
             response = await db.query(loadQuery("getImage"), {
@@ -50,13 +90,8 @@ async def get_image(
             raise DatabaseError(str(e))
         else:
             if resultExists(response):
-                return Image(response[0]["result"][0])
+                raw = response[0]["result"][0]
+                await cache_image(raw)
+                return Image(raw)
             else:
                 raise NotFound
-
-async def cleanup_images():
-    async with DBConnection() as db:
-        try:
-            response = await db.query(loadQuery("cleanupImages"))
-        except SurrealException as e:
-            raise DatabaseError(str(e))
\ No newline at end of file
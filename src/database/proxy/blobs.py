@@ -0,0 +1,148 @@
+from typing import AsyncIterable, AsyncIterator, Iterable, List, Tuple
+from os import path
+
+import hashlib
+import asyncio
+import uuid
+import mmap
+import os
+
+CHUNK_SIZE = 64 * 1024
+# How much of a streamed blob is kept to sniff its type from
+HEAD_SIZE = 512
+
+# Magic numbers of the formats the proxy is expected to see
+SIGNATURES = [
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+    (b"\x00\x00\x01\x00", "image/x-icon"),
+]
+
+def sniff_mime(data: bytes) -> str:
+    for signature, mime in SIGNATURES:
+        if data.startswith(signature):
+            return mime
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[4:12] in (b"ftypavif", b"ftypavis"):
+        return "image/avif"
+    head = data[:256].lstrip()
+    if head.startswith(b"<svg") or (head.startswith(b"<?xml") and b"<svg" in head):
+        return "image/svg+xml"
+    return "application/octet-stream"
+
+class BlobTooLarge(Exception):
+    pass
+
+class BlobStore:
+    """
+    Stores files on disk under the SHA-256 of their contents, so
+    identical images share a single file.
+
+    Blobs live at ``<root>/<hash[:2]>/<hash>`` and are written to a
+    temporary file first, then moved into place, so a reader never sees
+    a partially written blob. A blob is moved into place even if it
+    already exists, so its modification time tells :meth:`delete` that
+    it was just stored again and is about to be referenced.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, hash: str) -> str:
+        return path.join(self.root, hash[:2], hash)
+
+    def exists(self, hash: str) -> bool:
+        return path.exists(self.path(hash))
+
+    def _write(self, hash: str, data: bytes):
+        target = self.path(hash)
+        os.makedirs(path.dirname(target), exist_ok=True)
+        temp = f"{target}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(temp, "wb") as f:
+                f.write(data)
+            os.replace(temp, target)
+        finally:
+            if path.exists(temp):
+                os.remove(temp)
+
+    async def put(self, data: bytes) -> Tuple[str, int]:
+        """Stores ``data`` and returns its hash and size."""
+        hash = hashlib.sha256(data).hexdigest()
+        await asyncio.to_thread(self._write, hash, data)
+        return hash, len(data)
+
+    def _commit(self, temp: str, hash: str):
+        target = self.path(hash)
+        os.makedirs(path.dirname(target), exist_ok=True)
+        # The chunks may have been written a while ago, stamp it as stored now
+        os.utime(temp)
+        os.replace(temp, target)
+
+    async def put_stream(self, chunks: AsyncIterable[bytes], max_size: int=None) -> Tuple[str, int, bytes]:
+        """
+        Stores a blob as it arrives, hashing it along the way, and returns
+        its hash, size and first bytes. Raises :class:`BlobTooLarge` once
+        more than ``max_size`` bytes have been received.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        temp = path.join(self.root, f"{uuid.uuid4().hex}.tmp")
+        digest = hashlib.sha256()
+        size = 0
+        head = b""
+        try:
+            with open(temp, "wb") as f:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if max_size is not None and size > max_size:
+                        raise BlobTooLarge(max_size)
+                    if len(head) < HEAD_SIZE:
+                        head += chunk[:HEAD_SIZE - len(head)]
+                    digest.update(chunk)
+                    await asyncio.to_thread(f.write, chunk)
+            hash = digest.hexdigest()
+            await asyncio.to_thread(self._commit, temp, hash)
+        finally:
+            if path.exists(temp):
+                os.remove(temp)
+        return hash, size, head
+
+    def _delete(self, hashes: Iterable[str], before: float) -> List[str]:
+        deleted = []
+        for hash in hashes:
+            target = self.path(hash)
+            try:
+                if before is not None and os.stat(target).st_mtime >= before:
+                    continue
+                os.remove(target)
+            except FileNotFoundError:
+                continue
+            deleted.append(hash)
+        return deleted
+
+    async def delete(self, hashes: Iterable[str], before: float=None) -> List[str]:
+        """
+        Deletes blobs and returns the hashes of the ones removed. With
+        ``before``, blobs stored at or after that time are kept, as a new
+        row may be about to point at them.
+        """
+        return await asyncio.to_thread(self._delete, list(hashes), before)
+
+    async def stream(self, hash: str, start: int=0, end: int=None) -> AsyncIterator[bytes]:
+        """
+        Yields the bytes of a blob from ``start`` up to, but not including,
+        ``end`` by slicing a memory map of the file, so only one chunk is
+        held in memory at a time.
+        """
+        with open(self.path(hash), "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                end = size if end is None else min(end, size)
+                for offset in range(start, end, CHUNK_SIZE):
+                    yield mapped[offset:min(offset + CHUNK_SIZE, end)]
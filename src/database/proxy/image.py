@@ -1,20 +1,13 @@
-from database import DBConnection, loadQuery, resultExists, valkey, encoder, decoder, DatabaseModel
-from database.exceptions import DatabaseError
-from surrealdb.ws import SurrealException
-
-import base64
-import io
+from database import DatabaseModel
 
 class Image(DatabaseModel):
     def __init__(self, data: dict):
         super().__init__(data)
         
         self.source = data["source_url"]
-        self.data = data["data"]
+        self.hash: str = data["hash"]
+        self.mime: str = data["mime"]
+        self.size: int = data["size"]
         self.expires = data["expires"]
-    
-    @property
-    def bytes(self):
-        mem = io.BytesIO(base64.b64decode(self.data))
-        mem.seek(0)
-        return mem
\ No newline at end of file
+        # Unix timestamp of expires, used for HTTP caching headers
+        self.expires_at: int = data["expires_at"]
@@ -0,0 +1,164 @@
+from database import DBConnection, loadQuery, resultExists, valkey
+from database.exceptions import DatabaseError
+from prometheus_client import Counter, Gauge
+from surrealdb.ws import SurrealException
+from typing import Iterable, List, Optional, Set, Tuple
+
+from .blobs import BlobStore
+
+import traceback
+import asyncio
+import time
+import config
+
+# Sorted set of image id -> unix time it expires at
+EXPIRY_KEY = "image:expiry"
+RETRY_DELAY = 30
+
+IMAGES_REAPED = Counter(
+    'image_reaped_rows',
+    'Expired proxied image rows deleted'
+)
+IMAGE_BYTES_REAPED = Counter(
+    'image_reaped_bytes',
+    'Bytes of blob storage reclaimed from expired proxied images'
+)
+IMAGES_TRACKED = Gauge(
+    'image_expiry_tracked',
+    'Proxied images waiting to expire'
+)
+
+async def get_expiring_images(window: int) -> List[Tuple[str, float]]:
+    async with DBConnection() as db:
+        try:
+            result = await db.query(loadQuery("getExpiringImages"), {"window": f"{window}s"})
+        except SurrealException as e:
+            raise DatabaseError(str(e))
+        if not resultExists(result, accept_empty=True):
+            raise DatabaseError(result[0]["result"])
+    return [(row["id"], row["expires_at"]) for row in result[0]["result"]]
+
+class ImageReaper:
+    """
+    Deletes proxied images once they expire.
+
+    Expiry times are kept in a valkey sorted set as images are stored, so
+    the reaper can sleep until the earliest one is due and then delete up
+    to ``batch_size`` rows at a time, along with any blobs no remaining
+    row points at. Every ``sync_interval`` seconds images expiring within
+    the next two intervals are read from the database's expiry index, so
+    anything missing from the set (e.g. after valkey was flushed) is
+    still reaped.
+    """
+
+    def __init__(
+        self,
+        blobs: BlobStore,
+        batch_size: int=config.IMAGE_REAP_BATCH_SIZE,
+        sync_interval: int=config.IMAGE_REAP_SYNC_INTERVAL
+    ):
+        self.blobs = blobs
+        self.batch_size = batch_size
+        self.sync_interval = sync_interval
+
+        self._next_at: float = 0
+        self._sync_at: float = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def schedule(self, id: str, expires_at: float):
+        await valkey.zadd(EXPIRY_KEY, {id: expires_at})
+        if self._wakeup is not None and expires_at < self._next_at:
+            self._wakeup.set()
+
+    async def sync(self):
+        images = await get_expiring_images(self.sync_interval * 2)
+        if len(images) > 0:
+            await valkey.zadd(EXPIRY_KEY, dict(images))
+
+    async def reap(self) -> int:
+        """Deletes one batch of expired images and returns how many were due."""
+        ids = [
+            id.decode("utf-8") for id in
+            await valkey.zrangebyscore(EXPIRY_KEY, "-inf", time.time(), start=0, num=self.batch_size)
+        ]
+        if len(ids) == 0:
+            return 0
+
+        async with DBConnection() as db:
+            try:
+                result = await db.query(loadQuery("expireImages"), {"ids": ids})
+            except SurrealException as e:
+                raise DatabaseError(str(e))
+        rows = result[0]["result"]
+        expired = {row["hash"]: row["size"] for row in rows if row.get("hash")}
+
+        # Storing an image always moves a fresh copy of its blob into place
+        # before creating the row, so a blob written since the references
+        # were checked may be about to be referenced and is kept
+        checked_at = time.time()
+        unreferenced = await self._unreferenced(expired.keys())
+        deleted = await self.blobs.delete(unreferenced, before=checked_at)
+        # Rows that didn't come back were already gone or not expired yet,
+        # the latter get picked up again by the next sync
+        await valkey.zrem(EXPIRY_KEY, *ids)
+        await valkey.delete(*[f"db:image:{id}" for id in ids])
+
+        IMAGES_REAPED.inc(len(rows))
+        IMAGE_BYTES_REAPED.inc(sum(expired[hash] or 0 for hash in deleted))
+        return len(ids)
+
+    async def _unreferenced(self, hashes: Iterable[str]) -> Set[str]:
+        """Identical images share a blob, returns the ones nothing points at anymore."""
+        hashes = set(hashes)
+        if len(hashes) == 0:
+            return hashes
+        async with DBConnection() as db:
+            try:
+                result = await db.query(loadQuery("listReferencedImageHashes"), {"hashes": list(hashes)})
+            except SurrealException as e:
+                raise DatabaseError(str(e))
+        if not resultExists(result, accept_empty=True):
+            raise DatabaseError(result[0]["result"])
+        return hashes - set(result[0]["result"])
+
+    async def _run(self):
+        while True:
+            now = time.time()
+            if now >= self._sync_at:
+                try:
+                    await self.sync()
+                except Exception:
+                    traceback.print_exc()
+                    self._sync_at = now + RETRY_DELAY
+                else:
+                    self._sync_at = now + self.sync_interval
+
+            try:
+                if await self.reap() >= self.batch_size:
+                    # More may be due, keep going without waiting
+                    continue
+                earliest = await valkey.zrange(EXPIRY_KEY, 0, 0, withscores=True)
+                IMAGES_TRACKED.set(await valkey.zcard(EXPIRY_KEY))
+            except Exception:
+                traceback.print_exc()
+                earliest = [(None, time.time() + RETRY_DELAY)]
+
+            self._next_at = self._sync_at
+            if len(earliest) > 0:
+                self._next_at = min(self._next_at, earliest[0][1])
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(self._next_at - time.time(), 0))
+            except asyncio.TimeoutError:
+                pass
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -1,5 +1,6 @@
 from database import DBConnection, loadQuery, resultExists, valkey, encoder, decoder
 from database.exceptions import DatabaseError, NotFound
+from database.singleflight import SingleFlight
 from surrealdb.ws import SurrealException
 from datetime import datetime
 from typing import List
@@ -9,6 +10,8 @@ from ..servers import ChannelConfigType
 from .preset import FeedPreset
 from .feeds import RSSFeed
 
+feed_data_fetches = SingleFlight("feed_data")
+
 async def create_feed_data(
     url: str,
     name: str,
@@ -37,8 +40,10 @@ async def create_feed_data(
         else:
             if resultExists(result):
                 item = FeedData(result[0]["result"][0])
-                valkey.set(f"db:feed_data:id:{item.id}", encoder.encode(item.__raw), 86400)
-                valkey.set(f"db:feed_data:url:{item.url}", encoder.encode(item.__raw), 86400)
+                await valkey.set(f"db:feed_data:id:{item.id}", encoder.encode(item.__raw), 86400)
+                await valkey.set(f"db:feed_data:url:{item.url}", encoder.encode(item.__raw), 86400)
+                feed_data_fetches.forget(("id", item.id))
+                feed_data_fetches.forget(("url", item.url))
                 return item
             else:
                 raise DatabaseError("Failed to create feed data.")
@@ -50,11 +55,21 @@ async def fetch_feed_data(
     if id is not None and url is not None:
         raise ValueError("Cannot specify both id and url.")
     if id is not None:
-        cached = valkey.get(f"db:feed_data:id:{id}")
+        key = ("id", id)
+    else:
+        key = ("url", url)
+    return await feed_data_fetches.do(key, _fetch_feed_data, id, url)
+
+async def _fetch_feed_data(
+    id: str=None,
+    url: str=None
+):
+    if id is not None:
+        cached = await valkey.get(f"db:feed_data:id:{id}")
         if cached:
             return FeedData(decoder.decode(cached))
     else:
-        cached = valkey.get(f"db:feed_data:url:{url}")
+        cached = await valkey.get(f"db:feed_data:url:{url}")
         if cached:
             return FeedData(decoder.decode(cached))
     async with DBConnection() as db:
@@ -68,15 +83,15 @@ async def fetch_feed_data(
         else:
             if resultExists(response):
                 if id is not None:
-                    valkey.set(f"db:feed_data:id:{id}", encoder.encode(response[0]["result"][0]), 86400)
+                    await valkey.set(f"db:feed_data:id:{id}", encoder.encode(response[0]["result"][0]), 86400)
                 else:
-                    valkey.set(f"db:feed_data:url:{url}", encoder.encode(response[0]["result"][0]), 86400)
+                    await valkey.set(f"db:feed_data:url:{url}", encoder.encode(response[0]["result"][0]), 86400)
                 return FeedData(response[0]["result"][0])
             else:
                 raise NotFound("Feed data not found.")
 
 async def list_rss_feeds(server_id: str) -> List[RSSFeed]:
-    cached = valkey.get(f"db:rss_feeds:{server_id}")
+    cached = await valkey.get(f"db:rss_feeds:{server_id}")
     if cached:
         return [RSSFeed(config) for config in decoder.decode(cached)]
     async with DBConnection() as db:
@@ -89,7 +104,7 @@ async def list_rss_feeds(server_id: str) -> List[RSSFeed]:
             raise DatabaseError(str(e))
         else:
             if resultExists(response):
-                valkey.set(f"db:rss_feeds:{server_id}", encoder.encode(response[0]["result"]), 700)
+                await valkey.set(f"db:rss_feeds:{server_id}", encoder.encode(response[0]["result"]), 700)
                 return [RSSFeed(config) for config in response[0]["result"]]
 
 async def create_rss_feed(
@@ -115,13 +130,13 @@ async def create_rss_feed(
             raise DatabaseError(str(e))
         else:
             if resultExists(response):
-                valkey.set(f"db:rss_feeds:{server_id}", encoder.encode(response[0]["result"]), 700)
+                await valkey.set(f"db:rss_feeds:{server_id}", encoder.encode(response[0]["result"]), 700)
                 return RSSFeed(response[0]["result"][0])
             else:
                 raise DatabaseError("Failed to create feed.")
 
 async def fetch_rss_feed(id: str):
-    cached = valkey.get(f"db:rss_feeds:{id}")
+    cached = await valkey.get(f"db:rss_feeds:{id}")
     if cached:
         return RSSFeed(decoder.decode(cached))
     async with DBConnection() as db:
@@ -134,7 +149,7 @@ async def fetch_rss_feed(id: str):
             raise DatabaseError(str(e))
         else:
             if resultExists(response):
-                valkey.set(f"db:rss_feeds:{id}", encoder.encode(response[0]["result"]), 700)
+                await valkey.set(f"db:rss_feeds:{id}", encoder.encode(response[0]["result"]), 700)
                 return RSSFeed(response[0]["result"][0])
             else:
                 raise NotFound("Feed not found.")
@@ -173,7 +188,7 @@ async def get_updatable_feeds(
                 return []
 
 async def get_feed_presets() -> List[FeedPreset]:
-    cached = valkey.get("db:feed_presets")
+    cached = await valkey.get("db:feed_presets")
     if cached:
         return [FeedPreset(config) for config in decoder.decode(cached)]
     async with DBConnection() as db:
@@ -183,16 +198,16 @@ async def get_feed_presets() -> List[FeedPreset]:
             raise DatabaseError(str(e))
         else:
             if resultExists(response):
-                valkey.set("db:feed_presets", encoder.encode(response[0]["result"]), 86400)
+                await valkey.set("db:feed_presets", encoder.encode(response[0]["result"]), 86400)
                 presets = [FeedPreset(raw) for raw in response[0]["result"]]
                 for preset in presets:
-                    valkey.set(f"db:feed_presets:{preset.id}", encoder.encode(preset.__raw), 86400)
+                    await valkey.set(f"db:feed_presets:{preset.id}", encoder.encode(preset.__raw), 86400)
                 return presets
             else:
                 return []
 
 async def fetch_feed_preset(id: str) -> FeedPreset:
-    cached = valkey.get(f"db:feed_presets:{id}")
+    cached = await valkey.get(f"db:feed_presets:{id}")
     if cached:
         return FeedPreset(decoder.decode(cached))
     async with DBConnection() as db:
@@ -205,7 +220,7 @@ async def fetch_feed_preset(id: str) -> FeedPreset:
         else:
             if resultExists(response):
                 preset = FeedPreset(response[0]["result"][0])
-                valkey.set(f"db:feed_presets:{id}", encoder.encode(preset.__raw), 86400)
+                await valkey.set(f"db:feed_presets:{id}", encoder.encode(preset.__raw), 86400)
                 return preset
             else:
                 raise NotFound("Feed preset not found.")
@@ -228,13 +243,13 @@ async def create_feed_preset(
             raise DatabaseError(str(e))
         else:
             if resultExists(response):
-                cached = valkey.get("db:feed_presets")
+                cached = await valkey.get("db:feed_presets")
                 if cached:
                     cached = decoder.decode(cached)
                     cached.append(response[0]["result"][0])
-                    valkey.set("db:feed_presets", encoder.encode(cached), 86400)
+                    await valkey.set("db:feed_presets", encoder.encode(cached), 86400)
                 preset = FeedPreset(response[0]["result"][0])
-                valkey.set(f"db:feed_presets:{preset.id}", encoder.encode(preset.__raw), 86400)
+                await valkey.set(f"db:feed_presets:{preset.id}", encoder.encode(preset.__raw), 86400)
                 return preset
             else:
                 raise DatabaseError("Failed to create feed preset.")
\ No newline at end of file
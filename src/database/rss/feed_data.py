@@ -23,7 +23,7 @@ class FeedData(DatabaseModel):
         
         self.data = data["data"]
     
-    def update(
+    async def update(
         self,
         url: str=None,
         name: str=None,
@@ -83,8 +83,8 @@ class FeedData(DatabaseModel):
                         self.__raw["state"] = state.value
                     
                     if old_url != self.url:
-                        valkey.delete(f"db:feed_data:url:{old_url}")
-                    valkey.set(f"db:feed_data:url:{self.url}", encoder.encode(self.__raw), 86400)
-                    valkey.set(f"db:feed_data:id:{self.id}", encoder.encode(self.__raw), 86400)
+                        await valkey.delete(f"db:feed_data:url:{old_url}")
+                    await valkey.set(f"db:feed_data:url:{self.url}", encoder.encode(self.__raw), 86400)
+                    await valkey.set(f"db:feed_data:id:{self.id}", encoder.encode(self.__raw), 86400)
                 else:
                     raise DatabaseError("No changes were made")
\ No newline at end of file
@@ -45,7 +45,7 @@ class FeedPreset(DatabaseModel):
                 if extra_fields != None:
                     self.extra_fields = extra_fields
                     self.__raw['extra_fields'] = extra_fields
-                cached = valkey.get(f"db:feed_presets")
+                cached = await valkey.get(f"db:feed_presets")
                 if cached:
                     cached = decoder.decode(cached)
                     for item in cached:
@@ -53,7 +53,7 @@ class FeedPreset(DatabaseModel):
                             cached.remove(item)
                             cached.append(self.__raw)
                             break
-                    valkey.set("db:feed_presets", encoder.encode(cached), 86400)
+                    await valkey.set("db:feed_presets", encoder.encode(cached), 86400)
                 return self
     
     async def delete():
@@ -68,11 +68,11 @@ class FeedPreset(DatabaseModel):
             except SurrealException as e:
                 raise DatabaseError(e.message)
             else:
-                cached = valkey.get(f"db:feed_presets")
+                cached = await valkey.get(f"db:feed_presets")
                 if cached:
                     cached = decoder.decode(cached)
                     for item in cached:
                         if item["id"] == self.id:
                             cached.remove(item)
                             break
-                    valkey.set("db:feed_presets", encoder.encode(cached), 86400)
\ No newline at end of file
+                    await valkey.set("db:feed_presets", encoder.encode(cached), 86400)
\ No newline at end of file
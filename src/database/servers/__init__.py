@@ -1,13 +1,20 @@
-from .server import Server, AuditLog, ChannelConfig, ChannelConfigType, RoleConfig, RoleConfigType
+from .server import Server, server_cache, member_fetches, AuditLog, ChannelConfig, ChannelConfigType, RoleConfig, RoleConfigType
 from database import DBConnection, loadQuery, resultExists, valkey, encoder, decoder
 from database.exceptions import ServerNotFound, DatabaseError, NotInServer
+from database.singleflight import SingleFlight
 from core.images import IMAGE_DEFAULT_AVATAR
 from surrealdb.ws import SurrealException
+from .references import RoleReference, ChannelReference
+from .audit import AuditLogWriter, audit_log_writer
 from .user import ServerUser
+from . import leaderboard
 from typing import Union
 
 import guilded
 
+server_fetches = SingleFlight("server")
+server_creates = SingleFlight("server_create")
+
 async def fetch_or_create_server(server_id: Union[str, guilded.Server]) -> Server:
     from base import bot
     if isinstance(server_id, guilded.Server):
@@ -16,7 +23,9 @@ async def fetch_or_create_server(server_id: Union[str, guilded.Server]) -> Serve
         guild = bot.get_server(server_id)
     if guild is None:
         raise NotInServer
+    return await server_creates.do(guild.id, _fetch_or_create_server, guild)
 
+async def _fetch_or_create_server(guild: guilded.Server) -> Server:
     try:
         server = await fetch_server(guild)
     except ServerNotFound:
@@ -36,9 +45,17 @@ async def fetch_or_create_server(server_id: Union[str, guilded.Server]) -> Serve
 async def fetch_server(server_id: Union[str, guilded.Server]) -> Server:
     if isinstance(server_id, guilded.Server):
         server_id = server_id.id
-    cached = valkey.get(f"db:server:{server_id}")
+    server = server_cache.get(server_id)
+    if server is not None:
+        return server
+    return await server_fetches.do(server_id, _fetch_server, server_id)
+
+async def _fetch_server(server_id: str) -> Server:
+    cached = await valkey.get(f"db:server:{server_id}")
     if cached:
-        return await Server.create(decoder.decode(cached.decode("utf-8")))
+        server = await Server.create(decoder.decode(cached.decode("utf-8")))
+        server_cache.set(server_id, server)
+        return server
     async with DBConnection() as db:
         try:
             result = await db.query(loadQuery("getGuild"), {
@@ -48,7 +65,9 @@ async def fetch_server(server_id: Union[str, guilded.Server]) -> Server:
             raise ServerNotFound
         else:
             if resultExists(result):
-                return await Server.create(result[0]["result"][0])
+                server = await Server.create(result[0]["result"][0])
+                server_cache.set(server_id, server)
+                return server
             else:
                 raise ServerNotFound
 
@@ -72,8 +91,12 @@ async def create_server(
             raise DatabaseError(str(e))
         else:
             if resultExists(result):
-                valkey.set(f"db:server:{server_id}", encoder.encode(result[0]["result"][0]), 86400)
-                return await Server.create(result[0]["result"][0])
+                await valkey.set(f"db:server:{server_id}", encoder.encode(result[0]["result"][0]), 86400)
+                server = await Server.create(result[0]["result"][0])
+                server_fetches.forget(server_id)
+                await server_cache.invalidate(server_id)
+                server_cache.set(server_id, server)
+                return server
             else:
                 raise DatabaseError(result[0]["result"])
 
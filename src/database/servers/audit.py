@@ -0,0 +1,164 @@
+from database import DBConnection, loadQuery, resultExists, valkey
+from database.exceptions import DatabaseError
+from prometheus_client import Gauge, Histogram
+from surrealdb.ws import SurrealException
+from typing import Dict, List, Optional, Tuple
+
+import traceback
+import asyncio
+import config
+
+AUDIT_LOG_PENDING = Gauge(
+    'audit_log_pending',
+    'Audit logs waiting to be written to the database'
+)
+AUDIT_LOG_FLUSH_SIZE = Histogram(
+    'audit_log_flush_size',
+    'Number of audit logs written per flush',
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500)
+)
+AUDIT_LOG_FLUSH_SECONDS = Histogram(
+    'audit_log_flush_seconds',
+    'Time spent writing a batch of audit logs'
+)
+
+FLUSH_ATTEMPTS = 3
+
+def audit_log_pages_key(guild_id: str) -> str:
+    """The set of every cached audit log page key of a server."""
+    return f"db:audit_log_pages:{guild_id}"
+
+async def cache_audit_log_page(guild_id: str, key: str, value: str):
+    pages = audit_log_pages_key(guild_id)
+    async with valkey.pipeline(transaction=False) as pipe:
+        pipe.set(key, value, 86400)
+        pipe.sadd(pages, key)
+        pipe.expire(pages, 86400)
+        await pipe.execute()
+
+async def invalidate_audit_log_caches(guild_id: str):
+    pages = audit_log_pages_key(guild_id)
+    keys = [f"db:audit_log_users:{guild_id}", pages]
+    keys.extend(await valkey.smembers(pages))
+    await valkey.delete(*keys)
+
+class AuditLogWriter:
+    """
+    Buffers audit logs and writes them with a single multi-row insert.
+
+    A batch is flushed once it holds ``batch_size`` logs or ``interval``
+    milliseconds after its first log arrived, whichever comes first. At
+    most ``max_pending`` logs are buffered; past that :meth:`write` waits
+    until a flush makes room. :meth:`close` writes everything still
+    buffered and must be awaited on shutdown.
+    """
+
+    def __init__(
+        self,
+        batch_size: int=config.AUDIT_LOG_BATCH_SIZE,
+        interval: int=config.AUDIT_LOG_FLUSH_INTERVAL,
+        max_pending: int=config.AUDIT_LOG_MAX_PENDING
+    ):
+        self.batch_size = batch_size
+        self.interval = interval / 1000
+        self.max_pending = max_pending
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._batch: List[dict] = []
+        self._flushing: Optional[asyncio.Future] = None
+
+    def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue(self.max_pending)
+            self._task = asyncio.create_task(self._run())
+
+    async def write(self, payload: dict):
+        self.start()
+        await self._queue.put(payload)
+        AUDIT_LOG_PENDING.inc()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._batch.append(await self._queue.get())
+            deadline = loop.time() + self.interval
+            while len(self._batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    self._batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            batch, self._batch = self._batch, []
+            # Shielded so close() can wait for a write that already started
+            # instead of cancelling it halfway through
+            self._flushing = asyncio.ensure_future(self._flush(batch))
+            await asyncio.shield(self._flushing)
+            self._flushing = None
+
+    async def _flush(self, batch: List[dict]):
+        counts: Dict[Tuple[str, str], int] = {}
+        for payload in batch:
+            key = (payload["guild_id"], payload["event_name"])
+            counts[key] = counts.get(key, 0) + 1
+
+        for attempt in range(FLUSH_ATTEMPTS):
+            try:
+                with AUDIT_LOG_FLUSH_SECONDS.time():
+                    await self._insert(batch, counts)
+            except Exception as e:
+                print(f"Failed to write {len(batch)} audit logs (attempt {attempt + 1}/{FLUSH_ATTEMPTS}): {e}")
+                if attempt + 1 < FLUSH_ATTEMPTS:
+                    await asyncio.sleep(2 ** attempt)
+            else:
+                break
+        else:
+            print(f"Dropped {len(batch)} audit logs after {FLUSH_ATTEMPTS} failed attempts")
+        AUDIT_LOG_PENDING.dec(len(batch))
+        AUDIT_LOG_FLUSH_SIZE.observe(len(batch))
+
+        for guild_id in {guild_id for guild_id, _ in counts}:
+            try:
+                await invalidate_audit_log_caches(guild_id)
+            except Exception:
+                traceback.print_exc()
+
+    async def _insert(self, batch: List[dict], counts: Dict[Tuple[str, str], int]):
+        async with DBConnection() as db:
+            try:
+                result = await db.query(loadQuery("bulkCreateAuditLogs"), {
+                    "logs": batch,
+                    "counts": [
+                        {"guild_id": guild_id, "event_name": event_name, "count": count}
+                        for (guild_id, event_name), count in counts.items()
+                    ],
+                })
+            except SurrealException as e:
+                raise DatabaseError(str(e))
+            for index, statement in enumerate(result):
+                if not resultExists(result, index, accept_empty=True):
+                    raise DatabaseError(statement["result"])
+
+    async def close(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._flushing is not None:
+            await self._flushing
+            self._flushing = None
+
+        remaining, self._batch = self._batch, []
+        while not self._queue.empty():
+            remaining.append(self._queue.get_nowait())
+        for i in range(0, len(remaining), self.batch_size):
+            await self._flush(remaining[i:i + self.batch_size])
+
+audit_log_writer = AuditLogWriter()
@@ -0,0 +1,57 @@
+from database import DBConnection, loadQuery, resultExists, valkey
+from database.exceptions import DatabaseError
+from surrealdb.ws import SurrealException
+from typing import Dict, List, Optional, Tuple
+
+SEED_BATCH_SIZE = 1000
+
+def _key(guild_id: str) -> str:
+    return f"leaderboard:{guild_id}"
+
+async def set_scores(guild_id: str, scores: Dict[str, int]):
+    """Records the XP of one or more members of a server."""
+    if len(scores) == 0:
+        return
+    await valkey.zadd(_key(guild_id), scores)
+
+async def remove(guild_id: str, user_id: str):
+    await valkey.zrem(_key(guild_id), user_id)
+
+async def get_rank(guild_id: str, user_id: str) -> Optional[int]:
+    """The member's 1-based position in the server, or ``None`` if they aren't ranked."""
+    rank = await valkey.zrevrank(_key(guild_id), user_id)
+    return rank + 1 if rank is not None else None
+
+async def get_page(guild_id: str, offset: int, limit: int) -> List[Tuple[str, int]]:
+    """Returns ``limit`` (user id, xp) pairs starting at ``offset``, highest XP first."""
+    entries = await valkey.zrevrange(_key(guild_id), offset, offset + limit - 1, withscores=True)
+    return [(user_id.decode("utf-8"), int(xp)) for user_id, xp in entries]
+
+async def count(guild_id: str) -> int:
+    return await valkey.zcard(_key(guild_id))
+
+async def seed(guild_id: str):
+    """
+    Rebuilds the server's leaderboard from ``guild_user``. The new set is
+    built under a temporary key and swapped in so readers never see it
+    half filled.
+    """
+    async with DBConnection() as db:
+        try:
+            result = await db.query(loadQuery("listGuildUserXP"), {"guild": guild_id})
+        except SurrealException as e:
+            raise DatabaseError(str(e))
+        if not resultExists(result, accept_empty=True):
+            raise DatabaseError(result[0]["result"])
+    rows = result[0]["result"]
+
+    if len(rows) == 0:
+        await valkey.delete(_key(guild_id))
+        return
+    building = f"{_key(guild_id)}:seed"
+    await valkey.delete(building)
+    for i in range(0, len(rows), SEED_BATCH_SIZE):
+        await valkey.zadd(building, {
+            row["user_id"]: row["xp"] or 0 for row in rows[i:i + SEED_BATCH_SIZE]
+        })
+    await valkey.rename(building, _key(guild_id))
@@ -0,0 +1,70 @@
+from database.cache import LocalCache
+from typing import Dict
+
+import guilded
+import config
+
+class GuildResolver:
+    """
+    Resolves channel ids for a single guild, remembering the channels
+    it found so each id costs at most one lookup. Failed lookups
+    raise and aren't remembered, so they're retried on the next call.
+    """
+
+    def __init__(self, guild_id: str):
+        self.guild_id = guild_id
+        self._channels: Dict[str, guilded.abc.ServerChannel] = {}
+
+    async def channel(self, channel_id: str) -> guilded.abc.ServerChannel:
+        channel = self._channels.get(channel_id)
+        if channel is None:
+            from base import bot
+            channel = await bot.getch_channel(channel_id)
+            self._channels[channel_id] = channel
+        return channel
+
+resolvers = LocalCache("guild_resolver", config.SERVER_CACHE_SIZE, config.SERVER_CACHE_TTL)
+
+def get_resolver(guild_id: str) -> GuildResolver:
+    resolver = resolvers.get(guild_id)
+    if resolver is None:
+        resolver = GuildResolver(guild_id)
+        resolvers.set(guild_id, resolver)
+    return resolver
+
+class RoleReference(str):
+    """
+    A role id stored in a server's settings.
+
+    Behaves exactly like the id string. Every caller only needs the id,
+    e.g. to pass to ``guilded.Object``, so the role is never looked up.
+    """
+
+    def __new__(cls, role_id: str, guild_id: str):
+        self = super().__new__(cls, role_id)
+        self.guild_id = guild_id
+        return self
+
+    @property
+    def id(self) -> str:
+        return str(self)
+
+class ChannelReference(str):
+    """
+    A channel id stored in a server's settings.
+
+    Behaves exactly like the id string, the channel itself is only looked
+    up when :meth:`fetch` is first awaited. Raises if it can't be found.
+    """
+
+    def __new__(cls, channel_id: str, guild_id: str):
+        self = super().__new__(cls, channel_id)
+        self.guild_id = guild_id
+        return self
+
+    @property
+    def id(self) -> str:
+        return str(self)
+
+    async def fetch(self) -> guilded.abc.ServerChannel:
+        return await get_resolver(self.guild_id).channel(self.id)
@@ -1,13 +1,27 @@
 from database import DBConnection, loadQuery, resultExists, valkey, encoder, decoder, UserPermissions, DatabaseModel
-from typing import Optional, TypedDict, List, Dict, Optional, Union
+from typing import Optional, TypedDict, List, Dict, Optional, Tuple, Union
 from database.exceptions import DatabaseError, NotInServer
+from database.singleflight import SingleFlight
+from database.cache import LocalCache
 from core.images import IMAGE_DEFAULT_AVATAR
 from surrealdb.ws import SurrealException
-from datetime import datetime
+from datetime import datetime, timezone
+from .references import RoleReference, ChannelReference
+from .audit import audit_log_writer, cache_audit_log_page
+from . import leaderboard
 from .user import ServerUser
 from enum import Enum
 
 import guilded
+import base64
+import uuid
+import config
+
+# Ready-to-use Server objects keyed by guild id, shared by every caller in this process
+server_cache = LocalCache("server", config.SERVER_CACHE_SIZE, config.SERVER_CACHE_TTL)
+
+member_fetches = SingleFlight("server_user")
+member_creates = SingleFlight("server_user_create")
 
 class WelcomerCycle(Enum):
     Daily = "Daily"
@@ -32,7 +46,7 @@ class ServerSettings(TypedDict, total=False):
     nickname: str
     timezone: str
     language: str
-    muted_role: Optional[guilded.Role]
+    muted_role: Optional[RoleReference]
     
     untrusted_block_attachments: List[str]
     
@@ -68,22 +82,22 @@ class ServerSettings(TypedDict, total=False):
     
     silence_commands: bool
     log_commands: bool
-    logs_traffic: Optional[guilded.ChatChannel]
-    logs_message: Optional[guilded.ChatChannel]
-    logs_verification: Optional[guilded.ChatChannel]
-    logs_action: Optional[guilded.ChatChannel]
-    logs_user: Optional[guilded.ChatChannel]
-    logs_management: Optional[guilded.ChatChannel]
-    logs_nsfw: Optional[guilded.ChatChannel]
-    logs_automod: Optional[guilded.ChatChannel]
+    logs_traffic: Optional[ChannelReference]
+    logs_message: Optional[ChannelReference]
+    logs_verification: Optional[ChannelReference]
+    logs_action: Optional[ChannelReference]
+    logs_user: Optional[ChannelReference]
+    logs_management: Optional[ChannelReference]
+    logs_nsfw: Optional[ChannelReference]
+    logs_automod: Optional[ChannelReference]
     
     admin_contact: str
     block_tor: bool
     check_ips: bool
     raid_guard: bool
-    verified_role: Optional[guilded.Role]
-    unverified_role: Optional[guilded.Role]
-    verification_channel: Optional[guilded.ChatChannel]
+    verified_role: Optional[RoleReference]
+    unverified_role: Optional[RoleReference]
+    verification_channel: Optional[ChannelReference]
     
     re_toxicity: int
     re_hatespeech: int
@@ -96,23 +110,21 @@ class ServerSettings(TypedDict, total=False):
     
     send_welcome: bool
     welcome_message: str
-    welcome_channel: Optional[guilded.ChatChannel]
+    welcome_channel: Optional[ChannelReference]
     welcome_image: List[str]
     welcome_image_cycle: WelcomerCycle
     
     send_goodbye: bool
     goodbye_message: str
-    goodbye_channel: Optional[guilded.ChatChannel]
+    goodbye_channel: Optional[ChannelReference]
     goodbye_image: List[str]
     goodbye_image_cycle: WelcomerCycle
     
-    giveaway_ping_role: Optional[guilded.Role]
-    giveaway_channel: Optional[guilded.ChatChannel]
+    giveaway_ping_role: Optional[RoleReference]
+    giveaway_channel: Optional[ChannelReference]
 
 class AuditLog:
     def __init__(self, data: dict):
-        super().__init__(data)
-
         self.server_id: str = data["guild_id"]
         
         if len(data["id"].split(":")) > 1:
@@ -129,6 +141,29 @@ class AuditLog:
             if not getattr(self, key, None):
                 self.extra_data[key] = data[key]
 
+    @property
+    def cursor(self) -> str:
+        """An opaque keyset cursor pointing just after this log."""
+        return base64.urlsafe_b64encode(f"{self.created_at}|{self.id}".encode("utf-8")).decode("utf-8")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[str, str]:
+        try:
+            created_at, id = base64.urlsafe_b64decode(cursor.encode("utf-8")).decode("utf-8").split("|", 1)
+        except (ValueError, UnicodeDecodeError):
+            raise ValueError("Invalid audit log cursor")
+        return created_at, id
+
+    def to_dict(self) -> dict:
+        return {
+            **self.extra_data,
+            "id": self.id,
+            "guild_id": self.server_id,
+            "originator_id": self.originator_id,
+            "event_name": self.event_name,
+            "created_at": self.created_at,
+        }
+
 class Server(DatabaseModel):
     def __init__(self, data: dict):
         super().__init__(data)
@@ -150,7 +185,7 @@ class Server(DatabaseModel):
     @classmethod
     async def create(cls, data: dict):
         self = cls(data)
-        await self.deserialize_settings(data)
+        self.deserialize_settings(data)
         return self
     
     @property
@@ -165,15 +200,17 @@ class Server(DatabaseModel):
             if key == "welcome_image_cycle" or key == "goodbye_image_cycle":
                 value = settings[key].value
             elif key.endswith("_role"):
-                value = settings[key].id
+                value = getattr(settings[key], "id", settings[key])
             elif key.endswith("_channel") or key.startswith("logs"):
-                value = settings[key].id
+                value = getattr(settings[key], "id", settings[key])
             else:
                 value = settings[key]
             data[key] = value
         return data
     
-    async def deserialize_settings(self, data: dict):
+    def deserialize_settings(self, data: dict):
+        # Roles and channels are kept as lazy references so building a
+        # Server never needs to talk to Guilded
         for key in data:
             if key in ServerSettings.__annotations__.keys():
                 if key.startswith("_"): continue
@@ -182,15 +219,9 @@ class Server(DatabaseModel):
                 if key == "welcome_image_cycle" or key == "goodbye_image_cycle":
                     value = WelcomerCycle(value)
                 elif key.endswith("_role"):
-                    try:
-                        value = await bot_server.getch_role(value)
-                    except:
-                        value = None
+                    value = RoleReference(value, self.id) if value else None
                 elif key.endswith("_channel") or key.startswith("logs"):
-                    try:
-                        value = await bot_server.getch_channel(value)
-                    except:
-                        value = None
+                    value = ChannelReference(value, self.id) if value else None
                 self.settings[key] = value
     
     async def update_settings(self, **kwargs):
@@ -201,11 +232,12 @@ class Server(DatabaseModel):
                 raise DatabaseError(str(e))
             else:
                 if resultExists(response):
-                    await self.deserialize_settings(response[0]["result"][0])
+                    self.deserialize_settings(response[0]["result"][0])
                     serialized = self.serialize_settings()
                     for key in serialized:
                         self.__raw[key] = serialized[key]
-                    valkey.set(f"db:server:{self.id}", encoder.encode(self.__raw), 86400)
+                    await valkey.set(f"db:server:{self.id}", encoder.encode(self.__raw), 86400)
+                    await server_cache.invalidate(self.id)
                     return True
 
     async def set_active(self, active: bool):
@@ -217,21 +249,27 @@ class Server(DatabaseModel):
             else:
                 if resultExists(response):
                     self.__raw["active"] = active
-                    valkey.set(f"db:server:{self.id}", encoder.encode(self.__raw), 86400)
+                    await valkey.set(f"db:server:{self.id}", encoder.encode(self.__raw), 86400)
+                    await server_cache.invalidate(self.id)
                     return True
     
     async def create_audit_log(self, payload: dict) -> AuditLog:
-        async with DBConnection() as db:
-            try:
-                response = await db.query(loadQuery("createAuditLog"), {"guild": self.id, "payload": payload})
-            except SurrealException as e:
-                raise DatabaseError(str(e))
-            else:
-                if resultExists(response):
-                    return AuditLog(response[0]["result"][0])
+        """
+        Queues an audit log to be written with the next batch. The id and
+        creation time are set here, rather than when the batch is written,
+        so the log can be returned before it's written.
+        """
+        payload = {
+            **payload,
+            "id": uuid.uuid4().hex,
+            "guild_id": self.id,
+            "created_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+        }
+        await audit_log_writer.write(payload)
+        return AuditLog(payload)
     
     async def get_audit_log_users(self):
-        cached = valkey.get(f"db:audit_log_users:{self.id}")
+        cached = await valkey.get(f"db:audit_log_users:{self.id}")
         if cached:
             return cached
         async with DBConnection() as db:
@@ -242,7 +280,7 @@ class Server(DatabaseModel):
             else:
                 if resultExists(result):
                     raw = result[0]["result"]
-                    valkey.set(f"db:audit_log_users:{self.id}", encoder.encode(raw), 86400)
+                    await valkey.set(f"db:audit_log_users:{self.id}", encoder.encode(raw), 86400)
                     return raw
                 else:
                     raise DatabaseError(result[0]["result"])
@@ -254,14 +292,18 @@ class Server(DatabaseModel):
         authors: List[str]=None,
         event_names: List[str]=None,
         limit: int=50,
-        page: int=0
-    ) -> List[AuditLog]:
-        filter_key = f"db:audit_logs:{self.id}:{start}:{end}:{authors}:{event_names}:{limit}:{page}"
-        cached = valkey.get(filter_key)
+        cursor: str=None
+    ) -> Tuple[List[AuditLog], Optional[str]]:
+        """
+        Returns a page of audit logs, newest first, along with the cursor
+        for the next page or ``None`` when this is the last page.
+        """
+        filter_key = f"db:audit_logs:{self.id}:{start}:{end}:{authors}:{event_names}:{limit}:{cursor}"
+        cached = await valkey.get(filter_key)
         if cached:
-            return [
-                AuditLog(item) for item in decoder.decode(cached.decode("utf-8"))
-            ]
+            cached = decoder.decode(cached.decode("utf-8"))
+            return [AuditLog(item) for item in cached["logs"]], cached["next"]
+        before_time, before_id = AuditLog.decode_cursor(cursor) if cursor else (None, None)
         async with DBConnection() as db:
             try:
                 result = await db.query(loadQuery("listAuditLogs"), {
@@ -270,22 +312,48 @@ class Server(DatabaseModel):
                     "range_end": end,
                     "authors": authors and len(authors) > 0 and authors or None,
                     "event_names": event_names and len(event_names) > 0 and event_names or None,
-                    "limit": limit,
-                    "page": page
+                    # One extra row tells us whether there is a next page
+                    "limit": limit + 1,
+                    "before_time": before_time,
+                    "before_id": before_id,
                 })
             except SurrealException as e:
                 raise DatabaseError(str(e))
             else:
-                if resultExists(result) and resultExists(result, 1):
-                    valkey.set(filter_key, encoder.encode(result[0]["result"]), 86400)
-                    return [
-                        AuditLog(item) for item in result[0]["result"]
-                    ], result[1]["result"][0]["count"]
+                if resultExists(result, accept_empty=True):
+                    raw = result[0]["result"][:limit]
+                    logs = [AuditLog(item) for item in raw]
+                    next_cursor = None
+                    if len(result[0]["result"]) > limit:
+                        next_cursor = logs[-1].cursor
+                    await cache_audit_log_page(self.id, filter_key, encoder.encode({"logs": raw, "next": next_cursor}))
+                    return logs, next_cursor
+                else:
+                    raise DatabaseError(result[0]["result"])
+
+    async def count_audit_logs(self, event_names: List[str]=None) -> int:
+        """
+        Returns the number of audit logs, optionally only counting the
+        given events, from the counters kept up to date on creation.
+        """
+        async with DBConnection() as db:
+            try:
+                result = await db.query(loadQuery("countAuditLogs"), {
+                    "guild": self.id,
+                    "event_names": event_names and len(event_names) > 0 and event_names or None,
+                })
+            except SurrealException as e:
+                raise DatabaseError(str(e))
+            else:
+                if resultExists(result, accept_empty=True):
+                    if len(result[0]["result"]) == 0:
+                        return 0
+                    return int(result[0]["result"][0]["total"] or 0)
                 else:
                     raise DatabaseError(result[0]["result"])
     
     async def get_banned_members(self):
-        cached = valkey.get(f"db:banned_members:{self.id}")
+        cached = await valkey.get(f"db:banned_members:{self.id}")
         if cached:
             response = []
             for item in decoder.decode(cached.decode("utf-8")):
@@ -299,7 +367,7 @@ class Server(DatabaseModel):
             else:
                 if resultExists(result):
                     raw = result[0]["result"]
-                    valkey.set(f"db:banned_members:{self.id}", encoder.encode(raw), 86400)
+                    await valkey.set(f"db:banned_members:{self.id}", encoder.encode(raw), 86400)
                     response = []
                     for item in raw:
                         response.append(ServerUser(item))
@@ -310,36 +378,127 @@ class Server(DatabaseModel):
     ## USERS ##
     
     async def fetch_or_create_member(self, user: guilded.Member):
+        return await member_creates.do((self.id, user.id), self._fetch_or_create_member, user)
+
+    async def _fetch_or_create_member(self, user: guilded.Member):
+        from core.xp import xp_aggregator
         try:
             member = await self.fetch_member(user.id)
         except:
-            new_perms: dict = self.settings.get("permissions", {})
-
             roles = user._role_ids
             if len(roles) == 0:
                 roles = await user.fetch_role_ids()
-            user_perms = UserPermissions()
-            for id in roles:
-                perms = new_perms.get(str(id))
-                if perms:
-                    user_perms += UserPermissions.from_string(perms)
-            if user.id == user.server.owner_id:
-                user_perms = UserPermissions.all()
+            user_perms = self.permissions_for(roles, user.id == user.server.owner_id)
 
             member = await self.create_member(
                 user.id,
                 str(user_perms),
-                await user.award_xp(0),
+                await xp_aggregator.get_xp(user),
                 False,
                 user_perms.can_access_dash
             )
 
         return member
     
+    def permissions_for(self, roles: List[Union[str, int]], is_owner: bool=False) -> UserPermissions:
+        if is_owner:
+            return UserPermissions.all()
+        new_perms: dict = self.settings.get("permissions", {})
+        user_perms = UserPermissions()
+        for id in roles:
+            perms = new_perms.get(str(id))
+            if perms:
+                user_perms += UserPermissions.from_string(perms)
+        return user_perms
+
+    async def list_member_states(self) -> Dict[str, bool]:
+        """
+        Returns the ban state of every member row this server has,
+        keyed by user id, using a single query.
+        """
+        async with DBConnection() as db:
+            try:
+                result = await db.query(loadQuery("listGuildUserStates"), {"guild": self.id})
+            except SurrealException as e:
+                raise DatabaseError(str(e))
+            else:
+                if resultExists(result, accept_empty=True):
+                    return {
+                        item["user_id"]: item["is_banned"] for item in result[0]["result"]
+                    }
+                else:
+                    raise DatabaseError(result[0]["result"])
+
+    async def create_members(self, members: List[dict]):
+        """
+        Creates many member rows with one multi-row INSERT, each item
+        holding the same fields as :meth:`create_member` takes.
+        """
+        if len(members) == 0:
+            return
+        async with DBConnection() as db:
+            try:
+                result = await db.query(loadQuery("bulkCreateGuildUsers"), {
+                    "members": [
+                        {
+                            "guild_id": self.id,
+                            "user_id": member["user_id"],
+                            "perms": member["perms"],
+                            "xp": member["xp"],
+                            "is_banned": member["is_banned"],
+                            "can_access_dash": member["can_access_dash"],
+                        } for member in members
+                    ]
+                })
+            except SurrealException as e:
+                raise DatabaseError(str(e))
+            else:
+                if not resultExists(result):
+                    raise DatabaseError(result[0]["result"])
+        await leaderboard.set_scores(self.id, {member["user_id"]: member["xp"] for member in members})
+        for member in members:
+            member_fetches.forget((self.id, member["user_id"]))
+
+    async def set_members_banned(self, user_ids: List[str], banned: bool):
+        if len(user_ids) == 0:
+            return
+        async with DBConnection() as db:
+            try:
+                await db.query(loadQuery("bulkUpdateGuildUserBan"), {
+                    "guild": self.id,
+                    "ids": user_ids,
+                    "banned": banned
+                })
+            except SurrealException as e:
+                raise DatabaseError(str(e))
+        await valkey.delete(*[f"db:server_user:{self.id}:{user_id}" for user_id in user_ids])
+        await valkey.delete(f"db:banned_members:{self.id}")
+
+    async def set_members_xp(self, rows: List[dict]):
+        """
+        Stores the XP totals of several members at once. Each row is a
+        dict with ``user_id`` and ``xp``.
+        """
+        if len(rows) == 0:
+            return
+        async with DBConnection() as db:
+            try:
+                await db.query(loadQuery("bulkUpdateGuildUserXP"), {
+                    "guild": self.id,
+                    "members": rows
+                })
+            except SurrealException as e:
+                raise DatabaseError(str(e))
+        await valkey.delete(*[f"db:server_user:{self.id}:{row['user_id']}" for row in rows])
+        await leaderboard.set_scores(self.id, {row["user_id"]: row["xp"] for row in rows})
+
     async def fetch_member(self, user_id: str):
-        cached = valkey.get(f"db:server_user:{self.id}:{user_id}")
+        return await member_fetches.do((self.id, user_id), self._fetch_member, user_id)
+
+    async def _fetch_member(self, user_id: str):
+        cached = await valkey.get(f"db:server_user:{self.id}:{user_id}")
         if cached:
-            return ServerUser(cached.decode("utf-8"))
+            return ServerUser(decoder.decode(cached.decode("utf-8")))
         async with DBConnection() as db:
             try:
                 result = await db.query(loadQuery("getGuildUser"), {"guild": self.id, "id": user_id})
@@ -348,10 +507,10 @@ class Server(DatabaseModel):
             else:
                 if resultExists(result):
                     raw = result[0]["result"][0]
-                    valkey.set(f"db:server_user:{self.id}:{user_id}", encoder.encode(raw), 86400)
+                    await valkey.set(f"db:server_user:{self.id}:{user_id}", encoder.encode(raw), 86400)
                     return ServerUser(raw)
                 else:
-                    raise DatabaseError(result[0]["result"])
+                    raise NotInServer
     
     async def create_member(
         self,
@@ -376,7 +535,9 @@ class Server(DatabaseModel):
             else:
                 if resultExists(result):
                     raw = result[0]["result"][0]
-                    valkey.set(f"db:server_user:{self.id}:{user_id}", encoder.encode(raw), 86400)
+                    await valkey.set(f"db:server_user:{self.id}:{user_id}", encoder.encode(raw), 86400)
+                    member_fetches.forget((self.id, user_id))
+                    await leaderboard.set_scores(self.id, {user_id: xp})
                     return ServerUser(raw)
                 else:
                     raise DatabaseError(result[0]["result"])
@@ -384,7 +545,7 @@ class Server(DatabaseModel):
     async def users_with_roles(self, roles: List[Union[str, int]]) -> List[str]:
         roles = str(hash(tuple(roles)))
         key = f"db:users_with_roles:{self.id}:{roles}"
-        cached = valkey.get(key)
+        cached = await valkey.get(key)
         if cached:
             return cached
         async with DBConnection() as db:
@@ -398,7 +559,7 @@ class Server(DatabaseModel):
             else:
                 if resultExists(result):
                     raw = [item["user_id"] for item in result[0]["result"]]
-                    valkey.set(key, encoder.encode(raw), 900)
+                    await valkey.set(key, encoder.encode(raw), 900)
                     return raw
                 else:
                     raise DatabaseError(result[0]["result"])
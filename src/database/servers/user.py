@@ -1,9 +1,11 @@
 from database import DBConnection, loadQuery, resultExists, valkey, encoder, decoder, UserPermissions, DatabaseModel
 from typing import Optional, TypedDict, List, Dict, Optional, Union
+from database.statuses import scheduler, status_from_raw
 from database.exceptions import DatabaseError
 from core.images import IMAGE_DEFAULT_AVATAR
 from surrealdb.ws import SurrealException
 from datetime import datetime
+from . import leaderboard
 from enum import Enum
 
 import guilded
@@ -67,8 +69,10 @@ class ServerUser(DatabaseModel):
             else:
                 if resultExists(response):
                     raw = response[0]["result"][0]
-                    valkey.set(f"db:reminder:{self.server_id}:{self.user_id}:{raw['id']}", encoder.encode(raw))
-                    return Reminder(raw)
+                    await valkey.set(f"db:reminder:{self.server_id}:{self.user_id}:{raw['id']}", encoder.encode(raw))
+                    reminder = Reminder(raw)
+                    scheduler.schedule(reminder)
+                    return reminder
                 else:
                     raise DatabaseError("Failed to create reminder")
     
@@ -85,7 +89,7 @@ class ServerUser(DatabaseModel):
             else:
                 self.roles = roles
                 self.__raw["roles"] = roles
-                valkey.set(f"db:server_user:{self.server_id}:{self.user_id}", encoder.encode(self.__raw), 86400)
+                await valkey.set(f"db:server_user:{self.server_id}:{self.user_id}", encoder.encode(self.__raw), 86400)
     
     async def set_perms(self, perms: UserPermissions):
         async with DBConnection() as db:
@@ -101,7 +105,7 @@ class ServerUser(DatabaseModel):
             else:
                 self.perms = perms
                 self.__raw["perms"] = str(perms)
-                valkey.set(f"db:server_user:{self.server_id}:{self.user_id}", encoder.encode(self.__raw), 86400)
+                await valkey.set(f"db:server_user:{self.server_id}:{self.user_id}", encoder.encode(self.__raw), 86400)
     
     async def set_banned(self, banned: bool):
         async with DBConnection() as db:
@@ -116,7 +120,7 @@ class ServerUser(DatabaseModel):
             else:
                 self.is_banned = banned
                 self.__raw["is_banned"] = banned
-                valkey.set(f"db:server_user:{self.server_id}:{self.user_id}", encoder.encode(self.__raw), 86400)
+                await valkey.set(f"db:server_user:{self.server_id}:{self.user_id}", encoder.encode(self.__raw), 86400)
     
     async def set_note(self, note: str):
         async with DBConnection() as db:
@@ -131,7 +135,7 @@ class ServerUser(DatabaseModel):
             else:
                 self.note = note
                 self.__raw["note"] = note
-                valkey.set(f"db:server_user:{self.server_id}:{self.user_id}", encoder.encode(self.__raw), 86400)
+                await valkey.set(f"db:server_user:{self.server_id}:{self.user_id}", encoder.encode(self.__raw), 86400)
     
     async def set_xp(self, xp: int):
         async with DBConnection() as db:
@@ -146,7 +150,8 @@ class ServerUser(DatabaseModel):
             else:
                 self.xp = xp
                 self.__raw["xp"] = xp
-                valkey.set(f"db:server_user:{self.server_id}:{self.user_id}", encoder.encode(self.__raw), 86400)
+                await valkey.set(f"db:server_user:{self.server_id}:{self.user_id}", encoder.encode(self.__raw), 86400)
+                await leaderboard.set_scores(self.server_id, {self.user_id: xp})
     
     async def delete(self):
         async with DBConnection() as db:
@@ -158,7 +163,8 @@ class ServerUser(DatabaseModel):
             except SurrealException as e:
                 raise DatabaseError(str(e))
             else:
-                valkey.delete(f"db:server_user:{self.server_id}:{self.user_id}")
+                await valkey.delete(f"db:server_user:{self.server_id}:{self.user_id}")
+                await leaderboard.remove(self.server_id, self.user_id)
     
     async def unban(self):
         async with DBConnection() as db:
@@ -169,6 +175,8 @@ class ServerUser(DatabaseModel):
                 })
             except SurrealException as e:
                 raise DatabaseError(str(e))
+            else:
+                scheduler.cancel_for(self.server_id, self.user_id, ["tempban"])
     
     async def warn(
         self,
@@ -179,13 +187,15 @@ class ServerUser(DatabaseModel):
         async with DBConnection() as db:
             try:
                 if ends:
-                    await db.query(loadQuery("tempWarnUser"), {
+                    response = await db.query(loadQuery("tempWarnUser"), {
                         "guild_id": self.server_id,
                         "user_id": self.user_id,
                         "issuer": issuer,
                         "reason": reason,
                         "ends": ends
                     })
+                    if resultExists(response):
+                        scheduler.schedule(status_from_raw(response[0]["result"][0]))
                 else:
                     await db.query(loadQuery("warnUser"), {
                         "guild_id": self.server_id,
@@ -204,7 +214,7 @@ class ServerUser(DatabaseModel):
     ):
         async with DBConnection() as db:
             try:
-                await db.query(loadQuery("tempBanUser"), {
+                response = await db.query(loadQuery("tempBanUser"), {
                     "guild_id": self.server_id,
                     "user_id": self.user_id,
                     "reason": reason,
@@ -212,6 +222,9 @@ class ServerUser(DatabaseModel):
                 })
             except SurrealException as e:
                 raise DatabaseError(str(e))
+            else:
+                if resultExists(response):
+                    scheduler.schedule(status_from_raw(response[0]["result"][0]))
     
     async def clear_statuses(
         self,
@@ -227,4 +240,6 @@ class ServerUser(DatabaseModel):
                     "types": types
                 })
             except SurrealException as e:
-                raise DatabaseError(str(e))
\ No newline at end of file
+                raise DatabaseError(str(e))
+            else:
+                scheduler.cancel_for(self.server_id, self.user_id, types)
\ No newline at end of file
@@ -0,0 +1,46 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from .exceptions import NotFound
+from .cache import LocalCache
+
+import asyncio
+
+class SingleFlight:
+    """
+    Coalesces concurrent lookups for the same key into a single call.
+
+    While a call for a key is in flight every other caller for that key
+    awaits its result instead of querying the database again. Lookups
+    that raise :class:`NotFound` are remembered for ``negative_ttl``
+    seconds so bursts of misses don't all reach the database.
+    """
+
+    def __init__(self, name: str, negative_ttl: float=5, negative_size: int=10000):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._not_found = LocalCache(f"{name}_not_found", negative_size, negative_ttl)
+
+    async def do(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        missing = self._not_found.get(key)
+        if missing is not None:
+            exc_type, exc_args = missing
+            raise exc_type(*exc_args)
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run(key, func, *args, **kwargs))
+            self._inflight[key] = task
+        # shielded so a cancelled caller doesn't cancel the lookup for everyone else
+        return await asyncio.shield(task)
+
+    async def _run(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        try:
+            return await func(*args, **kwargs)
+        except NotFound as e:
+            self._not_found.set(key, (type(e), e.args))
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def forget(self, key: Hashable):
+        """Drops a remembered miss, e.g. once the row has been created."""
+        self._not_found.discard(key)
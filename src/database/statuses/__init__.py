@@ -1,13 +1,17 @@
 from database import DBConnection, loadQuery, resultExists, valkey, encoder, decoder
 from database.exceptions import DatabaseError, NotFound
+from database.singleflight import SingleFlight
 from surrealdb.ws import SurrealException
 from typing import Union, List
 
 from .status import *
+from .scheduler import scheduler
+
+status_fetches = SingleFlight("status")
 
 async def get_statuses(types: List[str], guild_id:str, user_id:str) -> List[Union[UserStatus, Warning, TempBan, Reminder, Autorole, Mute]]:
     key = f"db:statuses:{guild_id}:{user_id}:{str(hash(tuple(types)))}"
-    cached = valkey.get(key)
+    cached = await valkey.get(key)
     if cached:
         raw = decoder.decode(cached.decode("utf-8"))
         res = []
@@ -36,7 +40,7 @@ async def get_statuses(types: List[str], guild_id:str, user_id:str) -> List[Unio
             raise DatabaseError(str(e))
 
         if resultExists(result):
-            valkey.set(key, encoder.encode(result[0]["result"]), 60)
+            await valkey.set(key, encoder.encode(result[0]["result"]), 60)
             res = []
             for raw in result[0]["result"]:
                 if raw["type"] == "warn":
@@ -54,7 +58,10 @@ async def get_statuses(types: List[str], guild_id:str, user_id:str) -> List[Unio
             return res
 
 async def get_status(id: str) -> Union[UserStatus, Warning, TempBan, Reminder, Autorole, Mute]:
-    cached = valkey.get(f"db:statuses:{id}")
+    return await status_fetches.do(id, _get_status, id)
+
+async def _get_status(id: str) -> Union[UserStatus, Warning, TempBan, Reminder, Autorole, Mute]:
+    cached = await valkey.get(f"db:statuses:{id}")
     if cached:
         raw = decoder.decode(cached.decode("utf-8"))
         if raw["type"] == "warn":
@@ -71,15 +78,15 @@ async def get_status(id: str) -> Union[UserStatus, Warning, TempBan, Reminder, A
             return UserStatus(raw)
     async with DBConnection() as db:
         try:
-            result = await db.query(loadQuery("getStatus", {
+            result = await db.query(loadQuery("getStatus"), {
                 "id": id
-            }))
+            })
         except SurrealException as e:
             raise DatabaseError(str(e))
 
         if resultExists(result):
             raw = result[0]["result"][0]
-            valkey.set(f"db:statuses:{id}", encoder.encode(raw), 86400)
+            await valkey.set(f"db:statuses:{id}", encoder.encode(raw), 86400)
             if raw["type"] == "warn":
                 return Warning(raw)
             elif raw["type"] == "tempban":
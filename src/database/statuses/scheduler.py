@@ -0,0 +1,199 @@
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Union
+from database import DBConnection, loadQuery, resultExists
+from database.exceptions import DatabaseError
+from surrealdb.ws import SurrealException
+from datetime import datetime
+
+from .status import UserStatus, status_from_raw
+
+import traceback
+import asyncio
+import heapq
+import time
+
+# How far ahead the database is queried for statuses that will expire,
+# and how often that window is moved forward. The interval has to be
+# shorter than the window so consecutive windows overlap.
+LOOKAHEAD = 60 * 10
+REFRESH_INTERVAL = 60 * 5
+RETRY_DELAY = 30
+
+Handler = Callable[[UserStatus], Awaitable[bool]]
+
+def _timestamp(value: Union[str, datetime]) -> float:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    # SurrealDB returns RFC 3339 with nanosecond precision, which
+    # datetime.fromisoformat can't parse, so trim it to microseconds
+    value = value.replace("Z", "+00:00")
+    if "." in value:
+        head, tail = value.split(".", 1)
+        digits = "".join(c for c in tail if c.isdigit())
+        offset = tail[len(digits):]
+        value = f"{head}.{digits[:6].ljust(6, '0')}{offset}"
+    return datetime.fromisoformat(value).timestamp()
+
+async def get_upcoming_statuses(types: List[str], window: int) -> List[UserStatus]:
+    async with DBConnection() as db:
+        try:
+            result = await db.query(loadQuery("getUpcomingStatuses"), {
+                "types": types,
+                "window": f"{window}s"
+            })
+        except SurrealException as e:
+            raise DatabaseError(str(e))
+
+        if resultExists(result):
+            return [status_from_raw(raw) for raw in result[0]["result"]]
+        else:
+            return []
+
+class StatusScheduler:
+    """
+    Fires a handler for each user status exactly when it ends.
+
+    Statuses ending within the next :data:`LOOKAHEAD` seconds are kept in
+    an in-memory heap. The database is only read at startup and when the
+    window moves forward; statuses created by this process are scheduled
+    directly through :meth:`schedule`.
+
+    A handler returns ``True`` once the status has been dealt with and can
+    be deleted, or ``False`` to have it retried after :data:`RETRY_DELAY`.
+    """
+
+    def __init__(self):
+        self.handlers: Dict[str, Handler] = {}
+
+        self._heap: List[Tuple[float, int, str]] = []
+        self._scheduled: Dict[str, Tuple[float, UserStatus]] = {}
+        self._counter = 0
+        self._firing: set = set()
+        # Statuses waiting to be retried, which a refresh mustn't move back
+        # to their original end time
+        self._retrying: set = set()
+        self._horizon: float = 0
+        self._refresh_at: float = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, types: Union[str, List[str]], handler: Handler):
+        if isinstance(types, str):
+            types = [types]
+        for type in types:
+            self.handlers[type] = handler
+
+    def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    def schedule(self, status: UserStatus, at: float=None):
+        if status.type not in self.handlers or (at is None and not status.ends_at):
+            return
+        if status.id in self._firing:
+            return
+        if at is None:
+            at = _timestamp(status.ends_at)
+        if at > self._horizon:
+            # Picked up by the refresh which moves the window past it
+            return
+        existing = self._scheduled.get(status.id)
+        if existing is not None and existing[0] == at:
+            return
+        self._counter += 1
+        self._scheduled[status.id] = (at, status)
+        heapq.heappush(self._heap, (at, self._counter, status.id))
+        if self._wakeup is not None and self._heap[0][2] == status.id:
+            self._wakeup.set()
+
+    def cancel(self, id: str):
+        # The heap entry is skipped once it's popped
+        self._scheduled.pop(id, None)
+        self._retrying.discard(id)
+
+    def cancel_for(self, guild_id: str, user_id: str, types: List[str]):
+        for id, (_, status) in list(self._scheduled.items()):
+            if status.guild_id == guild_id and status.user_id == user_id and status.type in types:
+                del self._scheduled[id]
+                self._retrying.discard(id)
+
+    async def refresh(self):
+        now = time.time()
+        statuses = await get_upcoming_statuses(list(self.handlers.keys()), LOOKAHEAD)
+        self._horizon = now + LOOKAHEAD
+        for status in statuses:
+            if status.id in self._retrying:
+                continue
+            self.schedule(status)
+
+    def _pop_due(self, now: float) -> List[UserStatus]:
+        due = []
+        while len(self._heap) > 0 and self._heap[0][0] <= now:
+            at, _, id = heapq.heappop(self._heap)
+            entry = self._scheduled.get(id)
+            # Skip cancelled statuses and entries superseded by a reschedule
+            if entry is None or entry[0] != at:
+                continue
+            del self._scheduled[id]
+            self._retrying.discard(id)
+            due.append(entry[1])
+        return due
+
+    async def _fire(self, statuses: List[UserStatus]):
+        async def handle(status: UserStatus) -> bool:
+            try:
+                return await self.handlers[status.type](status)
+            except Exception:
+                traceback.print_exc()
+                return False
+
+        self._firing.update(status.id for status in statuses)
+        try:
+            results = await asyncio.gather(*[handle(status) for status in statuses])
+        finally:
+            self._firing.difference_update(status.id for status in statuses)
+        to_expire = []
+        retry_at = time.time() + RETRY_DELAY
+        for status, done in zip(statuses, results):
+            if done:
+                to_expire.append(status.id)
+            else:
+                self.schedule(status, retry_at)
+                if status.id in self._scheduled:
+                    self._retrying.add(status.id)
+
+        if len(to_expire) > 0:
+            import database
+            try:
+                await database.statuses.expire_statuses(to_expire)
+            except Exception:
+                # They will be loaded and handled again by a later refresh
+                traceback.print_exc()
+
+    async def _run(self):
+        while True:
+            now = time.time()
+            if now >= self._refresh_at:
+                try:
+                    await self.refresh()
+                except Exception:
+                    traceback.print_exc()
+                    self._refresh_at = now + RETRY_DELAY
+                else:
+                    self._refresh_at = now + REFRESH_INTERVAL
+
+            due = self._pop_due(time.time())
+            if len(due) > 0:
+                await self._fire(due)
+                continue
+
+            next_at = self._refresh_at
+            if len(self._heap) > 0:
+                next_at = min(next_at, self._heap[0][0])
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(next_at - time.time(), 0))
+            except asyncio.TimeoutError:
+                pass
+
+scheduler = StatusScheduler()
@@ -21,6 +21,9 @@ class UserStatus(DatabaseModel):
                 })
             except SurrealException as e:
                 raise DatabaseError(str(e))
+            else:
+                import database
+                database.statuses.scheduler.cancel(self.id)
 
 class Reminder(UserStatus):
     def __init__(self, data: dict):
@@ -47,12 +50,26 @@ class Autorole(UserStatus):
     def __init__(self, data: dict):
         super().__init__(data)
         
-        self.role_id: str = data["role_id"]
-        self.autorole: str = data["autorole"]
+        self.role_id: str = data.get("role_id")
+        self.autorole: str = data.get("autorole", data.get("autorole_id"))
 
 class Mute(UserStatus):
     def __init__(self, data: dict):
         super().__init__(data)
 
         self.reason: str = data["reason"]
-        self.issuer: str = data["issuer"]
\ No newline at end of file
+        self.issuer: str = data["issuer"]
+
+def status_from_raw(raw: dict) -> UserStatus:
+    if raw["type"] == "warn":
+        return Warning(raw)
+    elif raw["type"] == "tempban":
+        return TempBan(raw)
+    elif raw["type"] == "reminder":
+        return Reminder(raw)
+    elif raw["type"] == "autorole":
+        return Autorole(raw)
+    elif raw["type"] == "mute":
+        return Mute(raw)
+    else:
+        return UserStatus(raw)
@@ -1,9 +1,14 @@
+from prometheus_client import Counter, Gauge, Histogram
+from .exceptions import DatabaseError
 from surrealdb import Surreal
+from typing import List, Optional
 from os import path
 
 import traceback
+import asyncio
 import config
 import glob
+import time
 import os
 
 queries = {}
@@ -17,19 +22,199 @@ def resultExists(result, index: int=0, accept_empty: bool=False):
 def loadQuery(name: str):
     return queries[name]
 
+## CONNECTION POOL ##
+
+POOL_ACQUIRE_WAIT = Histogram(
+    'db_pool_acquire_wait_seconds',
+    'Time spent waiting to acquire a pooled database connection'
+)
+POOL_CONNECTIONS = Gauge(
+    'db_pool_connections',
+    'Number of open pooled database connections'
+)
+POOL_INFLIGHT = Gauge(
+    'db_pool_inflight_queries',
+    'Number of queries currently holding a pooled database connection'
+)
+POOL_UTILIZATION = Gauge(
+    'db_pool_utilization_ratio',
+    'Fraction of the pool\'s in-flight query capacity currently in use'
+)
+POOL_RECONNECTS = Counter(
+    'db_pool_reconnects',
+    'Number of times a pooled database connection had to be re-established'
+)
+
+RECONNECT_ATTEMPTS = 5
+RECONNECT_BASE_DELAY = 0.5
+RECONNECT_MAX_DELAY = 10
+
+class PooledConnection:
+    """A long-lived, authenticated websocket connection owned by a :class:`ConnectionPool`."""
+
+    def __init__(self, pool: "ConnectionPool"):
+        self.pool = pool
+        self.db: Optional[Surreal] = None
+        self.inflight: int = 0
+        self.last_checked: float = 0
+        self.stale: bool = False
+
+    async def open(self):
+        delay = RECONNECT_BASE_DELAY
+        for attempt in range(RECONNECT_ATTEMPTS):
+            db = Surreal(f'ws://{config.DATABASE_IP}:{config.DATABASE_PORT}/rpc')
+            try:
+                await db.connect()
+                await db.signin({
+                    "user": config.DATABASE_USER,
+                    "pass": config.DATABASE_PASSWORD,
+                    "NS": config.DATABASE_NAMESPACE,
+                    "DB": config.DATABASE_DB,
+                })
+            except Exception as e:
+                try:
+                    await db.close()
+                except:
+                    pass
+                if attempt == RECONNECT_ATTEMPTS - 1:
+                    raise DatabaseError(f"Failed to connect to the database: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
+            else:
+                self.db = db
+                self.stale = False
+                self.last_checked = time.monotonic()
+                POOL_CONNECTIONS.inc()
+                return
+
+    async def close(self):
+        if self.db is None:
+            return
+        db, self.db = self.db, None
+        POOL_CONNECTIONS.dec()
+        try:
+            await db.close()
+        except:
+            traceback.print_exc()
+
+    async def ensure_healthy(self):
+        """
+        Opens the connection if needed and pings it when it was flagged as
+        stale or hasn't been checked within the health check interval,
+        reconnecting if the ping fails.
+        """
+        if self.db is None:
+            await self.open()
+            return
+        if not self.stale and time.monotonic() - self.last_checked < config.DATABASE_POOL_HEALTH_INTERVAL:
+            return
+        try:
+            await asyncio.wait_for(self.db.query("RETURN 1;"), config.DATABASE_POOL_ACQUIRE_TIMEOUT)
+        except Exception:
+            POOL_RECONNECTS.inc()
+            await self.close()
+            await self.open()
+        else:
+            self.stale = False
+            self.last_checked = time.monotonic()
+
+class ConnectionPool:
+    """
+    A size-bounded pool of long-lived database connections.
+
+    Each connection accepts at most ``max_inflight`` concurrent queries,
+    callers wait for a free slot once every connection is saturated.
+    """
+
+    def __init__(self, size: int, max_inflight: int=1):
+        self.size = size
+        self.max_inflight = max_inflight
+        self.connections: List[PooledConnection] = []
+        self.__condition: Optional[asyncio.Condition] = None
+
+    @property
+    def _condition(self) -> asyncio.Condition:
+        if self.__condition is None:
+            self.__condition = asyncio.Condition()
+        return self.__condition
+
+    @property
+    def inflight(self) -> int:
+        return sum(conn.inflight for conn in self.connections)
+
+    def _update_metrics(self):
+        inflight = self.inflight
+        POOL_INFLIGHT.set(inflight)
+        POOL_UTILIZATION.set(inflight / (self.size * self.max_inflight))
+
+    def _reserve(self) -> Optional[PooledConnection]:
+        # Connections still being opened or health checked can't be shared yet
+        available = [
+            conn for conn in self.connections
+            if conn.inflight == 0 or (conn.inflight < self.max_inflight and conn.db is not None and not conn.stale)
+        ]
+        # Prefer idle, already open connections before opening new ones
+        idle = [conn for conn in available if conn.inflight == 0 and conn.db is not None]
+        if len(idle) > 0:
+            conn = idle[0]
+        elif len(self.connections) < self.size:
+            conn = PooledConnection(self)
+            self.connections.append(conn)
+        elif len(available) > 0:
+            conn = min(available, key=lambda c: c.inflight)
+        else:
+            return None
+        conn.inflight += 1
+        return conn
+
+    async def acquire(self) -> PooledConnection:
+        started = time.monotonic()
+        async with self._condition:
+            try:
+                conn = await asyncio.wait_for(
+                    self._condition.wait_for(self._reserve),
+                    config.DATABASE_POOL_ACQUIRE_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                raise DatabaseError("Timed out waiting for a database connection")
+            self._update_metrics()
+
+        if conn.inflight == 1:
+            # Only the first borrower may (re)open the socket, others
+            # sharing it would otherwise have it closed underneath them.
+            try:
+                await conn.ensure_healthy()
+            except:
+                await self.release(conn, failed=True)
+                raise
+        POOL_ACQUIRE_WAIT.observe(time.monotonic() - started)
+        return conn
+
+    async def release(self, conn: PooledConnection, failed: bool=False):
+        async with self._condition:
+            conn.inflight -= 1
+            if failed:
+                conn.stale = True
+            self._update_metrics()
+            self._condition.notify()
+
+    async def close(self):
+        async with self._condition:
+            connections, self.connections = self.connections, []
+            for conn in connections:
+                await conn.close()
+            self._update_metrics()
+
+pool = ConnectionPool(config.DATABASE_POOL_SIZE, config.DATABASE_POOL_MAX_INFLIGHT)
+
 class DBConnection:
+    """Borrows a connection from the shared pool for the duration of an ``async with`` block."""
+
     async def __aenter__(self):
-        self.db = Surreal(f'ws://{config.DATABASE_IP}:{config.DATABASE_PORT}/rpc')
-        await self.db.connect()
-        await self.db.signin({
-            "user": config.DATABASE_USER,
-            "pass": config.DATABASE_PASSWORD,
-            "NS": config.DATABASE_NAMESPACE,
-            "DB": config.DATABASE_DB,
-        })
-
-        return self.db
-    
+        self.connection = await pool.acquire()
+        return self.connection.db
+
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.db.close()
-        self.db = None
\ No newline at end of file
+        # Any error raised while holding the connection gets it pinged before its next use
+        await pool.release(self.connection, failed=exc_type is not None)
+        self.connection = None
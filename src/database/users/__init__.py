@@ -1,15 +1,22 @@
 from database import DBConnection, loadQuery, resultExists, valkey, encoder, decoder
 from database.exceptions import DatabaseError, NotFound
+from database.singleflight import SingleFlight
 from core.images import IMAGE_DEFAULT_AVATAR
 from surrealdb.ws import SurrealException
-from typing import Union
+from typing import List, Union
 
 from .user import User
 from .identifier import Identifier
 
 import guilded
 
+user_fetches = SingleFlight("user")
+user_creates = SingleFlight("user_create")
+
 async def fetch_or_create_user(user: Union[guilded.User, guilded.Member]) -> User:
+    return await user_creates.do(user.id, _fetch_or_create_user, user)
+
+async def _fetch_or_create_user(user: Union[guilded.User, guilded.Member]) -> User:
     try:
         user = await fetch_user(user.id)
     except NotFound:
@@ -17,7 +24,10 @@ async def fetch_or_create_user(user: Union[guilded.User, guilded.Member]) -> Use
     return user
 
 async def fetch_user(id: str) -> User:
-    cached = valkey.get(f"db:user:{id}")
+    return await user_fetches.do(id, _fetch_user, id)
+
+async def _fetch_user(id: str) -> User:
+    cached = await valkey.get(f"db:user:{id}")
     if cached:
         return User(decoder.decode(cached.decode("utf-8")))
     async with DBConnection() as db:
@@ -30,7 +40,7 @@ async def fetch_user(id: str) -> User:
         else:
             if resultExists(response):
                 raw = response[0]["result"][0]
-                valkey.set(f"db:user:{id}", encoder.encode(raw), 86400)
+                await valkey.set(f"db:user:{id}", encoder.encode(raw), 86400)
                 return User(raw)
             else:
                 raise NotFound
@@ -48,11 +58,27 @@ async def create_user(id: str, name: str, avatar: str=IMAGE_DEFAULT_AVATAR) -> U
         else:
             if resultExists(response):
                 raw = response[0]["result"][0]
-                valkey.set(f"db:user:{id}", encoder.encode(raw), 86400)
+                await valkey.set(f"db:user:{id}", encoder.encode(raw), 86400)
+                user_fetches.forget(id)
                 return User(raw)
 
+async def create_users(users: List[dict]):
+    """
+    Creates many users with one multi-row INSERT, skipping any that
+    already exist. Each item needs an ``id``, ``name`` and ``avatar``.
+    """
+    if len(users) == 0:
+        return
+    async with DBConnection() as db:
+        try:
+            await db.query(loadQuery("bulkCreateUsers"), {"users": users})
+        except SurrealException as e:
+            raise DatabaseError(str(e))
+    for user in users:
+        user_fetches.forget(user["id"])
+
 async def fetch_identifier(user_id: str):
-    cached = valkey.get(f"db:identifier:{user_id}")
+    cached = await valkey.get(f"db:identifier:{user_id}")
     if cached:
         return Identifier(decoder.decode(cached.decode("utf-8")))
     async with DBConnection() as db:
@@ -65,7 +91,7 @@ async def fetch_identifier(user_id: str):
         else:
             if resultExists(response):
                 raw = response[0]["result"][0]
-                valkey.set(f"db:identifier:{user_id}", encoder.encode(raw))
+                await valkey.set(f"db:identifier:{user_id}", encoder.encode(raw))
                 return Identifier(raw)
             else:
                 raise NotFound
@@ -81,7 +107,7 @@ async def create_identifier(user_id: str):
         else:
             if resultExists(response):
                 raw = response[0]["result"][0]
-                valkey.set(f"db:identifier:{user_id}", encoder.encode(raw))
+                await valkey.set(f"db:identifier:{user_id}", encoder.encode(raw))
                 return Identifier(raw)
 
 async def find_matching_identifiers(
@@ -102,7 +128,7 @@ async def find_matching_identifiers(
             raise DatabaseError(str(e))
         else:
             for item in raw:
-                valkey.set(f"db:identifier:{item['id']}", encoder.encode(item), 86400)
+                await valkey.set(f"db:identifier:{item['id']}", encoder.encode(item), 86400)
             return [Identifier(raw) for raw in response[0]["result"]]
 
 async def count_users() -> int:
@@ -49,4 +49,4 @@ class Identifier(DatabaseModel):
                     self.__raw["browser_id"] = browser_id
             
             if connections or (vpn != None and hashed_ip != None and browser_id != None):
-                valkey.set(f"db:identifier:{self.id}", encoder.encode(self.__raw))
\ No newline at end of file
+                await valkey.set(f"db:identifier:{self.id}", encoder.encode(self.__raw))
\ No newline at end of file
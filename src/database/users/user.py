@@ -31,4 +31,4 @@ class User(DatabaseModel):
             else:
                 self.__raw['language'] = lang
                 self.language = lang
-                valkey.set(f"db:user{self.id}", encoder.encode(self.__raw), 86400)
\ No newline at end of file
+                await valkey.set(f"db:user{self.id}", encoder.encode(self.__raw), 86400)
\ No newline at end of file
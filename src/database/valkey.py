@@ -1,4 +1,109 @@
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import redis.asyncio as aioredis
+import asyncio
 import config
-import redis
 
-valkey = redis.Redis(host=config.VALKEY_IP, port=config.VALKEY_PORT, db=0)
\ No newline at end of file
+# Commands that block the connection server-side and therefore
+# must never be batched together with other commands
+BLOCKING_COMMANDS = {
+    "BLPOP", "BRPOP", "BRPOPLPUSH", "BLMOVE", "BLMPOP",
+    "BZPOPMIN", "BZPOPMAX", "BZMPOP", "XREAD", "XREADGROUP", "WAIT",
+}
+
+class Valkey(aioredis.Redis):
+    """
+    An asyncio valkey client which automatically pipelines commands.
+
+    Every command issued during the same event loop tick is queued and
+    sent to the server as a single non-transactional pipeline, so
+    concurrent coroutines share one network round-trip.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pending: List[Tuple[tuple, dict, asyncio.Future]] = []
+        self._flush_scheduled = False
+        # The loop only keeps weak references to tasks, so running flushes
+        # are held here until they finish
+        self._flushes: Set[asyncio.Task] = set()
+
+    async def execute_command(self, *args, **options):
+        if str(args[0]).upper() in BLOCKING_COMMANDS:
+            return await super().execute_command(*args, **options)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((args, options, future))
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            loop.call_soon(self._schedule_flush)
+        return await future
+
+    def _schedule_flush(self):
+        pending, self._pending = self._pending, []
+        self._flush_scheduled = False
+        task = asyncio.create_task(self._flush(pending))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, pending: List[Tuple[tuple, dict, asyncio.Future]]):
+        if len(pending) == 1:
+            args, options, future = pending[0]
+            try:
+                result = await super().execute_command(*args, **options)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+            return
+
+        try:
+            async with self.pipeline(transaction=False) as pipe:
+                for args, options, _ in pending:
+                    pipe.execute_command(*args, **options)
+                results = await pipe.execute(raise_on_error=False)
+        except Exception as e:
+            for _, _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, _, future), result in zip(pending, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Optional[bytes]]:
+        """Fetches several keys with a single MGET, returning a mapping of key to value."""
+        keys = list(keys)
+        if len(keys) == 0:
+            return {}
+        return dict(zip(keys, await self.mget(keys)))
+
+    async def set_many(self, mapping: Dict[str, Any], ex: int=None):
+        """
+        Sets several keys at once. Uses MSET when no expiry is given,
+        otherwise issues a SET per key which get pipelined together.
+        """
+        if len(mapping) == 0:
+            return
+        if ex is None:
+            await self.mset(mapping)
+        else:
+            await asyncio.gather(*[
+                self.set(key, value, ex) for key, value in mapping.items()
+            ])
+
+pool = aioredis.ConnectionPool(
+    host=config.VALKEY_IP,
+    port=config.VALKEY_PORT,
+    db=0,
+    max_connections=config.VALKEY_MAX_CONNECTIONS,
+)
+valkey = Valkey(connection_pool=pool)
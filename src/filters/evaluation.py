@@ -21,30 +21,35 @@ def _load_model():
     except:
         return None
 
+def load_tokenizer() -> Tokenizer:
+    with open(TOKENIZER_LOC, 'rb') as handle:
+        return pickle.load(handle)
+
+def predict_batch(comments: list, rnn_model, tokenizer: Tokenizer) -> list:
+    """
+    Makes predictions for several comments in one forward pass
+    """
+    comments = [clean_text(comment) for comment in comments]
+
+    sequences = tokenizer.texts_to_sequences(comments)
+    padded_sequences = pad_sequences(sequences, maxlen=MAX_SEQUENCE_LENGTH)
+
+    predictions = rnn_model.predict_on_batch(padded_sequences)
+
+    results = []
+    for prediction in predictions:
+        parsed = {}
+        i = 0
+        for label in DETECTION_CLASSES:
+            parsed[label] = float(prediction[i])
+            i += 1
+        results.append(parsed)
+    return results
+
 def predict(comment: str, rnn_model=None):
     """
     Makes prediction
     """
-    with open(TOKENIZER_LOC, 'rb') as handle:
-        tokenizer: Tokenizer = pickle.load(handle)
-    
     if not rnn_model:
         rnn_model = load_model(MODEL_LOC)
-    
-    comment = clean_text(comment)
-    
-    sequences = tokenizer.texts_to_sequences([comment])
-    padded_sequence = pad_sequences(sequences, maxlen=MAX_SEQUENCE_LENGTH)
-    # print(f'Sequence of "{comment}" is {padded_sequence}')
-
-    prediction = rnn_model.predict(padded_sequence,
-                                   steps=1,
-                                   verbose=1)
-
-    prediction = prediction[0]
-    parsed = {}
-    i = 0
-    for label in DETECTION_CLASSES:
-        parsed[label] = prediction[i]
-        i += 1
-    return parsed
\ No newline at end of file
+    return predict_batch([comment], rnn_model, load_tokenizer())[0]
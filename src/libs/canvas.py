@@ -1,13 +1,85 @@
-from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageOps
+from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageOps, ImageChops, ImageStat
+from collections import OrderedDict
 from os import path, PathLike
-from typing import Self
+from typing import Dict, Optional, Self, Tuple
 
+import threading
 import requests
 import base64
 import io
 
+DOWNLOAD_TIMEOUT = 10
+
+## Asset Cache ##
+
+class AssetCache:
+    """
+    Downloaded images and their dominant colours, keyed by URL.
+
+    Images are kept encoded and evicted least recently used first once
+    their combined size passes ``max_bytes``.
+    """
+
+    def __init__(self, max_bytes: int=64 * 1024 * 1024, max_colors: int=4096):
+        self.max_bytes = max_bytes
+        self.max_colors = max_colors
+        self.size = 0
+        self._images: OrderedDict[str, bytes] = OrderedDict()
+        self._colors: OrderedDict[str, tuple] = OrderedDict()
+
+    def download(self, url: str) -> bytes:
+        content = self._images.get(url)
+        if content is not None:
+            self._images.move_to_end(url)
+            return content
+
+        response = requests.get(url, timeout=DOWNLOAD_TIMEOUT)
+        if not response.ok:
+            raise ValueError(f"Image download failed with status <{response.status_code}> and response: {response.text}")
+        content = response.content
+        if len(content) <= self.max_bytes:
+            self._images[url] = content
+            self.size += len(content)
+            while self.size > self.max_bytes:
+                _, evicted = self._images.popitem(last=False)
+                self.size -= len(evicted)
+        return content
+
+    def open(self, url: str) -> Image.Image:
+        return Image.open(io.BytesIO(self.download(url)))
+
+    def get_color(self, url: str) -> tuple:
+        color = self._colors.get(url)
+        if color is not None:
+            self._colors.move_to_end(url)
+        return color
+
+    def set_color(self, url: str, color: tuple):
+        self._colors[url] = color
+        self._colors.move_to_end(url)
+        if len(self._colors) > self.max_colors:
+            self._colors.popitem(last=False)
+
+assets = AssetCache()
+
 ## Filters ##
 
+def opaque_mask(mask: Image.Image) -> Image.Image:
+    """Returns an ``L`` mask which is fully opaque wherever ``mask`` has any non-zero channel."""
+    bands = mask.convert("RGBA").split()
+    combined = bands[0]
+    for band in bands[1:]:
+        combined = ImageChops.lighter(combined, band)
+    return combined.point(lambda v: 255 if v else 0)
+
+def invert(image: Image.Image) -> Image.Image:
+    # ImageOps.invert doesn't support RGBA, so leave the alpha channel be
+    if image.mode == "RGBA":
+        r, g, b, a = image.split()
+        r, g, b = ImageOps.invert(Image.merge("RGB", (r, g, b))).split()
+        return Image.merge("RGBA", (r, g, b, a))
+    return ImageOps.invert(image)
+
 class Filter:
     def apply(self, image: Image.Image, draw: ImageDraw.Draw):
         return image
@@ -41,11 +113,7 @@ class BlurBehind(Filter):
         size: tuple,
         mask: Image.Image=None
     ):
-        mask = mask.convert("RGBA")
-        for x in range(mask.width):
-            for y in range(mask.height):
-                if mask.getpixel((x, y)) != (0, 0, 0, 0):
-                    mask.putpixel((x, y), (255, 255, 255, 255))
+        mask = opaque_mask(mask)
 
         crop = image.crop((pos[0], pos[1], pos[0] + size[0], pos[1] + size[1]))
         crop = crop.filter(ImageFilter.GaussianBlur(radius=self.radius))
@@ -65,11 +133,7 @@ class GrayscaleBehind(Filter):
         size: tuple,
         mask: Image.Image=None
     ):
-        mask = mask.convert("RGBA")
-        for x in range(mask.width):
-            for y in range(mask.height):
-                if mask.getpixel((x, y)) != (0, 0, 0, 0):
-                    mask.putpixel((x, y), (255, 255, 255, 255))
+        mask = opaque_mask(mask)
 
         crop = image.crop((pos[0], pos[1], pos[0] + size[0], pos[1] + size[1]))
         crop = ImageOps.grayscale(crop)
@@ -78,7 +142,7 @@ class GrayscaleBehind(Filter):
 
 class Invert(Filter):
     def apply(self, image: Image.Image, draw: ImageDraw.Draw):
-        return ImageOps.invert(image)
+        return invert(image)
 
 class InvertBehind(Filter):
     def before_render(
@@ -89,19 +153,51 @@ class InvertBehind(Filter):
         size: tuple,
         mask: Image.Image=None
     ):
-        mask = mask.convert("RGBA")
-        for x in range(mask.width):
-            for y in range(mask.height):
-                if mask.getpixel((x, y)) != (0, 0, 0, 0):
-                    mask.putpixel((x, y), (255, 255, 255, 255))
+        mask = opaque_mask(mask)
 
         crop = image.crop((pos[0], pos[1], pos[0] + size[0], pos[1] + size[1]))
-        crop = ImageOps.invert(crop)
+        crop = invert(crop)
         image.paste(crop, (pos[0], pos[1], pos[0] + size[0], pos[1] + size[1]), mask)
         return image
 
 ## Core Classes ##
 
+class FontRegistry:
+    """
+    Process-wide store of font faces. Each file is read from disk once
+    and every (file, size) variant is only parsed the first time a thread
+    asks for it. FreeType faces can't be used from several threads at
+    once, so each thread gets its own variants.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._files: Dict[str, bytes] = {}
+        self._local = threading.local()
+
+    def get(self, file: PathLike, size: int=10) -> ImageFont.FreeTypeFont:
+        file = path.abspath(file)
+        key = (file, size)
+        variants: Optional[Dict[Tuple[str, int], ImageFont.FreeTypeFont]] = getattr(self._local, "variants", None)
+        if variants is None:
+            variants = self._local.variants = {}
+        font = variants.get(key)
+        if font is not None:
+            return font
+        data = self._files.get(file)
+        if data is None:
+            with self._lock:
+                data = self._files.get(file)
+                if data is None:
+                    with open(file, "rb") as f:
+                        data = f.read()
+                    self._files[file] = data
+        font = ImageFont.truetype(io.BytesIO(data), size)
+        variants[key] = font
+        return font
+
+fonts = FontRegistry()
+
 class FontSet:
     def __init__(
         self,
@@ -110,29 +206,40 @@ class FontSet:
         italic: PathLike=None,
         bold_italic: PathLike=None
     ):
-        self.base = ImageFont.truetype(base)
-        self.bold = ImageFont.truetype(bold) if bold else None
-        self.italic = ImageFont.truetype(italic) if italic else None
-        self.bold_italic = ImageFont.truetype(bold_italic) if bold_italic else None
+        self.paths = {
+            "base": base,
+            "bold": bold,
+            "italic": italic,
+            "bold_italic": bold_italic,
+        }
+        self.base = fonts.get(base)
+        self.bold = fonts.get(bold) if bold else None
+        self.italic = fonts.get(italic) if italic else None
+        self.bold_italic = fonts.get(bold_italic) if bold_italic else None
     
     def get(self, size: int=14, bold: bool=False, italic: bool=False):
-        font = self.base
+        face = "base"
         if bold:
-            font = self.bold
+            face = "bold"
         if italic:
-            font = self.italic
+            face = "italic"
         if bold and italic:
-            font = self.bold_italic
-        return font.font_variant(size=size)
+            face = "bold_italic"
+        return fonts.get(self.paths[face], size)
     
     @classmethod
     def default(cls):
-        return cls(
-            path.join(path.dirname(__file__), "..", "fonts", "LiberationSans-Regular.ttf"),
-            path.join(path.dirname(__file__), "..", "fonts", "LiberationSans-Bold.ttf"),
-            path.join(path.dirname(__file__), "..", "fonts", "LiberationSans-Italic.ttf"),
-            path.join(path.dirname(__file__), "..", "fonts", "LiberationSans-BoldItalic.ttf")
-        )
+        global _default_font_set
+        if _default_font_set is None:
+            _default_font_set = cls(
+                path.join(path.dirname(__file__), "..", "fonts", "LiberationSans-Regular.ttf"),
+                path.join(path.dirname(__file__), "..", "fonts", "LiberationSans-Bold.ttf"),
+                path.join(path.dirname(__file__), "..", "fonts", "LiberationSans-Italic.ttf"),
+                path.join(path.dirname(__file__), "..", "fonts", "LiberationSans-BoldItalic.ttf")
+            )
+        return _default_font_set
+
+_default_font_set: FontSet = None
 
 class Canvas:
     def __init__(
@@ -158,10 +265,7 @@ class Canvas:
 
     @classmethod
     def from_url(cls, url: str, *args, **kwargs) -> Self:
-        response = requests.get(url)
-        if response.ok:
-            return cls(Image.open(io.BytesIO(response.content)), *args, **kwargs)
-        raise ValueError(f"Failed to download image with status <{response.status_code}> and response: {response.text}")
+        return cls(*args, image=assets.open(url), width=None, height=None, **kwargs)
     
     @classmethod
     def from_path(cls, path: PathLike, *args, **kwargs) -> Self:
@@ -172,6 +276,11 @@ class Canvas:
     def save(self, filename: str) -> None:
         self.image.save(filename)
     
+    def save_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        self.image.save(buffer, "PNG")
+        return buffer.getvalue()
+    
     def save_b64(self) -> bytes:
         buffer = io.BytesIO()
         self.image.save(buffer, "PNG")
@@ -209,35 +318,31 @@ class Canvas:
             else:
                 mask_draw.rounded_rectangle([(0, 0), size], radius, fill="white", corners=corners)
             
-            download = requests.get(image)
-            if download.ok:
-                im = Image.open(io.BytesIO(download.content))
-                im = ImageOps.fit(im, size, Image.Resampling.LANCZOS)
-                new_pos = self.get_position(pos, size, anchor_point)
-                if width > 0:
-                    self.draw.rounded_rectangle(
-                        [
-                            (new_pos[0] - width, new_pos[1] - width),
-                            (new_pos[0] + size[0] + width, new_pos[1] + size[1] + width)
-                        ],
-                        radius,
-                        fill=outline,
-                        corners=corners
-                    )
-                if crop:
-                    im = im.crop(crop)
-                for filter in filters:
-                    if getattr(filter, "before_render", None):
-                        self.image = filter.before_render(self.image, self.draw, new_pos, size, mask)
-                    if getattr(filter, "apply", None):
-                        im = filter.apply(im, self.draw)
-                if alpha < 255:
-                    self.image.alpha_composite(im, new_pos)
-                else:
-                    self.image.paste(im, (new_pos[0], new_pos[1], new_pos[0] + im.size[0], new_pos[1] + im.size[1]), mask)
-                return self
+            im = assets.open(image)
+            im = ImageOps.fit(im, size, Image.Resampling.LANCZOS)
+            new_pos = self.get_position(pos, size, anchor_point)
+            if width > 0:
+                self.draw.rounded_rectangle(
+                    [
+                        (new_pos[0] - width, new_pos[1] - width),
+                        (new_pos[0] + size[0] + width, new_pos[1] + size[1] + width)
+                    ],
+                    radius,
+                    fill=outline,
+                    corners=corners
+                )
+            if crop:
+                im = im.crop(crop)
+            for filter in filters:
+                if getattr(filter, "before_render", None):
+                    self.image = filter.before_render(self.image, self.draw, new_pos, size, mask)
+                if getattr(filter, "apply", None):
+                    im = filter.apply(im, self.draw)
+            if alpha < 255:
+                self.image.alpha_composite(im, new_pos)
             else:
-                raise ValueError(f"Image download failed with status <{download.status_code}> and response: {download.text}")
+                self.image.paste(im, (new_pos[0], new_pos[1], new_pos[0] + im.size[0], new_pos[1] + im.size[1]), mask)
+            return self
         else:
             new_pos = self.get_position(pos, size, anchor_point)
             im = Image.new("RGBA", size, (0, 0, 0, 0))
@@ -291,33 +396,29 @@ class Canvas:
             else:
                 mask_draw.ellipse([(0, 0), size], fill="white")
 
-            download = requests.get(image)
-            if download.ok:
-                im = Image.open(io.BytesIO(download.content))
-                im = ImageOps.fit(im, size, Image.Resampling.LANCZOS)
-                new_pos = self.get_position(pos, size, anchor_point)
-                if width > 0:
-                    self.draw.ellipse(
-                        [
-                            (new_pos[0] - width, new_pos[1] - width),
-                            (new_pos[0] + size[0] + width, new_pos[1] + size[1] + width)
-                        ],
-                        fill=outline,
-                    )
-                if crop:
-                    im = im.crop(crop)
-                for filter in filters:
-                    if getattr(filter, "before_render", None):
-                        self.image = filter.before_render(self.image, self.draw, new_pos, size, mask)
-                    if getattr(filter, "apply", None):
-                        im = filter.apply(im, self.draw)
-                if alpha < 255:
-                    self.image.alpha_composite(im, new_pos)
-                else:
-                    self.image.paste(im, (new_pos[0], new_pos[1], new_pos[0] + im.size[0], new_pos[1] + im.size[1]), mask)
-                return self
+            im = assets.open(image)
+            im = ImageOps.fit(im, size, Image.Resampling.LANCZOS)
+            new_pos = self.get_position(pos, size, anchor_point)
+            if width > 0:
+                self.draw.ellipse(
+                    [
+                        (new_pos[0] - width, new_pos[1] - width),
+                        (new_pos[0] + size[0] + width, new_pos[1] + size[1] + width)
+                    ],
+                    fill=outline,
+                )
+            if crop:
+                im = im.crop(crop)
+            for filter in filters:
+                if getattr(filter, "before_render", None):
+                    self.image = filter.before_render(self.image, self.draw, new_pos, size, mask)
+                if getattr(filter, "apply", None):
+                    im = filter.apply(im, self.draw)
+            if alpha < 255:
+                self.image.alpha_composite(im, new_pos)
             else:
-                raise ValueError(f"Image download failed with status <{download.status_code}> and response: {download.text}")
+                self.image.paste(im, (new_pos[0], new_pos[1], new_pos[0] + im.size[0], new_pos[1] + im.size[1]), mask)
+            return self
         else:
             new_pos = self.get_position(pos, size, anchor_point)
             im = Image.new("RGBA", size, (0, 0, 0, 0))
@@ -468,18 +569,14 @@ class Canvas:
     
     def get_dominant_color(self, image: Image.Image) -> tuple:
         if type(image) is str:
-            download = requests.get(image)
-            if download.ok:
-                image = Image.open(io.BytesIO(download.content))
-            else:
-                raise ValueError(f"Image download failed with status <{download.status_code}> and response: {download.text}")
+            url = image
+            color = assets.get_color(url)
+            if color is None:
+                color = self.get_dominant_color(assets.open(url))
+                assets.set_color(url, color)
+            return color
         image: Image.Image = image.convert("RGB")
         image.thumbnail((100, 100))
-        pixels = image.getdata()
-        r, g, b = 0, 0, 0
-        for pixel in pixels:
-            r += pixel[0]
-            g += pixel[1]
-            b += pixel[2]
-        total = len(pixels)
-        return (r // total, g // total, b // total)
\ No newline at end of file
+        r, g, b = ImageStat.Stat(image).sum
+        total = image.width * image.height
+        return (int(r) // total, int(g) // total, int(b) // total)
\ No newline at end of file
@@ -0,0 +1,220 @@
+from typing import Dict, Iterable, List
+from bisect import bisect_left
+from os import path
+
+from .wordfilter import Automaton, Span, canonicalize, censor, word_spans
+
+import hashlib
+import struct
+import mmap
+import uuid
+import os
+
+MAGIC = b"SGPI"
+# Bumped whenever the layout below or canonicalize() changes, so indexes
+# built by an older version are rebuilt instead of misread
+FORMAT_VERSION = 1
+
+# magic, format version, language count, node count, edge count,
+# output count, then the SHA-256 of the word lists it was built from
+HEADER = struct.Struct("<4sIIIII32s")
+LANGUAGE_CODE_SIZE = 8
+MAX_LANGUAGES = 32
+
+class ProfanityIndexError(Exception):
+    pass
+
+def digest(lists: Dict[str, Iterable[str]]) -> bytes:
+    """The SHA-256 an index built from ``lists`` records, see :attr:`ProfanityIndex.digest`."""
+    sha = hashlib.sha256()
+    for lang in sorted(lists):
+        sha.update(lang.encode("utf-8") + b"\0")
+        for word in lists[lang]:
+            sha.update(word.encode("utf-8") + b"\n")
+    return sha.digest()
+
+def build(lists: Dict[str, Iterable[str]], target: str):
+    """
+    Compiles word lists, keyed by language code, into an index at
+    ``target``. The file is written next to the target and moved into
+    place, so processes opening it never see a partial index.
+    """
+    lists = {lang: list(words) for lang, words in lists.items()}
+    languages = sorted(lists)
+    if len(languages) > MAX_LANGUAGES:
+        raise ProfanityIndexError(f"At most {MAX_LANGUAGES} languages can be indexed")
+
+    masks: Dict[str, int] = {}
+    for bit, lang in enumerate(languages):
+        for word in lists[lang]:
+            pattern = canonicalize(word.strip())[0]
+            if pattern:
+                masks[pattern] = masks.get(pattern, 0) | (1 << bit)
+
+    goto, fail, out = Automaton(masks.keys()).tables()
+
+    # The string spelled by each node, to tell which pattern an output
+    # length refers to once outputs have been merged along failure links
+    spelled = [""] * len(goto)
+    stack = [0]
+    while len(stack) > 0:
+        node = stack.pop()
+        for char, child in goto[node].items():
+            spelled[child] = spelled[node] + char
+            stack.append(child)
+
+    node_edges = [0]
+    edge_chars = []
+    edge_targets = []
+    node_outputs = [0]
+    node_masks = []
+    output_lengths = []
+    output_masks = []
+    for node in range(len(goto)):
+        for char, child in sorted(goto[node].items()):
+            edge_chars.append(ord(char))
+            edge_targets.append(child)
+        node_edges.append(len(edge_chars))
+        node_mask = 0
+        for length in out[node]:
+            mask = masks[spelled[node][-length:]]
+            output_lengths.append(length)
+            output_masks.append(mask)
+            node_mask |= mask
+        node_outputs.append(len(output_lengths))
+        node_masks.append(node_mask)
+
+    os.makedirs(path.dirname(path.abspath(target)), exist_ok=True)
+    temp = f"{target}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(temp, "wb") as f:
+            f.write(HEADER.pack(
+                MAGIC,
+                FORMAT_VERSION,
+                len(languages),
+                len(goto),
+                len(edge_chars),
+                len(output_lengths),
+                digest(lists)
+            ))
+            for lang in languages:
+                f.write(lang.encode("ascii").ljust(LANGUAGE_CODE_SIZE, b"\0"))
+            for array in (node_edges, fail, node_outputs, node_masks, edge_chars, edge_targets, output_lengths, output_masks):
+                f.write(struct.pack(f"<{len(array)}I", *array))
+        os.replace(temp, target)
+    finally:
+        if path.exists(temp):
+            os.remove(temp)
+
+class ProfanityIndex:
+    """
+    A read only, memory mapped Aho-Corasick automaton over the default
+    profanity lists of every language.
+
+    Each pattern carries a bitmask of the languages it's listed under, so
+    a message is matched once against every language and the results are
+    filtered down to the ones a server enabled. Processes mapping the same
+    file share its pages, and opening it is instant.
+    """
+
+    def __init__(self, file: str):
+        self.file = file
+        with open(file, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        try:
+            self._parse()
+        except Exception:
+            self.close()
+            raise
+
+    def _parse(self):
+        view = self._view
+        if len(view) < HEADER.size:
+            raise ProfanityIndexError(f"{self.file} is truncated")
+        magic, version, language_count, node_count, edge_count, output_count, self.digest = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ProfanityIndexError(f"{self.file} isn't a profanity index")
+        if version != FORMAT_VERSION:
+            raise ProfanityIndexError(f"{self.file} is version {version}, expected {FORMAT_VERSION}")
+
+        offset = HEADER.size
+        self.languages: List[str] = []
+        for _ in range(language_count):
+            self.languages.append(bytes(view[offset:offset + LANGUAGE_CODE_SIZE]).rstrip(b"\0").decode("ascii"))
+            offset += LANGUAGE_CODE_SIZE
+        self._bits = {lang: 1 << bit for bit, lang in enumerate(self.languages)}
+
+        arrays = []
+        for count in (node_count + 1, node_count, node_count + 1, node_count, edge_count, edge_count, output_count, output_count):
+            end = offset + count * 4
+            if end > len(view):
+                raise ProfanityIndexError(f"{self.file} is truncated")
+            arrays.append(view[offset:end].cast("I"))
+            offset = end
+        self._arrays = arrays
+        (
+            self._node_edges, self._fail, self._node_outputs, self._node_masks,
+            self._edge_chars, self._edge_targets, self._output_lengths, self._output_masks
+        ) = arrays
+
+        # Nearly every character moves on from the root, so its
+        # transitions are looked up directly instead of searched for
+        self._root = {
+            self._edge_chars[edge]: self._edge_targets[edge]
+            for edge in range(self._node_edges[0], self._node_edges[1])
+        }
+
+    def mask(self, languages: Iterable[str]) -> int:
+        """The bitmask selecting ``languages``, unknown codes are ignored."""
+        mask = 0
+        for lang in languages:
+            mask |= self._bits.get(lang, 0)
+        return mask
+
+    def _find(self, canonical: str, mask: int) -> List[Span]:
+        root = self._root
+        fail = self._fail
+        node_edges = self._node_edges
+        edge_chars = self._edge_chars
+        edge_targets = self._edge_targets
+        node_masks = self._node_masks
+        matches = []
+        node = 0
+        for index, char in enumerate(canonical):
+            code = ord(char)
+            while True:
+                if node == 0:
+                    node = root.get(code, 0)
+                    break
+                start = node_edges[node]
+                end = node_edges[node + 1]
+                edge = bisect_left(edge_chars, code, start, end) if end - start > 1 else start
+                if edge < end and edge_chars[edge] == code:
+                    node = edge_targets[edge]
+                    break
+                node = fail[node]
+            if node_masks[node] & mask:
+                for output in range(self._node_outputs[node], self._node_outputs[node + 1]):
+                    if self._output_masks[output] & mask:
+                        length = self._output_lengths[output]
+                        matches.append((index + 1 - length, index + 1))
+        return matches
+
+    def find(self, text: str, mask: int) -> List[Span]:
+        """Returns the spans of ``text`` listed under any language in ``mask``."""
+        if mask == 0:
+            return []
+        canonical, origins = canonicalize(text)
+        return word_spans(text, origins, self._find(canonical, mask))
+
+    def censor(self, text: str, mask: int, spans: List[Span]=None) -> str:
+        if spans is None:
+            spans = self.find(text, mask)
+        return censor(text, spans)
+
+    def close(self):
+        for array in getattr(self, "_arrays", []):
+            array.release()
+        self._view.release()
+        self._mmap.close()
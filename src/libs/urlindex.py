@@ -0,0 +1,200 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import unquote
+
+import hashlib
+import math
+import re
+
+# Anything shaped like a host, optionally with a scheme, credentials, port
+# and path. Loose on purpose, candidates that aren't URLs just miss. Only
+# starts at the beginning of a word so long words aren't rescanned from
+# every character.
+URL_REGEX = re.compile(
+    r"(?<![\w.+-])(?:[a-z][a-z0-9+.-]*://)?(?:[^\s/@:]+(?::[^\s/@]*)?@)?"
+    r"((?:[\w-]+\.)+[\w-]+|\[[0-9a-f:.]+\])(:\d{1,5})?([/?#][^\s<>\"'`]*)?",
+    re.IGNORECASE
+)
+DEFAULT_PORTS = {":80", ":443"}
+TRAILING_PUNCTUATION = ".,;:!?}>*_~|"
+
+def normalize_url(host: str, port: Optional[str]=None, path: Optional[str]=None) -> Tuple[str, str]:
+    """
+    Returns the normalised host and URL: no scheme, credentials, default
+    port or fragment, a lowercase host without a trailing dot and an
+    unescaped path without a lone trailing slash.
+    """
+    host = host.lower().rstrip(".")
+    url = host
+    if port and port not in DEFAULT_PORTS:
+        url += port
+    if path:
+        path = unquote(path.split("#", 1)[0])
+        if path != "/":
+            url += path
+    return host, url
+
+def parse_url(url: str) -> Optional[Tuple[str, str]]:
+    """Normalises a single URL, see :func:`normalize_url`."""
+    match = URL_REGEX.fullmatch(url.strip())
+    if match is None:
+        return None
+    return normalize_url(*match.groups())
+
+def _end_of_path(path: str) -> int:
+    # Where a path runs into the markdown or brackets around it, e.g. the
+    # "](" of "[url](url)" or a ")" that closes nothing opened inside it
+    closing = {"(": ")", "[": "]"}
+    depth = {")": 0, "]": 0}
+    for index, char in enumerate(path):
+        if char in closing:
+            if char == "(" and path.startswith("](", index - 1):
+                return index - 1
+            depth[closing[char]] += 1
+        elif char in depth:
+            if depth[char] == 0:
+                return index
+            depth[char] -= 1
+    return len(path)
+
+def extract_urls(text: str) -> List[Tuple[str, str]]:
+    """
+    Finds and normalises every URL in ``text``. A path containing a comma
+    is also tried without everything from the comma on, and scanning
+    resumes from there, so comma separated URLs are each found.
+    """
+    urls = []
+    position = 0
+    while True:
+        match = URL_REGEX.search(text, position)
+        if match is None:
+            return urls
+        host, port, path = match.groups()
+        end = match.end()
+        if path:
+            trimmed = path[:_end_of_path(path)]
+            comma = trimmed.find(",")
+            if comma > 0:
+                urls.append(normalize_url(host, port, trimmed.rstrip(TRAILING_PUNCTUATION)))
+                trimmed = trimmed[:comma]
+            end -= len(path) - len(trimmed)
+            path = trimmed.rstrip(TRAILING_PUNCTUATION)
+        urls.append(normalize_url(host, port, path))
+        position = max(end, match.start() + 1)
+
+class BloomFilter:
+    """A fixed size Bloom filter using double hashing over one BLAKE2b digest."""
+    def __init__(self, capacity: int, error_rate: float=0.001):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str) -> Iterable[int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (first + i * second) % self.size
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        bits = self._bits
+        for position in self._positions(key):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+class URLIndex:
+    """
+    Reputation lookups for the URLs in a message.
+
+    Listed URLs are normalised (see :func:`normalize_url`) into a hash
+    set, and listings of a bare host go into a trie of reversed host
+    labels so they also cover its subdomains. A message's URLs are
+    extracted once and each is looked up by its exact URL, the URL
+    without its query and its host. An optional Bloom filter over every
+    key sits in front of the set and trie, so URLs that aren't listed are
+    usually turned away without touching either.
+    """
+    # Marks the end of a listed host in the trie
+    LEAF = ""
+
+    def __init__(self, entries: Iterable[Tuple[str, str]], bloom: bool=True):
+        self.urls: Dict[str, str] = {}
+        self.hosts: dict = {}
+        self.host_count = 0
+        keys = []
+        for url, threat in entries:
+            parsed = parse_url(url)
+            if parsed is None:
+                continue
+            host, normalized = parsed
+            if normalized == host:
+                self._add_host(host, threat)
+            else:
+                self.urls[normalized] = threat
+            keys.append(normalized)
+
+        self.bloom: Optional[BloomFilter] = None
+        if bloom:
+            self.bloom = BloomFilter(len(keys))
+            for key in keys:
+                self.bloom.add(key)
+
+    def __len__(self) -> int:
+        return len(self.urls) + self.host_count
+
+    def _add_host(self, host: str, threat: str):
+        node = self.hosts
+        for label in reversed(host.split(".")):
+            node = node.setdefault(label, {})
+        if self.LEAF not in node:
+            self.host_count += 1
+        node[self.LEAF] = threat
+
+    def _lookup_host(self, host: str) -> Optional[Tuple[str, str]]:
+        node = self.hosts
+        labels = host.split(".")
+        for depth, label in enumerate(reversed(labels)):
+            node = node.get(label)
+            if node is None:
+                return None
+            if self.LEAF in node:
+                return ".".join(labels[len(labels) - depth - 1:]), node[self.LEAF]
+        return None
+
+    def _maybe_listed(self, host: str, url: str) -> bool:
+        if self.bloom is None:
+            return True
+        if url in self.bloom or url.split("?", 1)[0] in self.bloom:
+            return True
+        # Any suffix of the host could be listed
+        labels = host.split(".")
+        return any(".".join(labels[i:]) in self.bloom for i in range(len(labels)))
+
+    def lookup_url(self, host: str, url: str) -> Optional[Tuple[str, str]]:
+        """Returns the listed entry matching a normalised URL and its threat, if any."""
+        if not self._maybe_listed(host, url):
+            return None
+        threat = self.urls.get(url)
+        if threat is not None:
+            return url, threat
+        without_query = url.split("?", 1)[0]
+        threat = self.urls.get(without_query)
+        if threat is not None:
+            return without_query, threat
+        return self._lookup_host(host)
+
+    def lookup(self, text: str) -> Optional[Tuple[str, str]]:
+        """Returns the first listed URL in ``text`` and its threat, if any."""
+        # Every URL has a dot in its host
+        if "." not in text:
+            return None
+        for host, url in extract_urls(text):
+            match = self.lookup_url(host, url)
+            if match is not None:
+                return match
+        return None
@@ -0,0 +1,229 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from unidecode import unidecode
+
+import threading
+import unicodedata
+
+# Characters commonly swapped in for letters. Patterns go through the same
+# mapping, so "sh1t", "$hit" and "shit" all canonicalise to "shit". Digits
+# and symbols that stand in for more than one letter map to one of them,
+# e.g. "1" could be an "i" or an "l", so "l" is folded into "i" as well.
+LEET = str.maketrans({
+    "0": "o",
+    "1": "i", "!": "i", "|": "i", "l": "i",
+    "3": "e",
+    "4": "a", "@": "a",
+    "5": "s", "$": "s",
+    "7": "t", "+": "t",
+    "8": "b",
+    "9": "g",
+})
+
+Span = Tuple[int, int]
+
+def canonicalize(text: str) -> Tuple[str, Sequence[int]]:
+    """
+    Folds ``text`` into the form patterns are matched in: NFKC normalised,
+    transliterated to ASCII, lowercased and with lookalike characters
+    replaced. Also returns the index in ``text`` each character came from,
+    so matches can be mapped back onto the original message.
+    """
+    if text.isascii():
+        return text.lower().translate(LEET), range(len(text))
+    chars = []
+    origins = []
+    for index, char in enumerate(text):
+        # Normalised a character at a time to keep track of where each came
+        # from. Invisible characters, like zero width spaces, are dropped.
+        if ord(char) > 127:
+            if unicodedata.category(char) == "Cf":
+                continue
+            char = unidecode(unicodedata.normalize("NFKC", char))
+        for folded in char.lower().translate(LEET):
+            chars.append(folded)
+            origins.append(index)
+    return "".join(chars), origins
+
+class Automaton:
+    """
+    Aho-Corasick matcher over a fixed set of patterns, finding every
+    occurrence of any of them in a single pass over the text.
+    """
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Lengths of the patterns ending at each node
+        self._out: List[Tuple[int, ...]] = [()]
+
+        for pattern in patterns:
+            if pattern:
+                self._add(pattern)
+        self._link()
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+    def tables(self) -> Tuple[List[Dict[str, int]], List[int], List[Tuple[int, ...]]]:
+        """The transitions, failure links and output lengths of every node."""
+        return self._goto, self._fail, self._out
+
+    def _add(self, pattern: str):
+        node = 0
+        for char in pattern:
+            next = self._goto[node].get(char)
+            if next is None:
+                next = len(self._goto)
+                self._goto[node][char] = next
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = next
+        if len(pattern) not in self._out[node]:
+            self._out[node] = self._out[node] + (len(pattern),)
+
+    def _link(self):
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                if node != 0:
+                    fail = self._fail[node]
+                    while fail and char not in self._goto[fail]:
+                        fail = self._fail[fail]
+                    self._fail[child] = self._goto[fail].get(char, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find(self, text: str) -> List[Span]:
+        """Returns the (start, end) of every pattern occurrence in ``text``."""
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        matches = []
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for length in out[node]:
+                matches.append((index + 1 - length, index + 1))
+        return matches
+
+def word_spans(text: str, origins: Sequence[int], matches: Iterable[Span]) -> List[Span]:
+    """
+    Maps matches in the canonical form of ``text`` back onto ``text``,
+    dropping those that don't start and end on a word boundary and merging
+    the ones that overlap.
+    """
+    spans = []
+    for start, end in matches:
+        first = origins[start]
+        last = origins[end - 1]
+        if first > 0 and text[first - 1].isalnum():
+            continue
+        if last + 1 < len(text) and text[last + 1].isalnum():
+            continue
+        spans.append((first, last + 1))
+
+    merged: List[Span] = []
+    for start, end in sorted(spans):
+        if len(merged) > 0 and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def censor(text: str, spans: Sequence[Span], censor_char: str="*") -> str:
+    parts = []
+    position = 0
+    for start, end in spans:
+        parts.append(text[position:start])
+        parts.append(censor_char * 4)
+        position = end
+    parts.append(text[position:])
+    return "".join(parts)
+
+class WordFilter:
+    """
+    Finds blacklisted words in messages.
+
+    Words are canonicalised (see :func:`canonicalize`) and compiled into a
+    single :class:`Automaton`, and messages are canonicalised the same way
+    before matching, so obfuscated spellings match without generating
+    every variant of every word. Matches have to start and end on a word
+    boundary of the original message.
+    """
+    def __init__(self, words: Iterable[str]):
+        self.words = tuple(words)
+        self.patterns = frozenset(
+            pattern for pattern in (canonicalize(word.strip())[0] for word in self.words) if pattern
+        )
+        self._automaton = Automaton(self.patterns)
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def find(self, text: str) -> List[Span]:
+        """Returns the merged (start, end) spans of ``text`` that matched."""
+        if len(self.patterns) == 0:
+            return []
+        canonical, origins = canonicalize(text)
+        return word_spans(text, origins, self._automaton.find(canonical))
+
+    def censor(self, text: str, spans: Sequence[Span]=None, censor_char: str="*") -> str:
+        if spans is None:
+            spans = self.find(text)
+        return censor(text, spans, censor_char)
+
+class WordFilterSet:
+    """
+    One :class:`WordFilter` per server, rebuilt only when that server's
+    word list changes. Servers with the same words share a filter.
+    """
+    def __init__(self):
+        self._words: Dict[str, Tuple[str, ...]] = {}
+        self._filters: Dict[str, WordFilter] = {}
+        self._shared: Dict[frozenset, WordFilter] = {}
+        self._users: Dict[frozenset, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, server_id: str, words: Sequence[str]=None) -> Optional[WordFilter]:
+        """
+        Returns the server's filter, first rebuilding it if ``words`` is
+        given and differs from the list it was built from.
+        """
+        if words is not None and self._words.get(server_id) != tuple(words):
+            return self.update(server_id, words)
+        return self._filters.get(server_id)
+
+    def update(self, server_id: str, words: Sequence[str]) -> Optional[WordFilter]:
+        words = tuple(words)
+        with self._lock:
+            if self._words.get(server_id) == words:
+                return self._filters.get(server_id)
+            self._remove(server_id)
+            if len(words) == 0:
+                return None
+            key = frozenset(words)
+            word_filter = self._shared.get(key)
+            if word_filter is None:
+                word_filter = WordFilter(words)
+                self._shared[key] = word_filter
+            self._users[key] = self._users.get(key, 0) + 1
+            self._words[server_id] = words
+            self._filters[server_id] = word_filter
+            return word_filter
+
+    def remove(self, server_id: str):
+        with self._lock:
+            self._remove(server_id)
+
+    def _remove(self, server_id: str):
+        words = self._words.pop(server_id, None)
+        self._filters.pop(server_id, None)
+        if words is None:
+            return
+        key = frozenset(words)
+        self._users[key] -= 1
+        if self._users[key] == 0:
+            del self._users[key]
+            del self._shared[key]
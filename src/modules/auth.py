@@ -102,7 +102,7 @@ class Auth(commands.Cog):
                     "token": message.content,
                     "user": message.author_id
                 }
-                valkey.set(f"login:{login_message.id}", db.encoder.encode(payload), 70)
+                await valkey.set(f"login:{login_message.id}", db.encoder.encode(payload), 70)
 
                 await login_message.add_reaction(guilded.utils.Object(EMOTE_VERIFICATION_TICK))
     
@@ -110,7 +110,7 @@ class Auth(commands.Cog):
     async def on_message_reaction_add(self, event: guilded.MessageReactionAddEvent):
         if event.message.channel_id != config.LOGIN_CHANNEL_ID: return
         if event.message_id in self.user_tokens:
-            data = valkey.get(f"login:{event.message_id}")
+            data = await valkey.get(f"login:{event.message_id}")
             if data:
                 data = db.decoder.decode(data)
             else:
@@ -1,34 +1,36 @@
 from core.checks import listener, is_module_enabled, user_has_permissions
 from private_detector.inference import load_model, read_image
 from core.embeds import EMBED_FILTERED, EMBED_STANDARD
-from lingua import Language, LanguageDetectorBuilder
+from core.automod import Cost, Pipeline, Violation, stage
+from libs.profanity_index import ProfanityIndex, ProfanityIndexError, build as build_profanity_index, digest as profanity_digest
+from libs.wordfilter import WordFilterSet, censor
+from libs.urlindex import URLIndex
+from core.toxicity import toxicity_service
+from core.blocklists import blocklists, load_guilded_paths, load_urlhaus, GUILDED_SITEMAP_URL, URLHAUS_URL
 from database.permissions import UserPermissions
 from guilded.utils import valid_video_extensions
 from mdit_plain.renderer import RendererPlain
 from humanfriendly import format_timespan
-from guilded.ext import commands, tasks
-from better_profanity import Profanity
+from guilded.ext import commands
 from markdown_it import MarkdownIt
 from nudenet import NudeDetector
 from unidecode import unidecode
 from datetime import timedelta
-from typing import List, Tuple
+from typing import List, Optional, Set, Tuple
 from bs4 import BeautifulSoup
 from base import BOT_VERSION
 from threading import Thread
-from zipfile import ZipFile
 
-import filters.evaluation as filter
 import tensorflow as tf
 import database as db
+import traceback
 import mimetypes
 import requests
 import guilded
 import asyncio
 import config
 import uuid
-import csv
-import io
+import time
 import re
 import os
 
@@ -36,30 +38,16 @@ SERVER_INVITE_REGEX = r"(?:https?:\/\/)?(?:www\.)?(discord\.gg|discordapp\.com\/
 API_KEY_REGEXES = [
     r"gapi_([a-zA-Z0-9+\/]{86})==",
 ]
+MENTION_REGEX = r"<@([a-zA-Z0-9]{8,10})>|<@&([0-9]*)>"
 WHITELISTED_DOMAINS = ["https://media.tenor.com/"]
-USER_AGENT = config.USER_AGENT.format(BOT_VERSION, "Automod")
+USER_AGENT = config.USER_AGENT % (BOT_VERSION, "Automod")
 LDNOOBW_LANGS = [
     "ar", "cs", "da", "nl", "en", "eo",
     "fi", "fr", "de", "hi", "hu", "it",
     "ja", "ko", "fa", "pl", "pt", "ru",
     "es", "sv", "th", "tr",
 ] # "zh", "fr-Ca-u-sd-caqc", "no", "tlh", "fil", "kab"
-LANGS = [
-    Language.ARABIC, Language.CZECH, Language.DANISH, Language.DUTCH,
-    Language.ENGLISH, Language.ESPERANTO, Language.FINNISH, Language.FRENCH,
-    Language.GERMAN, Language.HINDI, Language.HUNGARIAN, Language.ITALIAN,
-    Language.JAPANESE, Language.KOREAN, Language.PERSIAN, Language.POLISH,
-    Language.PORTUGUESE, Language.RUSSIAN, Language.SPANISH, Language.SWEDISH,
-    Language.THAI, Language.TURKISH,
-]
-LANG_MAP = {
-    "ARABIC": "ar", "CZECH": "cs", "DANISH": "da", "DUTCH": "nl",
-    "ENGLISH": "en", "ESPERANTO": "eo", "FINNISH": "fi", "FRENCH": "fr",
-    "GERMAN": "de", "HINDI": "hi", "HUNGARIAN": "hu", "ITALIAN": "it",
-    "JAPANESE": "ja", "KOREAN": "ko", "PERSIAN": "fa", "POLISH": "pl",
-    "PORTUGUESE": "pt", "RUSSIAN": "ru", "SPANISH": "es", "SWEDISH": "sv",
-    "THAI": "th", "TURKISH": "tr",
-}
+LDNOOBW_URL = "https://raw.githubusercontent.com/LDNOOBW/List-of-Dirty-Naughty-Obscene-and-Otherwise-Bad-Words/master/{}"
 
 ATTACHMENT_REGEX = re.compile(r'!\[(?P<caption>.+)?\]\((?P<url>(?:(?:https:\/\/(?:s3-us-west-2\.amazonaws\.com\/www\.guilded\.gg|img\.guildedcdn\.com|img2\.guildedcdn\.com|www\.guilded\.gg|cdn\.gilcdn\.com)\/(?:ContentMediaGenericFiles|ContentMedia|WebhookPrimaryMedia)\/[a-zA-Z0-9]+-Full)|(?:https:\/\/media\d+\.giphy\.com\/media\/[^ \n]+)|(?:https:\/\/media\.tenor\.com\/[^ \n]+))\.(?P<extension>webp|jpeg|jpg|png|gif|apng|webm|mp4)(?:\?.+)?)\)')
 
@@ -110,24 +98,37 @@ class Automod(commands.Cog):
         self.bot = bot
 
         self.spam_cooldowns = {}
-        self.malicious_urls = {}
-        self.guilded_paths = []
-        self.default_profanity_checks = {}
-        self.guild_profanity_checks = {}
-        self.language_detector = LanguageDetectorBuilder.from_languages(*LANGS).build()
+        self.url_index = URLIndex([], bloom=config.URL_INDEX_BLOOM)
+        # First path segments of Guilded's own pages, which aren't invites
+        self.guilded_paths: Set[str] = set()
+        self.profanity_index: ProfanityIndex = None
+        self.word_filters = WordFilterSet()
 
         self.nude_detector = NudeDetector()
         print("Loaded Nude Detector")
+        self.pipeline = Pipeline.from_object(self)
         if config.LOAD_NSFW:
             self.nsfw_model = load_model()
+            self.pipeline.ready.add("nsfw_model")
             print("Loaded NSFW Model")
 
         self.filters_ready = False
 
+        blocklists.register("urlhaus", URLHAUS_URL, load_urlhaus, self.__set_url_index)
+        blocklists.register("guilded_paths", GUILDED_SITEMAP_URL, load_guilded_paths, self.__set_guilded_paths)
+
         # self.bot.loop.create_task(self.__load_profanities())
         # self.bot.loop.create_task(self.__load_guild_profanities())
         # self.bot.loop.create_task(self.__prepare_filters())
     
+    def __set_url_index(self, url_index: URLIndex):
+        # Swapped in whole so lookups never see a half built index
+        self.url_index = url_index
+        print(f"Malicious URL index holds {len(url_index)} entries")
+    
+    def __set_guilded_paths(self, paths: Set[str]):
+        self.guilded_paths = paths
+    
     def __get_content(self, message):
         content = [""]
         if isinstance(message, guilded.ChatMessage) or\
@@ -146,59 +147,54 @@ class Automod(commands.Cog):
         if not os.path.exists(filter_config.MODEL_LOC):
             import filters.training as training
             training.execute()
-            self.rnn_model = filter._load_model()
-        else:
-            self.rnn_model = filter._load_model()
+        try:
+            await toxicity_service.start()
+        except Exception as e:
+            print(f"Failed to load automod filters: {type(e).__name__} - {e}")
+            return
         self.filters_ready = True
+        self.pipeline.ready.add("toxicity_model")
         print("Automod filters ready")
     
-    async def __load_guild_profanities(self):
-        print("Loading Guild Profanity objects")
-        for server in await self.bot.fetch_servers():
-            try:
-                guild = await db.servers.fetch_or_create_server(server)
-            except:
-                continue
-            else:
-                blacklist = guild.settings.get("word_blacklist", [])
-                if len(blacklist) > 0:
-                    print(f"Generating Profanity object for server '{server.name}'")
-                    self.guild_profanity_checks[server.id] = Profanity(blacklist)
-                    print(f"Profanity object for server '{server.name}' generated")
-            await asyncio.sleep(0)
-        print("Guild Profanity objects loaded")
-    
     async def __load_profanities(self):
-        print("Loading default Profanity objects")
-        for lang in LDNOOBW_LANGS:
-            url = f"https://raw.githubusercontent.com/LDNOOBW/List-of-Dirty-Naughty-Obscene-and-Otherwise-Bad-Words/master/{lang}"
-            cached = None
-            profanities = None
-            if os.path.exists(f"/tmp/profanities-{lang}"):
-                try:
-                    cached = open(f"/tmp/profanities-{lang}", "r")
-                except:
-                    pass
+        print("Loading default profanity index")
+        self.profanity_index = await asyncio.to_thread(self.__open_profanity_index)
+        self.pipeline.ready.add("default_profanities")
+        print(f"Default profanity index loaded ({len(self.profanity_index.languages)} languages)")
+    
+    def __open_profanity_index(self) -> ProfanityIndex:
+        index = None
+        try:
+            index = ProfanityIndex(config.PROFANITY_INDEX_PATH)
+        except (FileNotFoundError, ProfanityIndexError) as e:
+            print(f"Default profanity index needs to be built: {e}")
+        if index is not None and set(index.languages) >= set(LDNOOBW_LANGS):
+            age = time.time() - os.path.getmtime(config.PROFANITY_INDEX_PATH)
+            if age < config.PROFANITY_INDEX_MAX_AGE:
+                return index
 
-            if cached:
-                profanities = cached.read().splitlines()
-            else:
-                try:
-                    response = requests.get(url)
-                    if response.ok:
-                        profanities = response.text.splitlines()
-                        # Cache these in tmp so that we aren't spamming Github
-                        # in case the bot is being constantly restarted
-                        with open(f"/tmp/profanities-{lang}", "w") as f:
-                            f.write(response.text)
-                    await asyncio.sleep(0)
-                except:
-                    pass
-            if profanities:
-                print(f"Generating Profanity object for lang '{lang}'")
-                self.default_profanity_checks[lang] = Profanity(profanities)
-                print(f"Profanity object for lang '{lang}' generated")
-        print("Default Profanity objects loaded")
+        lists = {}
+        for lang in LDNOOBW_LANGS:
+            try:
+                response = requests.get(LDNOOBW_URL.format(lang), headers={
+                    "User-Agent": USER_AGENT,
+                }, timeout=10)
+            except Exception as e:
+                print(f"Failed to download profanities for lang '{lang}': {type(e).__name__} - {e}")
+                continue
+            if response.ok:
+                lists[lang] = response.text.splitlines()
+        if index is not None:
+            # Keep an index that has more languages than could be downloaded now
+            if len(lists) < len(index.languages):
+                return index
+            if profanity_digest(lists) == index.digest:
+                # Unchanged upstream, only the age needs resetting
+                os.utime(config.PROFANITY_INDEX_PATH)
+                return index
+            index.close()
+        build_profanity_index(lists, config.PROFANITY_INDEX_PATH)
+        return ProfanityIndex(config.PROFANITY_INDEX_PATH)
     
     async def was_message_automoderated(self, message: guilded.ChatMessage):
         while getattr(message, "automoderated", None) is None:
@@ -307,18 +303,15 @@ class Automod(commands.Cog):
             "BUTTOCKS_COVERED": 0.25,
         })
         
-        print(weights)
-        print(round(nudity * 100))
-        
         os.remove(path)
         
         return nudity
     
-    def apply_filters(self, content: str):
+    async def apply_filters(self, content: str):
         content = strip_md(content)
         content = unidecode(content)
 
-        prediction = filter.predict(content, self.rnn_model)
+        prediction = await toxicity_service.predict(content)
 
         toxicity_weights, toxicity = weight_filters(prediction, {
             "obscene": 0.2,
@@ -345,277 +338,243 @@ class Automod(commands.Cog):
         
         return toxicity, hatespeech
     
+    async def apply_violation(self, context: "AutomodContext", violation: Violation):
+        message = context.message
+        if violation.delete:
+            await message.delete()
+            if violation.purge_recent:
+                for msg in await message.channel.history(after=message.created_at - timedelta(minutes=1, seconds=30)):
+                    if msg.author.id == message.author.id:
+                        await msg.delete()
+            await self.notify_filter(message, violation.reason)
+        await self.send_log(await context.get_log_channel(self.bot), message, violation.content, violation.filter, violation.extra)
+
+    @stage("spam_filter", Cost.TRIVIAL)
+    async def check_spam(self, context: "AutomodContext"):
+        message = context.message
+        spam_amt = context.server.settings["spam_filter"]
+        if spam_amt <= 0:
+            return
+        guild_spam_cooldown = self.spam_cooldowns.get(message.server.id)
+        if not guild_spam_cooldown:
+            guild_spam_cooldown = commands.CooldownMapping.from_cooldown(spam_amt, 60, get_cooldown_key)
+            self.spam_cooldowns[message.server.id] = guild_spam_cooldown
+        if guild_spam_cooldown.update_rate_limit(message):
+            return Violation("Talking too fast!", "Spam", context.contents[0], purge_recent=True)
+
+    @stage("word_blacklist", Cost.TEXT)
+    async def check_word_blacklist(self, context: "AutomodContext"):
+        # Built on first use and rebuilt whenever the server's list changes
+        word_filter = self.word_filters.get(context.message.server.id, context.server.settings["word_blacklist"])
+        if not word_filter:
+            return
+        for content in context.contents:
+            spans = word_filter.find(content)
+            if len(spans) > 0:
+                return Violation("Filtered Word Detected", "Profanity", content, {"filtered": word_filter.censor(content, spans)})
+
+    @stage("malicious_urls", Cost.TEXT)
+    async def check_malicious_urls(self, context: "AutomodContext"):
+        for content in context.contents:
+            match = self.url_index.lookup(content)
+            if match is not None:
+                _, threat = match
+                return Violation("Malicious URL!", "Malicious URL", content, {"threat": threat})
+
+    @stage("filter_invites", Cost.TEXT)
+    async def check_invites(self, context: "AutomodContext"):
+        for content in context.contents:
+            for domain, invite in re.findall(SERVER_INVITE_REGEX, content):
+                lowered: str = invite.lower()
+                if "guilded" in domain and lowered.split("/", 1)[0] in self.guilded_paths: continue
+                if "guilded" in domain and lowered == context.message.server.slug.lower(): continue # Don't filter invite links to their own server lol
+                return Violation("Invite Link", "Invite Link", content, {"invite": f"https://www.{domain}/{invite}"})
+
+    @stage("filter_api_keys", Cost.TEXT)
+    async def check_api_keys(self, context: "AutomodContext"):
+        for content in context.contents:
+            for regex in API_KEY_REGEXES:
+                match = re.match(regex, content)
+                if match:
+                    return Violation("API Key Detected", "API Key", content, {"redact": [match.group(0)]})
+
+    @stage("filter_mass_mentions", Cost.TEXT)
+    async def check_mass_mentions(self, context: "AutomodContext"):
+        for content in context.contents:
+            if len(re.findall(MENTION_REGEX, content)) > 6:
+                return Violation("Mass Mention Detected", "Mass Mention", content)
+
+    @stage("default_profanities", Cost.TEXT, requires=["default_profanities"])
+    async def check_default_profanities(self, context: "AutomodContext"):
+        # One pass over every language, keeping matches from the ones the server enabled
+        mask = self.profanity_index.mask(context.server.settings["default_profanities"])
+        if mask == 0:
+            return
+        for content in context.contents:
+            spans = self.profanity_index.find(content, mask)
+            if len(spans) > 0:
+                return Violation("Profanity Detected", "Profanity", content, {"filtered": censor(content, spans)})
+
+    async def _predict(self, context: "AutomodContext", content: str) -> Tuple[float, float]:
+        # Toxicity and hatespeech come from the same prediction
+        if content not in context.predictions:
+            context.predictions[content] = await self.apply_filters(content)
+        return context.predictions[content]
+
+    @stage("filter_toxicity", Cost.MODEL, requires=["toxicity_model"])
+    async def check_toxicity(self, context: "AutomodContext"):
+        threshold = context.server.settings["filter_toxicity"]
+        for content in context.contents:
+            toxicity, _ = await self._predict(context, content)
+            if (toxicity * 100) >= threshold or (toxicity * 100) >= 50:
+                return Violation("Toxicity Detected", "Toxicity", content, {
+                    "certainty": toxicity,
+                }, delete=(toxicity * 100) >= threshold)
+
+    @stage("filter_hatespeech", Cost.MODEL, requires=["toxicity_model"])
+    async def check_hatespeech(self, context: "AutomodContext"):
+        threshold = context.server.settings["filter_hatespeech"]
+        for content in context.contents:
+            _, hatespeech = await self._predict(context, content)
+            if (hatespeech * 100) >= threshold or (hatespeech * 100) >= 50:
+                return Violation("Hatespeech Detected", "Hatespeech", content, {
+                    "certainty": hatespeech,
+                }, delete=(hatespeech * 100) >= threshold)
+
+    @stage("filter_nsfw", Cost.NETWORK, requires=["nsfw_model"])
+    async def check_nsfw(self, context: "AutomodContext"):
+        if context.server.settings.get("premium", "0")[0] != "1":
+            return
+        threshold = context.server.settings["filter_nsfw"]
+        for content in context.contents:
+            for item in _extract_attachments(context.message._state, content):
+                item: guilded.Attachment
+                if any(f'.{ele}' in item.url for ele in ['jpeg', 'jpg', 'tif', 'tiff', 'gif', 'jif', 'png', 'webp', 'bmp', 'apng']):
+                    nudity = round(await asyncio.to_thread(self.scan_nsfw, url=item.url) * 100)
+                    if nudity >= 50 or nudity >= threshold:
+                        return Violation("NSFW Detected", "NSFW", content, {
+                            "certainty": nudity,
+                        }, delete=nudity >= threshold)
+
+    @stage("untrusted_block_attachments", Cost.NETWORK, restriction=None)
+    async def check_untrusted_attachments(self, context: "AutomodContext"):
+        blocked_types = context.server.settings["untrusted_block_attachments"]
+        if await user_has_permissions(context.message.author, is_trusted=True):
+            return
+        for content in context.contents:
+            for link in re.findall(r'((?:https?://)?[\w\-\.]+(?:/[\w\-_~&=/?\.]+)?)', content):
+                link: str
+                if any(link.startswith(wl) and not '@' in link for wl in WHITELISTED_DOMAINS): continue
+                blocked_type = await asyncio.to_thread(self.classify_link, link, blocked_types)
+                if blocked_type:
+                    return Violation(f"Untrusted Attachment ({blocked_type})", "Untrusted Attachment", content, {"attachment_type": blocked_type})
+
+    def classify_link(self, link: str, blocked_types: List[str]) -> Optional[str]:
+        """Returns which of ``blocked_types`` the link points at, if any."""
+        stripped_link = link
+        if '?' in stripped_link:
+            stripped_link = stripped_link.split('?')[0]
+        mimeType = mimetypes.guess_type(stripped_link)
+        if mimeType[0]:
+            for t in blocked_types:
+                t: str
+                if mimeType[0].startswith(t):
+                    return t.capitalize()
+            return None
+
+        head_resp: requests.Response = requests.head(link, headers={
+            "user-agent": USER_AGENT,
+        })
+        if not head_resp.ok:
+            return None
+        content_type = head_resp.headers.get("content-type", "")
+        content_disposition = head_resp.headers.get("content-disposition", "")
+        dis_mimeType = mimetypes.guess_type(content_disposition)
+        if "html" not in content_type:
+            for t in blocked_types:
+                t: str
+                if content_type.startswith(t):
+                    return t.capitalize()
+                elif dis_mimeType[0] and dis_mimeType[0].startswith(t):
+                    return t.capitalize()
+            return None
+
+        page_resp: requests.Response = requests.get(link, headers={
+            "user-agent": USER_AGENT,
+        })
+        if not page_resp.ok:
+            return None
+        parsed = BeautifulSoup(page_resp.text, features="lxml")
+        if "image" in blocked_types:
+            is_image = False
+            for tag in parsed('meta', attrs={'property': ['og:image', 'twitter:image', 'twitter:image:src']}):
+                is_image = True
+            for tag in parsed('meta', attrs={'property': ['og:type']}):
+                og_type: str = tag['content'].lower().strip()
+                if og_type.startswith(('article', 'website', 'book', 'profile', 'video', 'music')):
+                    is_image = False
+                    for tag in parsed('meta', attrs={'property': ['og:description']}):
+                        desc: str = tag['content'].lower().strip()
+                        if 'screenshot' in desc or '':
+                            is_image = False
+                    for tag in parsed('meta', attrs={'name': ['description']}):
+                        desc: str = tag['content'].lower().strip()
+                        if 'screenshot' in desc or '':
+                            is_image = False
+                    for tag in parsed('meta', attrs={'name': ['keywords']}):
+                        keywords: str = tag['content'].lower()
+                        if 'photo' in keywords or 'image upload' in keywords or 'image hosting' in keywords:
+                            is_image = True
+                        if 'video' in keywords or not 'image' in keywords:
+                            is_image = False
+            if is_image:
+                return "Image"
+        if "video" in blocked_types:
+            is_video = False
+            for tag in parsed(
+                'meta',
+                attrs={
+                    'property': [
+                        'og:video:url',
+                        'og:video:secure_url',
+                        'twitter:image:src',
+                        'twitter:player'
+                    ]
+                }
+            ):
+                is_video = True
+            for tag in parsed('meta', attrs={'property': ['og:type']}):
+                og_type: str = tag['content'].lower().strip()
+                if og_type.startswith(('video')):
+                    is_video = True
+            for tag in parsed('meta', attrs={'name': ['keywords']}):
+                keywords: str = tag['content'].lower()
+                if 'video' in keywords or 'camera phone' in keywords:
+                    is_video = True
+            if is_video:
+                return "Video"
+        if "audio" in blocked_types:
+            for tag in parsed('meta', attrs={'property': ['og:type']}):
+                og_type: str = tag['content'].lower().strip()
+                if og_type.startswith(('music')):
+                    return "Audio"
+        return None
+
     async def filter_message(self, message):
         if not getattr(message, "server", False): return
         if not getattr(message, "channel", False): return
         if not getattr(message, "author", False): return
         if message.author.bot: return
         async def run_async():
-            context: AutomodContext = await AutomodContext.prepare(message)
             try:
-                guild = await db.servers.fetch_or_create_server(message.server)
-            except Exception as e:
+                context: AutomodContext = await AutomodContext.prepare(message, self.__get_content(message))
+            except RuntimeError:
                 return
-            else:
-                log_channel_id = guild.settings.get("logs_automod")
-                log_channel = None
-                if log_channel_id:
-                    try:
-                        log_channel = await self.bot.getch_channel(log_channel_id)
-                    except:
-                        pass
-                if context.can_run("spam_filter"):
-                    spam_amt = guild.settings.get("spam_filter")
-                    if spam_amt and spam_amt > 0:
-                        guild_spam_cooldown = self.spam_cooldowns.get(message.server.id)
-                        if not guild_spam_cooldown:
-                            guild_spam_cooldown = commands.CooldownMapping.from_cooldown(spam_amt, 60, get_cooldown_key)
-                            self.spam_cooldowns[message.server.id] = guild_spam_cooldown
-                        if guild_spam_cooldown.update_rate_limit(message):
-                            await message.delete()
-                            for msg in await message.channel.history(after=message.created_at - timedelta(minutes=1, seconds=30)):
-                                if msg.author.id == message.author.id:
-                                    await msg.delete()
-                            await self.notify_filter(message, "Talking too fast!")
-                            await self.send_log(log_channel, message, self.__get_content(message)[0], "Spam")
-                            return
-                _content = self.__get_content(message)
-                for content in _content:
-                    # print(f"Scanning '{content}'")
-                    if context.can_run("default_profanities"):
-                        default_profanities = guild.settings.get("default_profanities", [])
-                        if len(default_profanities) > 0:
-                            # Try to detect the language(s) in the string and
-                            # only filter if the language(s) are in the default
-                            # profanities list
-                            for result in self.language_detector.detect_multiple_languages_of(content):
-                                code = LANG_MAP.get(result.language.name)
-                                # print(f"Detected language '{code}'")
-                                if code and code in default_profanities:
-                                    profanity_check: Profanity = self.default_profanity_checks.get(code)
-                                    if profanity_check:
-                                        filtered = profanity_check.censor(content)
-                                        if filtered != content:
-                                            await message.delete()
-                                            await self.notify_filter(message, "Profanity Detected")
-                                            await self.send_log(log_channel, message, content, "Profanity", {"filtered": filtered})
-                                            return
-                    if context.can_run("word_blacklist"):
-                        profanity: Profanity = self.guild_profanity_checks.get(message.server.id)
-                        if profanity:
-                            filtered = profanity.censor(content)
-                            if filtered != content:
-                                await message.delete()
-                                await self.notify_filter(message, "Filtered Word Detected")
-                                await self.send_log(log_channel, message, content, "Profanity", {"filtered": filtered})
-                                return
-                    if context.can_run("malicious_urls"):
-                        if guild.settings.get("malicious_urls", False):
-                            for url in self.malicious_urls.keys():
-                                if url in content:
-                                    await message.delete()
-                                    await self.notify_filter(message, "Malicious URL!")
-                                    await self.send_log(log_channel, message, content, "Malicious URL", {"threat": self.malicious_urls[url]})
-                                    return
-                    if context.can_run("filter_invites"):
-                        if guild.settings.get("filter_invites", False):
-                            for domain, invite in re.findall(SERVER_INVITE_REGEX, content):
-                                lowered: str = invite.lower()
-                                stop = False
-                                for path in self.guilded_paths:
-                                    if path in lowered:
-                                        stop = True
-                                        break
-                                if "guilded" in domain and lowered == message.server.slug.lower(): continue # Don't filter invite links to their own server lol
-                                if stop: continue
-                                await message.delete()
-                                await self.notify_filter(message, "Invite Link")
-                                await self.send_log(log_channel, message, content, "Invite Link", {"invite": f"https://www.{domain}/{invite}"})
-                                break
-                    if context.can_run("filter_api_keys"):
-                        if guild.settings.get("filter_api_keys", False):
-                            for regex in API_KEY_REGEXES:
-                                match = re.match(regex, content)
-                                if match:
-                                    await message.delete()
-                                    await self.notify_filter(message, "API Key Detected")
-                                    await self.send_log(log_channel, message, content, "API Key", {
-                                        "redact": [match.group(0)]
-                                    })
-                                    return
-                    if context.can_run("filter_mass_mentions"):
-                        if guild.settings.get("filter_mass_mentions", False):
-                            mention_count = 0
-                            for mention in re.findall("<@([a-zA-Z0-9]{8,10})>|<@&([0-9]*)>"):
-                                mention_count += 1
-                            if mention_count > 6:
-                                await message.delete()
-                                await self.notify_filter(message, "Mass Mention Detected")
-                                await self.send_log(log_channel, message, content, "Mass Mention")
-                                return
-                    if self.filters_ready and (guild.settings.get("filter_toxicity", 0) > 0 or guild.settings.get("filter_hatespeech", 0)):
-                        if context.can_run("filter_toxicity") or context.can_run("filter_hatespeech"):
-                            toxicity, hatespeech = self.apply_filters(content)
-
-                            toxicity_threshold = guild.settings.get("filter_toxicity", 0)
-                            if toxicity_threshold > 0 and context.can_run("filter_toxicity"):
-                                if (toxicity * 100) >= toxicity_threshold or (toxicity * 100) >= 50:
-                                    await self.send_log(log_channel, message, content, "Toxicity", {
-                                        "certainty": toxicity,
-                                    })
-                                if (toxicity * 100) >= toxicity_threshold:
-                                    await message.delete()
-                                    await self.notify_filter(message, "Toxicity Detected")
-                                    return
-                            
-                            hatespeech_threshold = guild.settings.get("filter_hatespeech", 0)
-                            if hatespeech_threshold > 0 and context.can_run("filter_hatespeech"):
-                                if (hatespeech * 100) >= hatespeech_threshold or (hatespeech * 100) >= 50:
-                                    await self.send_log(log_channel, message, content, "Hatespeech", {
-                                        "certainty": hatespeech,
-                                    })
-                                if (hatespeech * 100) >= hatespeech_threshold:
-                                    await message.delete()
-                                    await self.notify_filter(message, "Hatespeech Detected")
-                                    return
-                    if config.LOAD_NSFW and guild.settings.get("premium", "0")[0] == "1" and context.can_run("filter_nsfw") and guild.settings.get("filter_nsfw", 0) > 0:
-                        try:
-                            for item in _extract_attachments(message._state, content):
-                                item: guilded.Attachment
-                                if any(f'.{ele}' in item.url for ele in ['jpeg', 'jpg', 'tif', 'tiff', 'gif', 'jif', 'png', 'webp', 'bmp', 'apng']):
-                                    nudity = round(self.scan_nsfw(url=item.url) * 100)
-                                    if nudity >= 50 or nudity >= guild.settings["filter_nsfw"]:
-                                        try:
-                                            nsfw_log_channel = await self.bot.getch_channel(guild.settings.get("logs_nsfw"))
-                                        except:
-                                            nsfw_log_channel = None
-                                        await self.send_log(log_channel, message, content, "NSFW", {
-                                            "certainty": nudity,
-                                        })
-                                    if nudity >= guild.settings["filter_nsfw"]:
-                                        await message.delete()
-                                        await self.notify_filter(message, "NSFW Detected")
-                                        return
-                        except Exception as e:
-                            print(e)
-                            import traceback
-                            traceback.print_exc()
-                                    
-                    if len(guild.settings.get("untrusted_block_attachments", [])) > 0:
-                        is_trusted = await user_has_permissions(message.author, is_trusted=True)
-                        if not is_trusted:
-                            block_message = False
-                            blocked_type = None
-                            for link in re.findall(r'((?:https?://)?[\w\-\.]+(?:/[\w\-_~&=/?\.]+)?)', content):
-                                link: str
-                                stripped_link = link
-                                if '?' in stripped_link:
-                                    stripped_link = stripped_link.split('?')[0]
-                                is_whitelisted = False
-                                for wl in WHITELISTED_DOMAINS:
-                                    if link.startswith(wl) and not '@' in link:
-                                        is_whitelisted = True
-                                        break
-                                if is_whitelisted: continue
-                                mimeType = mimetypes.guess_type(stripped_link)
-                                if mimeType[0]:
-                                    for t in guild.settings.get("untrusted_block_attachments", []):
-                                        t: str
-                                        if mimeType[0].startswith(t):
-                                            block_message = True
-                                            blocked_type = t.capitalize()
-                                            break
-                                else:
-                                    head_resp: requests.Response = requests.head(link, headers={
-                                        "user-agent": USER_AGENT,
-                                    })
-                                    if head_resp.ok:
-                                        content_type = head_resp.headers.get("content-type")
-                                        content_disposition = head_resp.headers.get("content-disposition", "")
-                                        dis_mimeType = mimetypes.guess_type(content_disposition)
-                                        if "html" in content_type:
-                                            page_resp: requests.Response = requests.get(link, headers={
-                                                "user-agent": USER_AGENT,
-                                            })
-                                            if page_resp.ok:
-                                                parsed = BeautifulSoup(page_resp.text, features="lxml")
-                                                if "image" in guild.settings["untrusted_block_attachments"]:
-                                                    is_image = False
-                                                    for tag in parsed('meta', attrs={'property': ['og:image', 'twitter:image', 'twitter:image:src']}):
-                                                        is_image = True
-                                                    for tag in parsed('meta', attrs={'property': ['og:type']}):
-                                                        og_type: str = tag['content'].lower().strip()
-                                                        if og_type.startswith(('article', 'website', 'book', 'profile', 'video', 'music')):
-                                                            is_image = False
-                                                            for tag in parsed('meta', attrs={'property': ['og:description']}):
-                                                                desc: str = tag['content'].lower().strip()
-                                                                if 'screenshot' in desc or '':
-                                                                    is_image = False
-                                                            for tag in parsed('meta', attrs={'name': ['description']}):
-                                                                desc: str = tag['content'].lower().strip()
-                                                                if 'screenshot' in desc or '':
-                                                                    is_image = False
-                                                            for tag in parsed('meta', attrs={'name': ['keywords']}):
-                                                                keywords: str = tag['content'].lower()
-                                                                if 'photo' in keywords or 'image upload' in keywords or 'image hosting' in keywords:
-                                                                    is_image = True
-                                                                if 'video' in keywords or not 'image' in keywords:
-                                                                    is_image = False
-                                                    if is_image:
-                                                        block_message = True
-                                                        blocked_type = "Image"
-                                                if "video" in guild.settings["untrusted_block_attachments"] and not block_message:
-                                                    is_video = False
-                                                    for tag in parsed(
-                                                        'meta',
-                                                        attrs={
-                                                            'property': [
-                                                                'og:video:url',
-                                                                'og:video:secure_url',
-                                                                'twitter:image:src',
-                                                                'twitter:player'
-                                                            ]
-                                                        }
-                                                    ):
-                                                        is_video = True
-                                                    for tag in parsed('meta', attrs={'property': ['og:type']}):
-                                                        og_type: str = tag['content'].lower().strip()
-                                                        if og_type.startswith(('video')):
-                                                            is_video = True
-                                                    for tag in parsed('meta', attrs={'name': ['keywords']}):
-                                                        keywords: str = tag['content'].lower()
-                                                        if 'video' in keywords or 'camera phone' in keywords:
-                                                            is_video = True
-                                                    if is_video:
-                                                        block_message = True
-                                                        blocked_type = "Video"
-                                                if "audio" in guild.settings["untrusted_block_attachments"] and not block_message:
-                                                    is_audio = False
-                                                    for tag in parsed('meta', attrs={'property': ['og:type']}):
-                                                        og_type: str = tag['content'].lower().strip()
-                                                        if og_type.startswith(('music')):
-                                                            is_audio = True
-                                                    if is_audio:
-                                                        block_message = True
-                                                        blocked_type = "Audio"
-                                        else:
-                                            for t in guild.settings["untrusted_block_attachments"]:
-                                                t: str
-                                                if content_type.startswith(t):
-                                                    block_message = True
-                                                    blocked_type = t.capitalize()
-                                                    break
-                                                else:
-                                                    if dis_mimeType[0]:
-                                                        if dis_mimeType[0].startswith(t):
-                                                            block_message = True
-                                                            blocked_type = t.capitalize()
-                                                            break
-                            if block_message:
-                                await message.delete()
-                                await self.notify_filter(message, f"Untrusted Attachment ({blocked_type})")
-                                await self.send_log(log_channel, message, content, "Untrusted Attachment", {"attachment_type": blocked_type})
-                                return
+            for violation in await self.pipeline.run(context):
+                try:
+                    await self.apply_violation(context, violation)
+                except Exception:
+                    traceback.print_exc()
         self.bot.loop.create_task(run_async())
 
     async def refresh_filter(self, guild_id: str, profanities: list=None):
@@ -627,17 +586,13 @@ class Automod(commands.Cog):
             else:
                 profanities = guild.settings.get("word_blacklist", [])
         
-        if len(profanities) > 0:
-            self.guild_profanity_checks[guild_id] = Profanity(profanities)
-        else:
-            if self.guild_profanity_checks.get(guild_id):
-                del self.guild_profanity_checks[guild_id]
-                self.guild_profanity_checks[guild_id] = None
+        self.word_filters.update(guild_id, profanities)
     
     @commands.Cog.listener()
     async def on_ready(self):
+        # Loads the saved lists right away, then keeps them up to date
+        blocklists.start()
         if not self.filters_ready:
-            await self.__load_guild_profanities()
             await self.__load_profanities()
             await self.__prepare_filters()
     
@@ -647,12 +602,8 @@ class Automod(commands.Cog):
     
     @commands.Cog.listener()
     async def on_bot_remove(self, event: guilded.BotRemoveEvent):
-        if self.guild_profanity_checks.get(event.server.id):
-            del self.guild_profanity_checks[event.server.id]
-            self.guild_profanity_checks[event.server.id] = None
-        if self.spam_cooldowns.get(event.server.id):
-            del self.spam_cooldowns[event.server.id]
-            self.spam_cooldowns[event.server.id] = None
+        self.word_filters.remove(event.server.id)
+        self.spam_cooldowns.pop(event.server.id, None)
     
     @commands.Cog.listener()
     async def on_message(self, event: guilded.MessageEvent):
@@ -701,62 +652,48 @@ class Automod(commands.Cog):
     @commands.Cog.listener()
     async def on_forum_topic_reply_update(self, event: guilded.ForumTopicReplyUpdateEvent):
         await self.filter_message(event.reply)
-    
-    @commands.Cog.listener()
-    async def on_bot_remove(self, event: guilded.BotRemoveEvent):
-        if self.spam_cooldowns.get(event.server.id):
-            del self.spam_cooldowns[event.server.id]
-    
-    @tasks.loop(minutes=30)
-    async def refresh_cache(self):
-        # Malicious URLs
-        try:
-            response = await requests.get('https://urlhaus.abuse.ch/downloads/csv/')
-            zip = ZipFile(io.BytesIO(response.content))
-            item = zip.open("csv.txt")
-            reader = csv.reader(io.TextIOWrapper(item, "utf-8"))
-        except Exception as e:
-            print(f"Failed to refresh malicious URLs: {'{}: {}'.format(type(e).__name__, e)}")
-        else:
-            self.malicious_urls.clear()
-            for row in reader:
-                if len(row) < 2 or ("id" in row[0]): continue
-                url = row[2]
-                threat = row[5]
-                self.malicious_urls[url] = threat
-            print("Refreshed malicious URLs")
-        # Guilded Paths
-        try:
-            response = await requests.get("https://www.guilded.gg/sitemap_landing.xml")
-            soup = BeautifulSoup(response.text, "xml")
-        except Exception as e:
-            print(f"Failed to refresh Guilded Paths: {'{}: {}'.format(type(e).__name__, e)}")
-        else:
-            self.guilded_paths.clear()
-            for tag in soup.find_all("url"):
-                loc = tag.loc
-                if loc:
-                    self.guilded_paths.append(loc.string[23:].lower())
-            print("Refreshed Guilded Paths")
 
 class AutomodContext:
-    def __init__(self, server: db.servers.Server, author_perms: UserPermissions, author_roles: list, message: guilded.ChatMessage):
+    def __init__(self, server: db.servers.Server, author_perms: UserPermissions, author_roles: list, message: guilded.ChatMessage, contents: List[str]=None):
         self.server = server
         self.author_perms = author_perms
         self.author_roles = author_roles
         self.message = message
+        self.contents = contents if contents is not None else [""]
+        # Toxicity and hatespeech scores of each content, shared by both stages
+        self.predictions = {}
+
+        self._can_run = {}
+        self._log_channel = False
     
     @classmethod
-    async def prepare(cls, message: guilded.ChatMessage):
+    async def prepare(cls, message: guilded.ChatMessage, contents: List[str]=None):
         try:
             guild = await db.servers.fetch_or_create_server(message.server)
             user = await guild.fetch_or_create_member(message.author)
         except:
             raise RuntimeError("Failed to retrieve guild data")
         else:
-            return AutomodContext(guild, user.perms, user.roles, message)
+            return AutomodContext(guild, user.perms, user.roles, message, contents)
+    
+    async def get_log_channel(self, bot: commands.Bot) -> Optional[guilded.ChatChannel]:
+        # Only looked up once something needs logging
+        if self._log_channel is False:
+            self._log_channel = None
+            log_channel = self.server.settings.get("logs_automod")
+            if log_channel:
+                try:
+                    self._log_channel = await log_channel.fetch()
+                except:
+                    pass
+        return self._log_channel
     
     def can_run(self, setting: str):
+        if setting not in self._can_run:
+            self._can_run[setting] = self._check_restrictions(setting)
+        return self._can_run[setting]
+    
+    def _check_restrictions(self, setting: str):
         restrictions = self.server.settings.get(f"{setting}_restrictions", {})
         
         allowed_users = restrictions.get("allow_users", [])
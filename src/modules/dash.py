@@ -3,6 +3,7 @@ from core.checks_api import authenticated, dashboard_access, has_permissions
 from core.setting_handlers import InvalidSetting
 from database.permissions import UserPermissions
 from modules.automod import LDNOOBW_LANGS
+from modules.xp import get_level
 from quart import Quart, jsonify, request
 from quart_cors import route_cors
 from guilded.ext import commands
@@ -203,7 +204,7 @@ class Dashboard(commands.Cog):
                 
                 channels = {}
                 
-                cached_channels = valkey.get(f"servers:{server_id}:channels")
+                cached_channels = await valkey.get(f"servers:{server_id}:channels")
                 if cached_channels:
                     channels = db.decoder.decode(cached_channels)
                 else:
@@ -215,7 +216,7 @@ class Dashboard(commands.Cog):
                                 "type": c["contentType"],
                                 "id": c["id"],
                             }
-                    valkey.set(f"servers:{server_id}:channels", db.encoder.encode(channels), 60 * 15)
+                    await valkey.set(f"servers:{server_id}:channels", db.encoder.encode(channels), 60 * 15)
 
                 data = {
                     "roles": roles,
@@ -328,6 +329,34 @@ class Dashboard(commands.Cog):
                     "maxRSSFeeds": guild.is_premium and limits.max_rss_feeds_premium or limits.max_rss_feeds,
                 }})
         
+        @app.route("/servers/<string:server_id>/leaderboard")
+        @route_cors(allow_headers=["content-type"], allow_methods=["GET"], allow_origin=[config.ORIGIN_SITE], allow_credentials=True)
+        @authenticated
+        @dashboard_access
+        async def GetLeaderboard(server_id: str):
+            limit = max(10, min(100, request.args.get("limit", 50, type=int)))
+            page = max(1, request.args.get("page", 1, type=int))
+            offset = (page - 1) * limit
+            try:
+                total = await db.servers.leaderboard.count(server_id)
+                entries = await db.servers.leaderboard.get_page(server_id, offset, limit)
+            except Exception as e:
+                print("Failed to get leaderboard for server {} - {}: {}".format(server_id, type(e).__name__, e))
+                return jsonify({"status": "error", "message": "Failed to get leaderboard"}), 500
+            else:
+                return jsonify({
+                    "status": "ok",
+                    "total": total,
+                    "members": [
+                        {
+                            "id": user_id,
+                            "rank": offset + i + 1,
+                            "xp": xp,
+                            "level": get_level(xp),
+                        } for i, (user_id, xp) in enumerate(entries)
+                    ],
+                })
+        
         @app.route("/servers/<string:server_id>/permissions")
         @route_cors(allow_headers=["content-type"], allow_methods=["GET"], allow_origin=[config.ORIGIN_SITE], allow_credentials=True)
         @authenticated
@@ -452,30 +481,27 @@ class Dashboard(commands.Cog):
             authors = request.args.getlist("author", type=str)
             event_names = request.args.getlist("event", type=str)
             limit = max(20, min(100, request.args.get("limit", 50, type=int)))
-            page = request.args.get("page", 1, type=int)
+            cursor = request.args.get("cursor", type=str)
             try:
                 guild = await db.servers.fetch_or_create_server(server_id)
-                logs, count = await guild.get_audit_logs(
+                logs, next_cursor = await guild.get_audit_logs(
                     start=range_start,
                     end=range_end,
                     authors=authors,
                     event_names=event_names,
                     limit=limit,
-                    page=page,
+                    cursor=cursor,
                 )
+                # The counters are kept per event, so a total is only known
+                # when the result isn't narrowed down by author or time
+                total = None
+                if len(authors) == 0 and range_start is None and range_end is None:
+                    total = await guild.count_audit_logs(event_names)
                 # TODO: Maybe an option to order by ascending or descending?
             except Exception as e:
                 print("Failed to get audit logs for server {} - {}: {}".format(server_id, type(e).__name__, e))
                 return jsonify({"status": "error", "message": "Failed to get audit logs"}), 400
             else:
-                if len(response[1]["result"]) == 0:
-                    return jsonify(
-                        {
-                            "status": "ok",
-                            "logs": [],
-                            "total": 0,
-                        }
-                    )
                 parsedResult = []
                 for log in logs:
                     log: db.servers.server.AuditLog
@@ -489,12 +515,13 @@ class Dashboard(commands.Cog):
                                         log.extra_data["prev_value"][role_id] = UserPermissions.from_string(log.extra_data["prev_value"][role_id]).list
                     except Exception as e:
                         print("{}: {}".format(type(e).__name__, e))
-                    parsedResult.append(log)
+                    parsedResult.append(log.to_dict())
                 return jsonify(
                     {
                         "status": "ok",
                         "logs": parsedResult,
-                        "total": count,
+                        "total": total,
+                        "next_cursor": next_cursor,
                     }
                 )
 
@@ -8,6 +8,7 @@ from guilded.ext import commands, tasks
 from modules.dash import Dashboard
 from datetime import datetime
 from modules.xp import XP
+from core.xp import xp_aggregator
 
 import database as db
 import guilded
@@ -258,6 +259,12 @@ class General(commands.Cog):
                 except Exception as e:
                     print(f"Failed to fetch user {member.name} ({member.id}) from database: {type(e).__name__} - {e}")
                 else:
+                    # Totals from our own flushes were already handled there
+                    known = await xp_aggregator.known_total(event.server.id, member.id)
+                    await xp_aggregator.observe(event.server.id, member.id, member.xp)
+                    if known == member.xp:
+                        continue
+
                     try:
                         await xp.xp_updated(
                             member,
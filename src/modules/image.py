@@ -1,31 +1,23 @@
-from quart import Quart, jsonify, request, send_file
+from quart import Quart, Response, jsonify, request
 from werkzeug.exceptions import NotFound
-from guilded.ext import commands, tasks
+from werkzeug.http import http_date
+from guilded.ext import commands
 from quart_cors import route_cors
 from datetime import timedelta
-from base import BOT_VERSION
+from core.image_fetcher import image_fetcher, ImageFetchError
 
 import database as db
-import requests
 import guilded
+import mimetypes
 import config
-import base64
-import io
-
-USER_AGENT = config.USER_AGENT.format(BOT_VERSION, "Image Proxy")
+import time
 
 class ImageStoreError(Exception):
     pass
 
 class Image(commands.Cog):
-    def __int__(self, bot: commands.Bot):
+    def __init__(self, bot: commands.Bot):
         self.bot = bot
-        
-        self.cleanup_images.start()
-    
-    @tasks.loop(seconds=1)
-    async def cleanup_images(self):
-        return await db.proxy.cleanup_images()
     
     async def store_bytes(
             self,
@@ -40,18 +32,15 @@ class Image(commands.Cog):
         url: str,
         expires: str="1d",
     ):
-        existing_image = await db.proxy.get_image(source=url)
-        if existing_image:
-            return f"{config.API_SITE}/resource/ext/{existing_image.id}"
-
-        download = requests.get(url,
-            headers={
-                "User-Agent": USER_AGENT,
-            }
-        )
-        if download.ok:
-            image = await self.store_bytes(download.content, expires, url)
-            return f"{config.API_SITE}/resource/ext/{image.id}"
+        try:
+            image = await db.proxy.get_image(source=url)
+        except db.NotFound:
+            try:
+                image = await image_fetcher.fetch(url, expires)
+            except ImageFetchError as e:
+                print(f"Failed to proxy image: {e}")
+                return None
+        return f"{config.API_SITE}/resource/ext/{image.id}"
     
     def register_routes(self, app: Quart):
         @app.route("/resource/ext/<string:id>", methods=["GET"])
@@ -61,8 +50,45 @@ class Image(commands.Cog):
                 image = await db.proxy.get_image(id=id)
             except db.NotFound:
                 raise NotFound
-            else:
-                return await send_file(image.bytes, mimetype="image/png", as_attachment=True, attachment_filename=f"{id}.png")
+
+            max_age = max(0, int(image.expires_at - time.time()))
+            headers = {
+                "ETag": f'"{image.hash}"',
+                "Cache-Control": f"public, max-age={max_age}, immutable",
+                "Expires": http_date(image.expires_at),
+                "Accept-Ranges": "bytes",
+            }
+            # Answered from the cached metadata alone, the blob isn't opened
+            if request.if_none_match.contains(image.hash):
+                return Response(status=304, headers=headers)
+
+            if not db.proxy.blobs.exists(image.hash):
+                raise NotFound
+
+            extension = mimetypes.guess_extension(image.mime) or ""
+            headers["Content-Disposition"] = f"inline; filename={id}{extension}"
+            start, end, status = 0, image.size, 200
+            # A Range only applies if If-Range, when sent, still matches this
+            # image. Multiple ranges aren't supported, those get the whole image.
+            if (
+                request.range and len(request.range.ranges) == 1
+                and ("If-Range" not in request.headers or request.if_range.etag == image.hash)
+            ):
+                bounds = request.range.range_for_length(image.size)
+                if bounds is None:
+                    headers["Content-Range"] = f"bytes */{image.size}"
+                    return Response(status=416, headers=headers)
+                start, end = bounds
+                status = 206
+                headers["Content-Range"] = request.range.to_content_range_header(image.size)
+            headers["Content-Length"] = str(end - start)
+
+            return Response(
+                db.proxy.blobs.stream(image.hash, start, end),
+                status=status,
+                mimetype=image.mime,
+                headers=headers
+            )
 
 def setup(bot: commands.Bot):
     bot.add_cog(Image(bot))
\ No newline at end of file
@@ -7,6 +7,7 @@ from datetime import datetime
 
 import database as db
 import guilded
+import asyncio
 
 
 class Logging(commands.Cog):
@@ -24,7 +25,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_traffic"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_traffic"])
+                    channel = await guild.settings["logs_traffic"].fetch()
                 except:
                     pass
                 else:
@@ -41,7 +42,7 @@ class Logging(commands.Cog):
                         for field in ["display_name", "bio"]:
                             content = getattr(event.member, field, None)
                             if content:
-                                toxicity, hatespeech = automod.apply_filters(
+                                toxicity, hatespeech = await automod.apply_filters(
                                     content)
                                 if field == "display_name":
                                     name = "Name %s"
@@ -63,10 +64,10 @@ class Logging(commands.Cog):
                         for field, url in urls.items():
                             if url:
                                 nudity = round(
-                                    automod.scan_nsfw(url=url) * 100)
+                                    await asyncio.to_thread(automod.scan_nsfw, url=url) * 100)
                                 if nudity >= guild.settings["filter_nsfw"] or nudity >= 50:
                                     try:
-                                        nsfw_log_channel = await self.bot.getch_channel(guild.settings.get("logs_nsfw"))
+                                        nsfw_log_channel = await guild.settings.get("logs_nsfw").fetch()
                                     except:
                                         pass
                                     else:
@@ -93,7 +94,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_traffic"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_traffic"])
+                    channel = await guild.settings["logs_traffic"].fetch()
                 except:
                     pass
                 else:
@@ -121,7 +122,7 @@ class Logging(commands.Cog):
 
             if guild.settings.get("logs_user"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_user"])
+                    channel = await guild.settings["logs_user"].fetch()
                 except:
                     pass
                 else:
@@ -150,7 +151,7 @@ class Logging(commands.Cog):
 
             if guild.settings.get("logs_user") and guild.settings.get("log_roles"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_user"])
+                    channel = await guild.settings["logs_user"].fetch()
                 except:
                     pass
                 else:
@@ -182,7 +183,7 @@ class Logging(commands.Cog):
 
             if guild.settings.get("logs_traffic"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_traffic"])
+                    channel = await guild.settings["logs_traffic"].fetch()
                 except:
                     pass
                 else:
@@ -213,7 +214,7 @@ class Logging(commands.Cog):
 
             if guild.settings.get("logs_traffic"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_traffic"])
+                    channel = await guild.settings["logs_traffic"].fetch()
                 except:
                     pass
                 else:
@@ -247,7 +248,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_message"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_message"])
+                    channel = await guild.settings["logs_message"].fetch()
                 except:
                     pass
                 else:
@@ -274,7 +275,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_message"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_message"])
+                    channel = await guild.settings["logs_message"].fetch()
                 except:
                     pass
                 else:
@@ -304,7 +305,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_message"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_message"])
+                    channel = await guild.settings["logs_message"].fetch()
                 except:
                     pass
                 else:
@@ -334,7 +335,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_message"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_message"])
+                    channel = await guild.settings["logs_message"].fetch()
                 except:
                     pass
                 else:
@@ -364,7 +365,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_message"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_message"])
+                    channel = await guild.settings["logs_message"].fetch()
                 except:
                     pass
                 else:
@@ -390,7 +391,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_message"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_message"])
+                    channel = await guild.settings["logs_message"].fetch()
                 except:
                     pass
                 else:
@@ -416,7 +417,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_message"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_message"])
+                    channel = await guild.settings["logs_message"].fetch()
                 except:
                     pass
                 else:
@@ -442,7 +443,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_message"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_message"])
+                    channel = await guild.settings["logs_message"].fetch()
                 except:
                     pass
                 else:
@@ -468,7 +469,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_message"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_message"])
+                    channel = await guild.settings["logs_message"].fetch()
                 except:
                     pass
                 else:
@@ -494,7 +495,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_message"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_message"])
+                    channel = await guild.settings["logs_message"].fetch()
                 except:
                     pass
                 else:
@@ -520,7 +521,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_message"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_message"])
+                    channel = await guild.settings["logs_message"].fetch()
                 except:
                     pass
                 else:
@@ -548,7 +549,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_message"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_message"])
+                    channel = await guild.settings["logs_message"].fetch()
                 except:
                     pass
                 else:
@@ -576,7 +577,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_message"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_message"])
+                    channel = await guild.settings["logs_message"].fetch()
                 except:
                     pass
                 else:
@@ -602,7 +603,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_message"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_message"])
+                    channel = await guild.settings["logs_message"].fetch()
                 except:
                     pass
                 else:
@@ -628,7 +629,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_message"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_message"])
+                    channel = await guild.settings["logs_message"].fetch()
                 except:
                     pass
                 else:
@@ -659,7 +660,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_message"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_message"])
+                    channel = await guild.settings["logs_message"].fetch()
                 except:
                     pass
                 else:
@@ -690,7 +691,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_message"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_message"])
+                    channel = await guild.settings["logs_message"].fetch()
                 except:
                     pass
                 else:
@@ -717,7 +718,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_message"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_message"])
+                    channel = await guild.settings["logs_message"].fetch()
                 except:
                     pass
                 else:
@@ -744,7 +745,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_message"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_message"])
+                    channel = await guild.settings["logs_message"].fetch()
                 except:
                     pass
                 else:
@@ -779,7 +780,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_message"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_message"])
+                    channel = await guild.settings["logs_message"].fetch()
                 except:
                     pass
                 else:
@@ -814,7 +815,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_message"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_message"])
+                    channel = await guild.settings["logs_message"].fetch()
                 except:
                     pass
                 else:
@@ -841,7 +842,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_message"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_message"])
+                    channel = await guild.settings["logs_message"].fetch()
                 except:
                     pass
                 else:
@@ -868,7 +869,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_message"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_message"])
+                    channel = await guild.settings["logs_message"].fetch()
                 except:
                     pass
                 else:
@@ -895,7 +896,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_message"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_message"])
+                    channel = await guild.settings["logs_message"].fetch()
                 except:
                     pass
                 else:
@@ -922,7 +923,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_message"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_message"])
+                    channel = await guild.settings["logs_message"].fetch()
                 except:
                     pass
                 else:
@@ -949,7 +950,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_message"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_message"])
+                    channel = await guild.settings["logs_message"].fetch()
                 except:
                     pass
                 else:
@@ -976,7 +977,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_management"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_management"])
+                    channel = await guild.settings["logs_management"].fetch()
                 except:
                     pass
                 else:
@@ -1003,7 +1004,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_management"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_management"])
+                    channel = await guild.settings["logs_management"].fetch()
                 except:
                     pass
                 else:
@@ -1029,7 +1030,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_management"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_management"])
+                    channel = await guild.settings["logs_management"].fetch()
                 except:
                     pass
                 else:
@@ -1103,7 +1104,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_management"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_management"])
+                    channel = await guild.settings["logs_management"].fetch()
                 except:
                     pass
                 else:
@@ -1127,7 +1128,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_management"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_management"])
+                    channel = await guild.settings["logs_management"].fetch()
                 except:
                     pass
                 else:
@@ -1151,7 +1152,7 @@ class Logging(commands.Cog):
         else:
             if guild.settings.get("logs_management"):
                 try:
-                    channel = await self.bot.getch_channel(guild.settings["logs_management"])
+                    channel = await guild.settings["logs_management"].fetch()
                 except:
                     pass
                 else:
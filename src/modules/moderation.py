@@ -2,8 +2,9 @@ from core.checks import has_permissions, user_has_any_permissions, module, user_
 from core.embeds import EMBED_DENIED, EMBED_STANDARD, EMBED_SUCCESS
 from core.converters import UserConverter, MemberConverter
 from humanfriendly import parse_timespan, format_timespan
-from guilded.ext import commands, tasks
+from guilded.ext import commands
 from modules.autoroles import Autoroles
+from core.xp import xp_aggregator
 from datetime import datetime
 
 import database as db
@@ -13,7 +14,7 @@ class Moderation(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
-        self.check_statuses.start()
+        db.statuses.scheduler.register(["tempban", "mute", "warn", "autorole"], self.expire_status)
     
     @commands.command()
     @has_permissions(commands_ban=True)
@@ -661,14 +662,13 @@ class Moderation(commands.Cog):
             )
             return
         else:
-            reset = []
+            members = []
             for user in ctx.message.user_mentions:
                 try:
-                    await user.set_xp(0)
+                    members.append(await ctx.server.getch_member(user.id))
                 except:
                     pass
-                else:
-                    reset.append(user)
+            reset = await xp_aggregator.set_xp(ctx.server, members, 0)
             
             if len(reset) > 0:
                 await ctx.reply(
@@ -679,66 +679,54 @@ class Moderation(commands.Cog):
                     silent=True
                 )
     
-    @tasks.loop(seconds=5)
-    async def check_statuses(self):
-        try:
-            statuses = await db.statuses.get_expired_statuses(["tempban", "mute", "warn", "autorole"])
-        except:
+    async def expire_status(self, status: db.statuses.UserStatus) -> bool:
+        if status.type == "tempban":
+            try:
+                server = await self.bot.getch_server(status.guild_id)
+                await server.unban(guilded.Object(status.user_id))
+            except:
+                pass
+            else:
+                # TODO: Notify the user when possible
+                pass
+        elif status.type == "warn":
+            # TODO: Notify the user when possible
             pass
-        else:
-            to_expire = []
-            for status in statuses:
-                if status.type == "ban":
+        elif status.type == "mute":
+            try:
+                guild = await db.servers.fetch_or_create_server(status.guild_id)
+            except:
+                pass
+            else:
+                muteRoleId = guild.settings.get("mute_role", None)
+                if muteRoleId:
                     try:
                         server = await self.bot.getch_server(status.guild_id)
-                        await server.unban(status["user_id"])
+                        member = await server.getch_member(status.user_id)
+                        await member.remove_role(guilded.Object(muteRoleId))
                     except:
                         pass
                     else:
                         # TODO: Notify the user when possible
                         pass
-                elif status.type == "warn":
-                    # TODO: Notify the user when possible
+        elif status.type == "autorole":
+            autoroles: Autoroles = self.bot.get_cog("Autoroles")
+            try:
+                autorole = await db.autoroles.get_autorole(status.autorole)
+            except:
+                pass
+            else:
+                try:
+                    server = await self.bot.getch_server(status.guild_id)
+                    member = await server.getch_member(status.user_id)
+                except:
                     pass
-                elif status.type == "mute":
-                    try:
-                        guild = await db.servers.fetch_or_create_server(status.guild_id)
-                    except:
-                        pass
-                    else:
-                        muteRoleId = guild.settings.get("mute_role", None)
-                        if muteRoleId:
-                            try:
-                                server = await self.bot.getch_server(status.guild_id)
-                                member = await server.getch_member(status.guild_id)
-                                await member.remove_role(guilded.Object(muteRoleId))
-                            except:
-                                pass
-                            else:
-                                # TODO: Notify the user when possible
-                                pass
-                elif status.type == "autorole":
-                    autoroles: Autoroles = self.bot.get_cog("Autoroles")
+                else:
                     try:
-                        autorole = await db.autoroles.get_autorole(status.autorole)
+                        await autoroles.update_autoroles(member, [autorole])
                     except:
                         pass
-                    else:
-                        try:
-                            server = await self.bot.getch_server(status.guild_id)
-                            member = await server.getch_member(status.user_id)
-                        except:
-                            pass
-                        else:
-                            try:
-                                await autoroles.update_autoroles(member, [autorole])
-                            except:
-                                pass
-                to_expire.append(status.id)
-            try:
-                await db.statuses.expire_statuses(to_expire)
-            except:
-                pass
+        return True
 
 def setup(bot: commands.Bot):
     bot.add_cog(Moderation(bot))
\ No newline at end of file
@@ -1,6 +1,6 @@
 from core.embeds import EMBED_DENIED, EMBED_STANDARD, EMBED_SUCCESS
 from humanfriendly import parse_timespan, InvalidTimespan
-from guilded.ext import commands, tasks
+from guilded.ext import commands
 
 import database as db
 import guilded
@@ -12,7 +12,7 @@ class Reminder(commands.Cog):
         self.reminder.add_command(self.remindme)
         self.reminder.add_command(self.list_reminders)
         self.reminder.add_command(self.remove_reminder)
-        self.check_reminders.start()
+        db.statuses.scheduler.register("reminder", self.expire_reminder)
     
     @commands.group(name="reminder", invoke_without_command=True)
     async def reminder(self, ctx: commands.Context):
@@ -73,40 +73,26 @@ class Reminder(commands.Cog):
                 description=f'Removed reminder with id **{id}.**'
             ))
     
-    @tasks.loop(seconds=5)
-    async def check_reminders(self):
-        # TODO: Maybe limit this query in scope to only
-        # TODO: users the bot is aware of?
+    async def expire_reminder(self, reminder: db.statuses.Reminder) -> bool:
         try:
-            reminders = await db.statuses.get_expired_statuses(["reminder"])
-        except:
-            pass
-        else:
-            reminder_ids = []
-            for reminder in reminders:
-                try:
-                    server = await self.bot.getch_server(reminder.guild_id)
-                    channel: guilded.ChatChannel = await server.getch_channel(reminder.channel_id)
-                    message = self.bot.get_message(reminder.message_id) or await channel.fetch_message(reminder.message_id)
+            server = await self.bot.getch_server(reminder.guild_id)
+            channel: guilded.ChatChannel = await server.getch_channel(reminder.channel_id)
+            message = self.bot.get_message(reminder.message_id) or await channel.fetch_message(reminder.message_id)
 
-                    await message.reply(embed=EMBED_STANDARD(
-                        title="Reminder Expired",
-                        description=reminder.message
-                    ), private=True)
-                    reminder_ids.append(reminder.id)
-                except guilded.errors.NotFound:
-                    reminder_ids.append(reminder.id)
-                except guilded.errors.Forbidden:
-                    reminder_ids.append(reminder.id)
-                except Exception as e:
-                    # Only keep the reminder in the database if
-                    # the issue was caused by our bot, not by Guilded
-                    print(e)
-                    continue
-            try:
-                await db.statuses.expire_statuses(reminder_ids)
-            except:
-                pass
+            await message.reply(embed=EMBED_STANDARD(
+                title="Reminder Expired",
+                description=reminder.message
+            ), private=True)
+        except guilded.errors.NotFound:
+            pass
+        except guilded.errors.Forbidden:
+            pass
+        except Exception as e:
+            # Only keep the reminder in the database if
+            # the issue was caused by our bot, not by Guilded
+            print(e)
+            return False
+        return True
 
 def setup(bot: commands.Bot):
     bot.add_cog(Reminder(bot))
\ No newline at end of file
@@ -17,6 +17,7 @@ import database as db
 import requests
 import hashlib
 import guilded
+import asyncio
 import base64
 import config
 
@@ -159,7 +160,7 @@ class Verification(commands.Cog):
                 
                 if verification_channel:
                     try:
-                        verification_channel = await self.bot.getch_channel(verification_channel)
+                        verification_channel = await verification_channel.fetch()
                     except:
                         pass
                     
@@ -387,7 +388,7 @@ class Verification(commands.Cog):
                     if re_toxicity > 0 or re_hatespeech > 0:
                         automod: Automod = self.bot.get_cog("Automod")
                         for item in [guild_user.name, guild_user.bio]:
-                            toxicity, hatespeech = automod.apply_filters(item)
+                            toxicity, hatespeech = await automod.apply_filters(item)
                             if re_toxicity > 0 and toxicity >= re_toxicity:
                                 return await reject("toxicity")
                             if re_hatespeech > 0 and hatespeech >= re_hatespeech:
@@ -400,7 +401,7 @@ class Verification(commands.Cog):
                         }
                         for field, url in urls.items():
                             if url:
-                                nudity = round(automod.scan_nsfw(url=url) * 100)
+                                nudity = round(await asyncio.to_thread(automod.scan_nsfw, url=url) * 100)
                                 if nudity >= guild.settings.get("filter_nsfw", 0):
                                     return await reject("nsfw")
                     
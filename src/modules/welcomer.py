@@ -12,7 +12,7 @@ class Welcomer(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
     
-    def pick_image(self, images, image_cycle, member):
+    async def pick_image(self, images, image_cycle, member):
         image: Image = self.bot.get_cog("Image")
         if image_cycle == "Random":
             image_url = random.choice(images)
@@ -33,7 +33,7 @@ class Welcomer(commands.Cog):
         
         # Have to proxy these because sometimes Guilded's image proxy
         # gets rejected by some websites.
-        proxied = image.proxy_url(image_url)
+        proxied = await image.proxy_url(image_url)
         return proxied if proxied else image_url
     
     async def welcome_member(self, member: guilded.Member):
@@ -45,7 +45,7 @@ class Welcomer(commands.Cog):
         else:
             if guild.settings.get("send_welcome", False):
                 try:
-                    channel = await member.server.getch_channel(guild.settings.get("welcome_channel"))
+                    channel = await guild.settings.get("welcome_channel").fetch()
                 except:
                     pass
                 else:
@@ -56,7 +56,7 @@ class Welcomer(commands.Cog):
                     sgf = SGFormatter(member.server)
                     message = sgf.format(template, mention=member.mention, server_name=member.server.name)
 
-                    image = self.pick_image(images, image_cycle, member)
+                    image = await self.pick_image(images, image_cycle, member)
 
                     em = guilded.Embed(
                         title="Welcome!",
@@ -90,7 +90,7 @@ class Welcomer(commands.Cog):
 
             if guild.settings.get("send_goodbye", False):
                 try:
-                    channel = await member.server.getch_channel(guild.settings.get("goodbye_channel"))
+                    channel = await guild.settings.get("goodbye_channel").fetch()
                 except:
                     pass
                 else:
@@ -101,7 +101,7 @@ class Welcomer(commands.Cog):
                     sgf = SGFormatter(member.server)
                     message = sgf.format(template, mention=member.mention)
 
-                    image = self.pick_image(images, image_cycle, member)
+                    image = await self.pick_image(images, image_cycle, member)
 
                     em = guilded.Embed(
                         title="Goodbye!",